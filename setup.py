@@ -7,24 +7,21 @@ See:
 '''
 
 from setuptools import setup, find_packages
-from os import listdir
-from os.path import isfile, join
 
 def read(path):
     with open(path) as f:
         return f.read()
 
-def discover_creators():
-    creators = filter(lambda creator: creator not in [
-        '__init__.py',
-        'creator.py',
-        'README.md',
-        'tests'
-    ], listdir('src/pyats/contrib/creators'))
-    creators = [creator.replace('.py', '') for creator in creators]
+# creators registered as pyATS testbed loaders, listed explicitly so that
+# helper modules and folders of the creators package are not registered
+CREATORS = [
+    'ansible', 'file', 'interactive', 'multi', 'netbox', 'template', 'topology'
+]
+
+def creator_entry_points():
     return ['{source} = pyats.contrib.creators.{source}:{source_title}'
         .format(source=source, source_title=source.title()) \
-            for source in creators]
+            for source in CREATORS]
 
 # launch setup
 setup(
@@ -87,18 +84,28 @@ setup(
     keywords = 'genie pyats test automation open source contrib',
 
     entry_points={
-        'pyats.topology.loader': discover_creators(),
+        'pyats.topology.loader': creator_entry_points(),
         'pyats.easypy.plugins': [
             'webex = pyats.contrib.plugins.webex_plugin.webex:webex_plugin',
             'topoup = pyats.contrib.plugins.topoup_plugin.topoup:topology_up_plugin'
         ],
+        'console_scripts': [
+            'pyats-creator-service = pyats.contrib.creators.libs.service:main'
+        ],
     },
 
     # package dependencies
     install_requires=[
-        "ansible", "requests", "xlrd", "xlrd", "xlwt", "xlsxwriter"
+        "ansible", "requests", "xlrd", "xlrd", "xlwt", "xlsxwriter", "openpyxl"
     ],
 
+    # optional dependencies
+    extras_require={
+        'zstd': ['zstandard'],
+        'arrow': ['pyarrow'],
+        'watch': ['watchdog'],
+    },
+
     # external modules
     ext_modules = [],
 
@@ -1,27 +1,53 @@
-from ansible.parsing.dataloader import DataLoader
-from ansible.inventory.manager import InventoryManager
-from ansible.cli.inventory import InventoryCLI
-from ansible import context
+import os
+import json
+import time
+import logging
+import hashlib
+
 from .creator import TestbedCreator
+from .libs import compression
+from .libs.inventory import read_inventory
+
+logger = logging.getLogger(__name__)
 
 class Ansible(TestbedCreator):
     """ Ansible class (TestbedCreator)
 
     Creator for the 'ansible' source. Reads the given inventory in Ansible and 
-    converts the data to a structured testbed file or object.
+    converts the data to a structured testbed file or object. Static INI and
+    YAML inventory files, with their group_vars and host_vars folders, are read
+    without importing Ansible.
+
+    Dynamic inventories, read through Ansible, can be cached in a folder. The
+    cache entry of an inventory is identified by its path and the content of
+    its files, such as the plugin configuration or the script, so that
+    changing them runs the inventory again.
 
     Args:
         inventory_name ('str'): The name of the Ansible inventory.
         encode_password ('bool') default=False: Should generated testbed encode 
             its passwords.
+        inventory_cache ('str') default=None: Folder where the exported
+            dynamic inventories are cached, no cache by default.
+        cache_ttl ('int') default=None: Number of seconds a cached inventory
+            is used for, forever by default.
+        refresh ('bool') default=False: Run the dynamic inventory again even
+            if it is cached.
 
-    CLI Argument           |  Class Argument
+    CLI Argument            |  Class Argument
     ------------------------------------------------
-    --inventory-name=value |  inventory_name=value
-    --encode-password      |  encode_password=True
+    --inventory-name=value  |  inventory_name=value
+    --encode-password       |  encode_password=True
+    --inventory-cache=value |  inventory_cache=value
+    --cache-ttl=value       |  cache_ttl=value
+    --refresh               |  refresh=True
+    --record=value         |  record=value
+    --replay=value         |  replay=value
 
     pyATS Examples:
         pyats create testbed ansible --output=out --inventory-name=inventory.ini
+        pyats create testbed ansible --output=out --inventory-name=aws_ec2.yml
+        --inventory-cache=.inventory_cache --cache-ttl=3600
 
     Examples:
         # Create testbed from Ansible source
@@ -30,7 +56,15 @@ class Ansible(TestbedCreator):
         creator.to_testbed_object()
 
     """
-    
+
+    _cpu_bound = True
+
+    # Group variables read by the creator
+    _GROUP_VARIABLES = {'ansible_connection', 'ansible_ssh_port', 
+                        'ansible_ssh_pass', 'ansible_password', 'ansible_user',
+                        'ansible_become_method', 'ansible_become_pass',
+                        'ansible_network_os'}
+
     def _init_arguments(self):
         """ Specifies the arguments for the creator.
 
@@ -41,7 +75,10 @@ class Ansible(TestbedCreator):
         return {
             'required': ['inventory_name'],
             'optional': {
-                'encode_password': False
+                'encode_password': False,
+                'inventory_cache': None,
+                'cache_ttl': None,
+                'refresh': False
             }
         }
 
@@ -52,20 +89,8 @@ class Ansible(TestbedCreator):
             dict: The intermediate dictionary format of the testbed data.
     
         """
-        # Set Ansible arguments for export
-        context.CLIARGS = {}
-        context.CLIARGS['export'] = True
-        context.CLIARGS['basedir'] = '.'
-
-        # Instantiate Ansible control objects
-        inventory = InventoryManager(loader=DataLoader(), 
-                                                sources=self._inventory_name)
-        test = InventoryCLI(args=[''])
-        group = inventory.groups.get('all')
-        test.inventory = inventory
-
         # Fetch all the data associated with particular inventory
-        result = test.json_inventory(top=group)
+        result = self._source_data('inventory', self._export_inventory)
         testbed = {}
         devices = testbed.setdefault('devices', {})
         host_vars = result['_meta']['hostvars']
@@ -115,6 +140,8 @@ class Ansible(TestbedCreator):
                     password = 'ansible_password'
                 else:
                     # If password does not exist, skip over device
+                    self._result['warning'][host] = ('has no password, '
+                                                                'skipping')
                     del devices[host]
                     continue
                 
@@ -143,3 +170,192 @@ class Ansible(TestbedCreator):
                 device.setdefault('type', device_type)
 
         return testbed if len(testbed['devices']) > 0 else None
+
+    def _export_inventory(self):
+        """ Exports the inventory, natively for static inventory files and
+            through Ansible for dynamic inventories and vault content.
+
+        Returns:
+            dict: The inventory in Ansible JSON format.
+
+        """
+        inventory = read_inventory(self._inventory_name)
+        if inventory is not None:
+            return inventory
+
+        if not self._inventory_cache:
+            return self._ansible_inventory()
+
+        location = self._cache_location()
+        if not self._refresh:
+            inventory = self._load_cache(location)
+            if inventory is not None:
+                return inventory
+
+        inventory = self._ansible_inventory()
+        self._save_cache(location, inventory)
+
+        return inventory
+
+    def _cache_location(self):
+        """ Finds the cache file of the inventory, named after the hash of the
+            inventory path and of the content of its files.
+
+        Returns:
+            str: The cache file path.
+
+        """
+        source = self._inventory_name
+        digest = hashlib.sha256()
+
+        # Host lists are not paths
+        if not os.path.exists(source):
+            digest.update(source.encode())
+        else:
+            digest.update(os.path.realpath(source).encode())
+
+            files = [source]
+            if os.path.isdir(source):
+                files = sorted(os.path.join(root, name)
+                        for root, _, names in os.walk(source) for name in names)
+
+            for file in files:
+                digest.update(os.path.relpath(file, source).encode())
+                with open(file, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+
+        return os.path.join(os.path.expanduser(self._inventory_cache),
+                                    '{h}.json.gz'.format(h=digest.hexdigest()))
+
+    def _load_cache(self, location):
+        """ Loads a cached inventory, unless it is older than the TTL.
+
+        Args:
+            location ('str'): The cache file path.
+
+        Returns:
+            dict: The inventory in Ansible JSON format, or None if there is no
+                valid cache.
+
+        """
+        try:
+            with compression.open_file(location) as f:
+                cached = json.load(f)
+            age = time.time() - cached['time']
+            inventory = cached['inventory']
+        except (OSError, EOFError, ValueError, KeyError, TypeError):
+            return None
+
+        if self._cache_ttl is not None and age >= float(self._cache_ttl):
+            return None
+
+        logger.info('Using the inventory cached {a:.0f}s ago in {l}'.format(
+                                                            a=age, l=location))
+
+        return inventory
+
+    def _save_cache(self, location, inventory):
+        """ Saves an inventory to the cache, replacing the previous one only
+            once it is completely written.
+
+        Args:
+            location ('str'): The cache file path.
+            inventory ('dict'): The inventory in Ansible JSON format.
+
+        """
+        os.makedirs(os.path.dirname(location), exist_ok=True)
+
+        with compression.atomic_file(location) as f:
+            json.dump({'source': self._inventory_name, 'time': time.time(),
+                                                'inventory': inventory}, f)
+
+    def _ansible_inventory(self):
+        """ Exports the inventory through Ansible. The groups and hosts are
+            walked in the inventory manager, in the same order as the Ansible
+            JSON export, but only the variables used by the creator are
+            resolved and kept.
+
+        Returns:
+            dict: The inventory in Ansible JSON format, with only the variables
+                used by the creator.
+
+        """
+        # Ansible is slow to import, only import it when it is used
+        from ansible import constants
+        from ansible.parsing.dataloader import DataLoader
+        from ansible.inventory.manager import InventoryManager
+        from ansible.utils.vars import combine_vars
+        from ansible.vars.plugins import get_vars_from_inventory_sources, \
+                                                            get_vars_from_path
+
+        # The loader also reads group_vars and host_vars
+        loader = DataLoader()
+        inventory = InventoryManager(loader=loader, 
+                                                sources=self._inventory_name)
+
+        def plugin_vars(entity):
+            data = get_vars_from_inventory_sources(loader, inventory._sources,
+                                                            [entity], 'all')
+            return combine_vars(data, get_vars_from_path(loader, '.',
+                                                            [entity], 'all'))
+
+        resolved = {}
+
+        def group_vars(group):
+            # Groups are shared by their parents, resolve each of them once
+            if group.name not in resolved:
+                plugins = plugin_vars(group)
+                data = {}
+                defined = group.priority != 1
+                for variables in (group.vars, plugins):
+                    for key, value in variables.items():
+                        defined = defined or \
+                                    key not in constants.INTERNAL_STATIC_VARS
+                        if key in self._GROUP_VARIABLES:
+                            data[key] = value
+
+                # Groups without variables have no 'vars' key in the export
+                resolved[group.name] = data if defined else None
+
+            return resolved[group.name]
+
+        result = {}
+        seen = set()
+
+        def export(group):
+            entry = result[group.name] = {}
+            if group.name != 'all' and group.hosts:
+                entry['hosts'] = [host.name for host in group.hosts]
+
+            if group.child_groups:
+                entry['children'] = [child.name 
+                                                for child in group.child_groups]
+            for child in group.child_groups:
+                if child.name not in seen:
+                    export(child)
+                    seen.add(child.name)
+
+            variables = group_vars(group)
+            if variables is not None:
+                entry['vars'] = variables
+            if not entry:
+                del result[group.name]
+
+        export(inventory.groups['all'])
+
+        hostvars = {}
+        for host in inventory.hosts.values():
+            plugins = plugin_vars(host)
+            if 'ansible_host' in plugins:
+                hostvars[host.name] = {'ansible_host': plugins['ansible_host']}
+            elif 'ansible_host' in host.vars:
+                hostvars[host.name] = {'ansible_host': 
+                                                    host.vars['ansible_host']}
+
+        result.setdefault('all', {})
+        result['_meta'] = {'hostvars': hostvars}
+
+        # Recent Ansible versions tag the values with subclasses of the Python
+        # types, which do not dump to YAML
+        return json.loads(json.dumps(result))
@@ -1,15 +1,134 @@
+import gc
 import os
 import yaml
 import re
+import json
+import gzip
 import logging
 import sys
 import argparse
+import itertools
+import threading
+import contextlib
+import multiprocessing
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pyats.utils.secret_strings import SecretString
 from pyats.topology.loader.base import BaseTestbedLoader
+from .libs import transforms
+from .libs import compression
+from .libs.store import DeviceStore
+from .libs.lazy import create_lazy_testbed
+from .libs.validator import Validator
+from .libs.schema import RowSchema
+
+try:
+    from yaml import CDumper as Dumper
+except ImportError:
+    from yaml import Dumper
 
 logger = logging.getLogger(__name__)
 
+# Flag values given as strings on the command line
+_FALSE = ('false', 'no', 'off', '0', '')
+_TRUE = ('true', 'yes', 'on', '1')
+
+def _flag(value):
+    """ Converts a flag given on the command line, such as '--validate=False',
+        to a boolean.
+
+    Args:
+        value: The flag value, a string from the command line or already a
+            boolean.
+
+    Returns:
+        The boolean value, or the value itself if it is not a known string.
+
+    """
+    if isinstance(value, str):
+        if value.strip().lower() in _FALSE:
+            return False
+        if value.strip().lower() in _TRUE:
+            return True
+
+    return value
+
+def _default_workers(workers):
+    """ Finds the number of worker processes to use. Without a given number,
+        the number of CPUs is only used from the main thread: pools created
+        from the other threads of a process, such as the workers of the
+        creator service, run in the current process instead.
+
+    Args:
+        workers: The requested number of processes, if any.
+
+    Returns:
+        int: The number of processes, 1 to work in the current process.
+
+    """
+    if workers:
+        return int(workers)
+
+    if threading.current_thread() is not threading.main_thread():
+        return 1
+
+    return os.cpu_count() or 1
+
+def _process_pool(workers, threaded=False):
+    """ Creates a pool of worker processes. When other threads are running,
+        the workers are started from a fork server, or spawned, rather than
+        forked: a forked process inherits the locks held by the other threads
+        and may deadlock on them.
+
+    Args:
+        workers ('int'): The number of processes.
+        threaded ('bool') default=False: Whether threads are started while
+            the pool is used, such as by a thread pool running beside it.
+
+    Returns:
+        ProcessPoolExecutor: The pool.
+
+    """
+    context = None
+
+    if threaded or threading.active_count() > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+                            'forkserver' if 'forkserver' in methods else 'spawn')
+
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+@contextlib.contextmanager
+def _paused_gc():
+    """ Pauses the garbage collector while many objects without reference
+        cycles, such as device data, are created. Collecting garbage then only
+        slows down their creation.
+
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _dump_entries(key, entries):
+    """ Dumps entries of a testbed section under their key. Defined at module
+        level so that it can be sent to worker processes.
+
+    Args:
+        key ('str'): The section key, such as 'devices'.
+        entries ('list'): The name and data pairs of the entries.
+
+    Returns:
+        str: The YAML fragment.
+
+    """
+    return yaml.dump({key: dict(entries)}, Dumper=Dumper, 
+                                                    default_flow_style=False)
+
 class TestbedCreator(BaseTestbedLoader):
     """ TestbedCreator class (BaseTestbedLoader)
 
@@ -43,17 +162,36 @@ class TestbedCreator(BaseTestbedLoader):
     
     """
 
-    def __init__(self, **kwargs):
+    # Whether generating is bound by CPU rather than I/O, in which case the 
+    # creator runs in its own process when run along with other creators
+    _cpu_bound = False
+
+    # Number of entries of a testbed section above which it is dumped in
+    # chunks across several processes, and maximum number of entries per chunk
+    _PARALLEL_MINIMUM = 2000
+    _CHUNK_SIZE = 1000
+
+    def __init__(self, parse_cli=True, **kwargs):
         """ Instantiates the testbed creator with appropriate arguments.
+
+        Args:
+            parse_cli ('bool') default=True: Whether arguments are also taken
+                from the command line, when the creator is not run by pyATS 
+                CLI directly.
         
         """
         self._result = {'success': {}, 'errored':{}, 'warning':{}}
         self._keys = ['hostname','ip','username', 'password', 'protocol', 'os']
         self._cli_list_arguments = []
         self._cli_replacements = {}
+        self._snapshot = None
+        self._recorded = {}
+        self._outputs = []
+        self._cli_list_arguments.append('--transforms')
 
         arguments = self._init_arguments()
-        kwargs.update(self._parse_cli())
+        if parse_cli:
+            kwargs.update(self._parse_cli())
 
         if "required" in arguments:
             for arg in arguments["required"]:
@@ -66,10 +204,17 @@ class TestbedCreator(BaseTestbedLoader):
                         "\n" + required + "\n\nSource Help:\n" + self.__doc__
                     )
 
-        if "optional" in arguments:
-            for arg in arguments["optional"]:
-                self.__dict__.setdefault('_' + arg, kwargs[arg] 
-                            if arg in kwargs else arguments["optional"][arg])
+        # Arguments shared by all the creators are optional too
+        optional = dict(arguments.get("optional", {}))
+        optional.update(self._common_arguments())
+
+        for arg in optional:
+            self.__dict__.setdefault('_' + arg, kwargs[arg] 
+                                        if arg in kwargs else optional[arg])
+
+            # Command line values are strings, 'False' would be true
+            if isinstance(optional[arg], bool):
+                self.__dict__['_' + arg] = _flag(self.__dict__['_' + arg])
 
     def _parse_cli(self):
         """ Parses arguments from CLI if any. Removes the first two dashes and
@@ -103,9 +248,11 @@ class TestbedCreator(BaseTestbedLoader):
                 if arg in self._cli_list_arguments:
                     j = i
                     
-                    # Collect parameters
-                    while j < len(args.args) and not '--' in args.args[j] and \
-                        not '-r' in args.args[j]: j += 1
+                    # Collect parameters up to the next option, values such
+                    # as 'rename:lab-r1=core1' may contain dashes
+                    while j < len(args.args) and \
+                            not args.args[j].startswith('--') and \
+                            args.args[j] not in self._cli_replacements: j += 1
 
                     kwargs.setdefault(arg.replace('--', '').replace('-', '_'), 
                                                                 args.args[i:j])
@@ -181,6 +328,74 @@ class TestbedCreator(BaseTestbedLoader):
         """
         return {}
 
+    def _common_arguments(self):
+        """ Defines the optional arguments that every creator accepts on top of
+            the ones returned by '_init_arguments'. They are added to the class
+            instance the same way, with an underscore in front.
+
+                shard_by: Splits the generated testbed into one file per value
+                    of the given device key, either a dotted path such as 
+                    'custom.site' or a callable taking the device name and 
+                    data and returning the shard name.
+                shard_size: Maximum number of devices per testbed file. 
+                    Devices are spread evenly over the smallest number of 
+                    files that satisfies it.
+                record: Path of a compressed snapshot file where the raw data
+                    consumed from the source is saved.
+                replay: Path of a snapshot file to regenerate the testbed from,
+                    without accessing the source.
+                transforms: Ordered list of stages applied to every generated
+                    device before writing, either 'libs.transforms.Stage' 
+                    objects or their command line format (see 
+                    'libs.transforms.parse_stage').
+                store_threshold: Number of devices above which they are moved
+                    from memory to a disk store while the testbed is built, 0
+                    to never use the store.
+                yaml_anchors: Write identical credentials, connections and 
+                    custom blocks of the devices once, as YAML anchors that the
+                    other devices refer to.
+                serialize_workers: Number of processes dumping large device
+                    and topology sections in chunks, the number of CPUs by
+                    default when running in the main thread, 1 otherwise. Use
+                    1 to dump in the current process only.
+                lazy_testbed: Create the devices of the testbed object, with
+                    their interfaces and links, only when they are first
+                    accessed.
+                validate: Check the generated testbed and report every 
+                    invalid device in the result (see 'libs.validator').
+
+        Returns:
+            dict: The common arguments and their default value.
+
+        """
+        return {
+            'shard_by': None,
+            'shard_size': None,
+            'record': None,
+            'replay': None,
+            'transforms': None,
+            'store_threshold': 50000,
+            'yaml_anchors': False,
+            'serialize_workers': None,
+            'lazy_testbed': False,
+            'validate': True
+        }
+
+    def _arguments(self):
+        """ Collects the current value of every argument of the creator, such
+            as to create the same creator in another process.
+
+        Returns:
+            dict: The arguments and their value.
+
+        """
+        arguments = self._init_arguments()
+        names = list(arguments.get('required', [])) + \
+                    list(arguments.get('optional', {})) + \
+                                            list(self._common_arguments())
+
+        return {name: getattr(self, '_' + name) for name in names}
+
     def _generate(self):
         """ Defines the generate method that the derived class must implement. 
         
@@ -192,6 +407,164 @@ class TestbedCreator(BaseTestbedLoader):
             "Derived class must implement `_generate` method."
         )
 
+    def _generate_testbed(self):
+        """ Runs '_generate' and saves the source snapshot if requested, then
+            transforms and validates the testbed data. The 'to_testbed_*' 
+            methods should call this instead of '_generate'.
+
+        Returns:
+            dict: The intermediate dictionary format of the testbed data.
+
+        """
+        testbed = self._generate()
+
+        if self._record:
+            self._save_snapshot()
+
+        if self._transforms:
+            if isinstance(testbed, list):
+                testbed = [(name, self._transform_testbed(data)) 
+                                                    for name, data in testbed]
+            else:
+                testbed = self._transform_testbed(testbed)
+
+        if self._validate and testbed:
+            for _, data in testbed if isinstance(testbed, list) \
+                                                    else [(None, testbed)]:
+                self._validate_testbed(data)
+
+        return testbed
+
+    def _validate_testbed(self, testbed):
+        """ Validates testbed data and reports all the errors found in the
+            result, one entry per device. OS values unknown to Unicon and
+            Genie are reported as warnings.
+
+        Args:
+            testbed ('dict'): Dictionary containing testbed data.
+
+        """
+        # Merged files report the devices sharing an address themselves, 
+        # along with their file and row
+        validator = Validator(addresses=not getattr(self, '_merge', False))
+        warnings = {}
+        errors = validator.validate(testbed, warnings)
+
+        for name, messages in errors.items():
+            self._result['errored'][name] = 'is not valid: {m}'.format(
+                                                        m='; '.join(messages))
+
+        for name, messages in warnings.items():
+            self._result['warning'][name] = 'may not be valid: {m}'.format(
+                                                        m='; '.join(messages))
+
+    def _transform_testbed(self, testbed):
+        """ Applies the transform stages to every device of the testbed data.
+            The topology of a device follows it when it is renamed and is 
+            removed when it is dropped.
+
+        Args:
+            testbed ('dict'): Dictionary containing testbed data.
+
+        Returns:
+            dict: The transformed testbed data.
+
+        """
+        if not testbed:
+            return testbed
+
+        stages = [transforms.parse_stage(stage) if isinstance(stage, str) 
+                                        else stage for stage in self._transforms]
+        topology = testbed.get('topology') or {}
+        devices = testbed.get('devices', {})
+        result = dict(testbed, devices=DeviceStore() 
+                        if isinstance(devices, DeviceStore) else {})
+
+        if 'topology' in testbed:
+            result['topology'] = {}
+
+        for original, name, device in transforms.apply(stages, 
+                                                            devices.items()):
+            if name in result['devices']:
+                self._result['warning'][name] = ('is generated several times'
+                                        ' by the transforms, keeping the last')
+
+            result['devices'][name] = device
+
+            if original in topology:
+                result['topology'][name] = topology[original]
+
+        return result
+
+    def _source_data(self, key, fetch):
+        """ Retrieves raw data from the source. When replaying, the data is 
+            read from the snapshot and 'fetch' is never called. When recording,
+            the fetched data is kept for the snapshot. Creators should wrap all
+            their accesses to the source with this method.
+
+        Args:
+            key ('str'): Unique name of the data within the source.
+            fetch ('callable'): Retrieves the data from the source. The data
+                must be JSON serializable.
+
+        Returns:
+            The source data.
+
+        """
+        if self._replay:
+            if self._snapshot is None:
+                self._snapshot = self._load_snapshot()
+
+            if key not in self._snapshot:
+                raise Exception('No data recorded for "{k}" in snapshot "{s}"'
+                                            .format(k=key, s=self._replay))
+
+            return self._snapshot[key]
+
+        data = fetch()
+
+        # Encode right away as the caller may modify the data afterwards
+        if self._record:
+            self._recorded[key] = json.dumps(data)
+
+        return data
+
+    def _load_snapshot(self):
+        """ Loads the snapshot file given by 'replay'.
+
+        Returns:
+            dict: The recorded source data.
+
+        """
+        with gzip.open(self._replay, 'rt') as f:
+            snapshot = json.load(f)
+
+        source = type(self).__name__
+        if snapshot.get('source') != source:
+            raise Exception('Snapshot "{s}" was recorded from source "{r}", '
+                'not "{c}"'.format(s=self._replay, r=snapshot.get('source'), 
+                                                                    c=source))
+
+        return snapshot['data']
+
+    def _save_snapshot(self):
+        """ Saves the recorded source data to the snapshot file given by 
+            'record'.
+
+        """
+        try:
+            os.makedirs(os.path.dirname(self._record), exist_ok=True)
+        except FileNotFoundError:
+            # If a file which does not contains a directory name
+            pass
+
+        with gzip.open(self._record, 'wt') as f:
+            f.write('{{"source": {s}, "data": {{'.format(
+                                            s=json.dumps(type(self).__name__)))
+            f.write(', '.join('{k}: {v}'.format(k=json.dumps(key), v=value)
+                                    for key, value in self._recorded.items()))
+            f.write('}}')
+
     def to_testbed_file(self, output_location):
         """ Retrieves the testbed information and saves it as a YAML file.
         
@@ -205,14 +578,14 @@ class TestbedCreator(BaseTestbedLoader):
         if os.path.isdir(output_location):
             raise Exception('Output "{o}" is a directory'
                                                     .format(o=output_location))
-        testbed = self._generate()
+        testbed = self._generate_testbed()
         encode_password = False
         
         if hasattr(self, '_encode_password'):
             encode_password = self._encode_password
 
         try:
-            self._write_yaml(output_location, testbed, encode_password)
+            self._write_testbed(output_location, testbed, encode_password)
             
             return True
         except:
@@ -235,7 +608,7 @@ class TestbedCreator(BaseTestbedLoader):
             Testbed: The testbed object.
 
         """
-        data = self._generate()
+        data = self._generate_testbed()
 
         if data is None:
             return None
@@ -253,14 +626,41 @@ class TestbedCreator(BaseTestbedLoader):
             Testbed: The converted testbed object.
         
         """
+        if self._lazy_testbed:
+            return create_lazy_testbed(data)
+
         return BaseTestbedLoader.create_testbed({
             'testbed': {
                 'name': 'testbed'
             },
-            'devices': data.get('devices', {}),
+            'devices': dict(data.get('devices', {}).items()),
             'topology': data.get('topology', {})
         })
 
+    def _bounded_devices(self, devices):
+        """ Helper to move devices from memory to a disk store once their 
+            number reaches 'store_threshold'. Should be called whenever a
+            device is added while building testbed data.
+
+        Args:
+            devices ('dict'): Mapping of device names to device data.
+
+        Returns:
+            dict: The devices, or a 'DeviceStore' containing them.
+
+        """
+        # Values from the CLI are strings, and 0 disables the store
+        threshold = int(self._store_threshold or 0)
+        if threshold and isinstance(devices, dict) and \
+                                                    len(devices) >= threshold:
+            store = DeviceStore()
+            store.update(devices)
+            devices.clear()
+
+            return store
+
+        return devices
+
     def _encode_all_password(self, devices):
         """ Encode the password of all the devices.
         
@@ -270,8 +670,13 @@ class TestbedCreator(BaseTestbedLoader):
         """
         # ask password on connect if not provided, otherwise encode the password
         stack = [devices]
+        # blocks can be shared by several devices, only encode them once
+        visited = set()
         while len(stack) > 0:
             current = stack.pop()
+            if id(current) in visited:
+                continue
+            visited.add(id(current))
             for key, value in current.items():
                 if key == "password" and value != '%ASK{}':
                     value = self._encode_secret(value)
@@ -292,6 +697,145 @@ class TestbedCreator(BaseTestbedLoader):
         encoded = SecretString.from_plaintext(plain_text)
         return '%ENC{' + encoded.data + '}'
 
+    def _write_testbed(self, output, testbed, encode_password, 
+                                                            input_file=None):
+        """ Write testbed data to a yaml file, or to several ones if sharding
+            is requested. Files whose path ends with '.gz', '.xz' or '.zst'
+            are compressed.
+
+        Args:
+            output ('str'): The output file path.
+            testbed ('dict'): Dictionary containing testbed data.
+            encode_password ('bool'): Flag for encoding passwords or not.
+            input_file ('str'): The input file name, if any.
+
+        """
+        if not testbed or not (self._shard_by or self._shard_size):
+            self._write_yaml(output, testbed, encode_password, input_file)
+            return
+
+        base, extension, compressed = compression.split_extension(output)
+        extension += compressed
+        shards, links = self._shard_testbed(testbed)
+        manifest = {'shards': {}, 'devices': {}, 'links': links}
+
+        for shard, data in shards.items():
+            location = '{b}_{s}{e}'.format(b=base, s=shard, e=extension)
+            self._write_yaml(location, data, encode_password, input_file)
+            manifest['shards'][shard] = os.path.basename(location)
+
+            for name in data['devices']:
+                manifest['devices'][name] = shard
+
+        location = '{b}.manifest{e}'.format(b=base, e=extension)
+        with compression.atomic_file(location, 'w') as f:
+            yaml.dump(manifest, f, Dumper=Dumper, default_flow_style=False)
+        self._outputs.append(location)
+
+        if links:
+            self._result['warning'][output] = ('{n} link(s) span several '
+                'shards, see the manifest file'.format(n=len(links)))
+
+    def _shard_key(self, name, device):
+        """ Helper to compute the shard a device belongs to.
+
+        Args:
+            name ('str'): The device name.
+            device ('dict'): The device data.
+
+        Returns:
+            str: The shard name, safe to be used in a file name.
+
+        """
+        if callable(self._shard_by):
+            key = self._shard_by(name, device)
+        else:
+            key = device
+
+            for part in self._shard_by.split('.'):
+                key = key.get(part) if isinstance(key, dict) else None
+
+        return re.sub(r'[^\w.-]+', '_', str(key)) if key is not None \
+                                                                else 'unknown'
+
+    def _shard_testbed(self, testbed):
+        """ Splits testbed data into shards based on 'shard_by' and 
+            'shard_size'. Each shard keeps the topology of its own devices, so
+            links are intact within a shard.
+
+        Args:
+            testbed ('dict'): Dictionary containing testbed data.
+
+        Returns:
+            tuple: The shards as a dictionary of shard name to testbed data, 
+                and the links spanning several shards as a dictionary of link
+                name to the list of its endpoints.
+
+        """
+        devices = testbed.get('devices', {})
+        topology = testbed.get('topology') or {}
+        size = int(self._shard_size) if self._shard_size else None
+        groups = {}
+
+        for name in sorted(devices):
+            key = self._shard_key(name, devices[name]) \
+                                                if self._shard_by else None
+            groups.setdefault(key, []).append(name)
+
+        shards = {}
+        owners = {}
+        # Numbered shard names must not clash with a shard named after a key,
+        # such as 'x_1' for the first shard of 'x' and a key 'x_1'
+        taken = set(groups)
+        for key, names in groups.items():
+            count = -(-len(names) // size) if size else 1
+
+            for index in range(count):
+                # Spread devices evenly so shard sizes differ by at most one
+                chunk = names[index * len(names) // count:
+                                            (index + 1) * len(names) // count]
+
+                if key is None:
+                    shard = str(index + 1)
+                elif count > 1:
+                    shard = '{k}_{i}'.format(k=key, i=index + 1)
+                    suffix = 1
+                    while shard in taken:
+                        suffix += 1
+                        shard = '{k}_{i}_{s}'.format(k=key, i=index + 1, 
+                                                                    s=suffix)
+                    taken.add(shard)
+                else:
+                    shard = key
+
+                data = {k: v for k, v in testbed.items() 
+                                        if k not in ('devices', 'topology')}
+                data['devices'] = {name: devices[name] for name in chunk}
+
+                if topology:
+                    data['topology'] = {name: topology[name] 
+                                        for name in chunk if name in topology}
+
+                shards[shard] = data
+                owners.update(dict.fromkeys(chunk, shard))
+
+        # Find the links whose endpoints ended up in different shards
+        endpoints = {}
+        for name, data in topology.items():
+            for interface, attributes in (data or {}).get(
+                                                    'interfaces', {}).items():
+                if attributes and attributes.get('link'):
+                    endpoints.setdefault(attributes['link'], []).append({
+                        'device': name,
+                        'interface': interface,
+                        'shard': owners.get(name)
+                    })
+
+        links = {link: ends for link, ends in endpoints.items() 
+                            if len({end['shard'] for end in ends}) > 1}
+
+        return shards, links
+
     def _write_yaml(self, output, devices, encode_password, input_file=None):
         """ Write device data to yaml file.
         
@@ -315,14 +859,20 @@ class TestbedCreator(BaseTestbedLoader):
         if encode_password:
             self._encode_all_password(devices)
 
-        with open(output, 'w') as f:
-            try:
-                yaml.dump(devices, f, default_flow_style=False)
-            except Exception as e:
-                self._result['errored'][
-                    input_file.lstrip('./')
-                ] = 'has an error: {e}'.format(e=str(e))
-                return
+        if self._yaml_anchors:
+            self._share_blocks(devices)
+
+        # Compressed as a stream if the output ends with a compression format,
+        # and only replaces the previous file once completely written
+        try:
+            with compression.atomic_file(output, 'w') as f:
+                self._dump_testbed(devices, f, encode_password)
+        except Exception as e:
+            self._result['errored'][
+                (input_file or output).lstrip('./')
+            ] = 'has an error: {e}'.format(e=str(e))
+            return
+        self._outputs.append(output)
         if input_file:
             name = input_file.lstrip('./')
             self._result['success'].setdefault(name, "")
@@ -330,6 +880,178 @@ class TestbedCreator(BaseTestbedLoader):
         else:
             self._result['success'][output] = ''
 
+    def _share_blocks(self, testbed):
+        """ Makes the devices refer to the same object for identical 
+            credentials, connections and custom blocks, so that YAML dumps them
+            once as an anchor and as aliases afterwards. Blocks are compared as
+            a whole first, then entry by entry, such as each credential or each
+            connection. Devices kept in a disk store are not shared.
+
+        Args:
+            testbed ('dict'): Dictionary containing testbed data.
+
+        """
+        devices = testbed.get('devices')
+        if not isinstance(devices, dict):
+            return
+
+        blocks = {}
+
+        def share(container, key):
+            value = container[key]
+            if not isinstance(value, dict):
+                return False
+            identity = json.dumps(value, sort_keys=True, default=str)
+            shared = blocks.setdefault(identity, value)
+            container[key] = shared
+            return shared is not value
+
+        for device in devices.values():
+            for key in ('credentials', 'connections', 'custom'):
+                if key in device and not share(device, key):
+                    for entry in list(device[key]):
+                        share(device[key], entry)
+
+    def _dump_testbed(self, testbed, stream, encode_password):
+        """ Dumps testbed data as YAML. Large device and topology sections are
+            dumped in chunks across several processes, and devices kept in a
+            disk store are dumped a few at a time, with the same output as a 
+            regular dump.
+
+        Args:
+            testbed ('dict'): Dictionary containing testbed data.
+            stream ('file'): Where to write the YAML.
+            encode_password ('bool'): Flag for encoding passwords of the stored
+                devices or not.
+
+        """
+        workers = self._dump_workers()
+
+        for key in sorted(testbed):
+            value = testbed[key]
+
+            if isinstance(value, DeviceStore) and value:
+                entries = self._stored_entries(value, encode_password)
+            elif workers > 1 and isinstance(value, dict) and \
+                    len(value) >= self._PARALLEL_MINIMUM and \
+                    not self._has_shared_blocks(value):
+                try:
+                    entries = iter(sorted(value.items(), 
+                                                    key=lambda item: item[0]))
+                except TypeError:
+                    # Names of different types, let YAML handle the order
+                    entries = None
+            else:
+                entries = None
+
+            if entries is None:
+                yaml.dump({key: value}, stream, Dumper=Dumper, 
+                                                    default_flow_style=False)
+            else:
+                self._dump_chunks(key, entries, len(value), stream, workers)
+
+    def _dump_workers(self):
+        """ Helper to find the number of processes dumping large sections,
+            see '_default_workers'.
+
+        Returns:
+            int: The number of processes, 1 to dump in the current process.
+
+        """
+        return _default_workers(self._serialize_workers)
+
+    def _stored_entries(self, devices, encode_password):
+        """ Helper to read the devices of a disk store, encoding their passwords
+            if requested.
+
+        Args:
+            devices ('DeviceStore'): The stored devices.
+            encode_password ('bool'): Flag for encoding passwords or not.
+
+        Yields:
+            tuple: The name and data of every device, in name order.
+
+        """
+        for name, device in devices.items():
+            if encode_password:
+                self._encode_all_password(device)
+
+            yield name, device
+
+    def _has_shared_blocks(self, value):
+        """ Helper to check if some blocks of testbed data are the same object,
+            which YAML dumps as anchors and aliases. Such data cannot be dumped
+            in separate chunks.
+
+        Args:
+            value ('dict'): The testbed data.
+
+        Returns:
+            bool: True if a dictionary or a list is found twice.
+
+        """
+        visited = set()
+        stack = [value]
+
+        while stack:
+            current = stack.pop()
+            items = current.values() if isinstance(current, dict) else current
+
+            for item in items:
+                if isinstance(item, (dict, list)):
+                    if id(item) in visited:
+                        return True
+                    visited.add(id(item))
+                    stack.append(item)
+
+        return False
+
+    def _dump_chunks(self, key, entries, count, stream, workers):
+        """ Dumps the entries of a testbed section in chunks, in worker 
+            processes if there are several workers, and writes the fragments
+            in order. Each chunk is dumped under the same key so that the 
+            indentation matches, and only the first fragment keeps its key 
+            line.
+
+        Args:
+            key ('str'): The section key, such as 'devices'.
+            entries ('iterator'): The name and data pairs, in name order.
+            count ('int'): The number of entries.
+            stream ('file'): Where to write the YAML.
+            workers ('int'): The number of worker processes.
+
+        """
+        # A few chunks per worker balance the load, and a bounded chunk size
+        # bounds the memory used by stored devices
+        size = min(max(-(-count // (workers * 4)), 1), self._CHUNK_SIZE)
+        chunks = iter(lambda: list(itertools.islice(entries, size)), [])
+        fragments = 0
+
+        def write(fragment):
+            nonlocal fragments
+            stream.write(fragment if fragments == 0 else 
+                                        fragment[fragment.index('\n') + 1:])
+            fragments += 1
+
+        if workers == 1:
+            for chunk in chunks:
+                write(_dump_entries(key, chunk))
+            return
+
+        with _process_pool(workers) as executor:
+            # Keep a bounded number of chunks in flight, so that stored 
+            # devices are not all read in memory at once
+            pending = deque()
+
+            for chunk in chunks:
+                pending.append(executor.submit(_dump_entries, key, chunk))
+
+                if len(pending) >= workers * 2:
+                    write(pending.popleft().result())
+
+            while pending:
+                write(pending.popleft().result())
+
     def _construct_yaml(self, devices):
         """ Construct list of dicts containing device data into nested yaml 
             structure.
@@ -340,72 +1062,82 @@ class TestbedCreator(BaseTestbedLoader):
         Returns:
              dict: Testbed dictionary that's ready to be dumped into yaml.
     
+        """
+        return self._merge_devices(self._construct_devices(devices))
+
+    def _construct_devices(self, devices):
+        """ Constructs the testbed data of each device, one row at a time.
+            Rows with the same columns share a schema compiled once, see
+            'RowSchema'.
+
+        Args:
+            devices ('iterable'): Dicts containing device attributes.
+
+        Yields:
+            tuple: The device name, its testbed data and None, or the device
+                name, None and the error message if the row is invalid. The
+                name is None for an empty line.
+
+        """
+        enable_column = 'enable_password' in self._keys
+        schemas = {}
+
+        for row in devices:
+            columns = tuple(row)
+            schema = schemas.get(columns)
+            if schema is None:
+                schema = schemas[columns] = RowSchema(columns, enable_column)
+
+            yield schema.device(tuple(row.values()))
+
+    def _merge_devices(self, entries):
+        """ Collects constructed devices into testbed data, checking that
+            hostnames are unique.
+
+        Args:
+            entries ('iterable'): The name, testbed data and error message of
+                each device, see '_construct_devices'.
+
+        Returns:
+             dict: Testbed dictionary that's ready to be dumped into yaml.
+
         """
         yaml_dict = {
             'devices': {}
         }
-        seen_hostnames = set()
-        for row in devices:
-            try:
-                name = row.pop('hostname')
-            except KeyError:
-                raise KeyError('Empty line found in given CSV/Excel file.')
+        # Report all the invalid rows at once
+        errors = []
+        with _paused_gc():
+            self._collect_devices(yaml_dict, entries, errors)
 
-            if name in seen_hostnames:
-                raise Exception('Duplicate hostname "{n}" detected'
-                                                                .format(n=name))
-            else:
-                seen_hostnames.add(name)
-
-            try:
-                # get port from ip
-                address = re.split(':| +', row['ip'].strip())
-                row['ip'] = address[0]
-                port = row.pop('port', address[1] if len(address) > 1 else None)
-                os = row.pop('os')
-
-                # build the connection dict
-                connections = {
-                    'cli': {
-                        'ip': row.pop('ip'),
-                        'protocol': row.pop('protocol')}}
-
-                if port:
-                    connections['cli'].update({'port': int(port)})
-
-                # build the credentials dict
-                password = row.pop('password', '%ASK{}')
-                if 'enable_password' in self._keys:
-                    enable_password = row.pop('enable_password', '%ASK{}')
-                else:
-                    enable_password = row.pop('enable_password', password)
-                credentials = {
-                    'default': {
-                        'username': row.pop('username'),
-                        'password': password},
-                    'enable': {
-                        'password':  enable_password
-                    }}
-
-            except KeyError as e:
-                raise KeyError('Missing required key {k} for device {d}'
-                                                    .format(k=str(e), d=name))
-            dev = yaml_dict['devices'].setdefault(name, {})
-            dev['os'] = os
-            dev['connections'] = connections
-            dev['credentials'] = credentials
-            type = row.get('type')
-            dev['type'] = type if type else os
-            if row and len(row) > 0:
-                for key, value in row.items():
-                    if 'custom:' in key:
-                        dev.setdefault('custom', {}).setdefault(
-                            key.replace('custom:', ''), value)
-                    else:
-                        dev.setdefault(key, value)
+        if errors:
+            raise Exception('\n'.join(errors))
 
         return yaml_dict
 
+    def _collect_devices(self, yaml_dict, entries, errors):
+        """ Helper to add constructed devices to testbed data.
+
+        Args:
+            yaml_dict ('dict'): The testbed data.
+            entries ('iterable'): The name, testbed data and error message of
+                each device.
+            errors ('list'): The error messages, to add to.
+
+        """
+        for name, dev, error in entries:
+            if name is not None and name in yaml_dict['devices']:
+                errors.append('Duplicate hostname "{n}" detected'
+                                                                .format(n=name))
+                continue
+
+            if error:
+                errors.append(error)
+                continue
+
+            yaml_dict['devices'][name] = dev
+            yaml_dict['devices'] = self._bounded_devices(yaml_dict['devices'])
+
     def print_result(self):
         """ Prints the result of testbed creating process.
 
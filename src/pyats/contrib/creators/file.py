@@ -1,10 +1,120 @@
+import io
 import os
-import xlrd
 import csv
+import json
+import mmap
+import marshal
+import yaml
+import pickle
+import locale
+import logging
+import hashlib
 import pathlib
+import itertools
+import contextlib
 
-from pyats.topology import loader
-from .creator import TestbedCreator
+from concurrent.futures import as_completed
+from .creator import TestbedCreator, _paused_gc, _default_workers, \
+                                                                _process_pool
+from .libs import compression
+from .libs.schema import _FIXED
+
+logger = logging.getLogger(__name__)
+
+def _convert_file(arguments, input_file, output, source):
+    """ Converts a file of a folder into a testbed file. Defined at module
+        level so that it can be sent to worker processes.
+
+    Args:
+        arguments ('dict'): Arguments of the creator of the folder.
+        input_file ('str'): Path of the file to convert.
+        output ('str'): Where to save the testbed file.
+        source ('str'): The folder, under which the result is reported.
+
+    Returns:
+        tuple: The result of the conversion and the files written, None if a
+            testbed file could not be written.
+
+    """
+    creator = File(parse_cli=False, **dict(arguments, path=input_file))
+    testbed = creator._generate_testbed()
+
+    # The sheets of a workbook are saved in a folder named after it
+    if isinstance(testbed, list):
+        root = os.path.splitext(output)[0]
+        for base, item in testbed:
+            creator._write_testbed(os.path.join(root, base), item, 
+                                    creator._encode_password, input_file=source)
+    else:
+        creator._write_testbed(output, testbed, creator._encode_password, 
+                                                            input_file=source)
+
+    # Write errors are reported under the folder, like the testbed files, and
+    # are moved under the file so that the files do not overwrite each other
+    errors = creator._result['errored']
+    name = source.lstrip('./')
+    if name not in errors:
+        return creator._result, creator._outputs
+
+    errors[os.path.relpath(input_file, source)] = errors.pop(name)
+    return creator._result, None
+
+def _parse_csv_chunk(file_name, start, end, keys):
+    """ Constructs the devices of a range of lines of a CSV file. Defined at
+        module level so that it can be sent to worker processes.
+
+    Args:
+        file_name ('str'): Path of the CSV file.
+        start ('int'): Offset of the first line of the range.
+        end ('int'): Offset after the last line of the range.
+        keys ('list'): The header of the file.
+
+    Returns:
+        tuple: The number of quotes in the range, and the name, testbed data
+            and error message of each device, marshalled. The devices are None
+            if the number of quotes is odd, as a quoted value then spans a
+            boundary.
+
+    """
+    with open(file_name, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = mapped[start:end]
+
+    # Quotes come in pairs in complete rows
+    quotes = data.count(b'"')
+    if quotes % 2:
+        return quotes, None
+
+    text = data.decode(locale.getpreferredencoding(False))
+    rows = csv.reader(io.StringIO(text, newline=''))
+
+    creator = File(parse_cli=False, path=file_name)
+    creator._keys = keys
+
+    # The devices hold no reference cycles, collecting garbage while they are
+    # created only slows down the parsing. Marshal is much faster than pickle
+    # for plain data.
+    with _paused_gc():
+        return quotes, marshal.dumps(list(creator._construct_devices(
+                    {k: v for k, v in zip(keys, row) if v} for row in rows)))
+
+def _parse_sheet(file_name, sheet):
+    """ Constructs the devices of a sheet of an Excel workbook. Defined at 
+        module level so that it can be sent to worker processes.
+
+    Args:
+        file_name ('str'): Path of the workbook.
+        sheet ('str'): The sheet name.
+
+    Returns:
+        list: The name, testbed data and error message of each device.
+
+    """
+    creator = File(parse_cli=False, path=file_name)
+
+    with _paused_gc():
+        rows = creator._read_excel(file_name, sheet)
+        return list(creator._construct_devices(rows))
 
 class File(TestbedCreator):
     """ File class (TestbedCreator)
@@ -13,10 +123,59 @@ class File(TestbedCreator):
     corresponding testbed object or file. Alternatively, it can take in a folder
     as path and converts all the CSV and Excel files inside.
 
+    Parquet, Arrow and Feather files are read through pyarrow, which must be
+    installed separately: pip install pyats.contrib[arrow].
+
+    Input files compressed with gzip, xz or zstandard ('.csv.gz', '.xlsx.xz',
+    ...) are decompressed as a stream. Testbed YAML files, compressed or not, 
+    are loaded as they are, so that generated testbeds can be loaded back or
+    converted again.
+
+    The files of a folder can also be merged into a single testbed, where
+    devices whose hostname is already defined by a previous file are skipped
+    and devices sharing a connection address with another one are reported,
+    with the file and row of both.
+
+    When converting a folder, a '.file_manifest.json' file in the output
+    folder keeps the size, modification time and content hash of every input
+    file along with the testbed files generated from it. Files unchanged since
+    the previous run are skipped, and the testbed files of deleted inputs are
+    removed.
+
+    Excel workbooks are read from their first sheet. Every sheet, or a 
+    selection of them, can be read instead, either as one testbed per sheet
+    named after it, or merged into a single testbed.
+
+    In watch mode, the file or folder is converted again whenever it changes,
+    until interrupted. Changes are notified by the operating system when 
+    watchdog is installed (pip install watchdog), and polled for otherwise. 
+    Testbed files are always replaced at once, so that they are never read 
+    partially written.
+
     Args:
-        path ('str'): The path of the input CSV/Excel file or a folder.
+        path ('str'): The path of the input CSV/Excel/Parquet/Arrow file or a
+            folder.
         recurse ('bool') default=False: If a folder is passed in, whether or not 
             traversal should include subdirectories.
+        workers ('int') default=None: Number of processes converting the files
+            of a folder, the chunks of a large CSV file or the sheets of a
+            workbook, the number of CPUs by default from the main thread and
+            1 from other threads.
+        full ('bool') default=False: Convert every file of a folder, even the
+            ones unchanged since the previous run.
+        merge ('bool') default=False: Merge the files of a folder into a 
+            single testbed.
+        sheets ('list') default=None: The sheets of Excel workbooks to read, 
+            or 'all' for every sheet. Only the first sheet is read by default.
+        merge_sheets ('bool') default=False: Merge the devices of the sheets
+            into one testbed instead of one testbed per sheet.
+        columns ('list') default=None: The columns of Parquet, Arrow and 
+            Feather files to read besides the connection and credential ones,
+            all of them by default.
+        watch ('bool') default=False: Keep converting the path whenever it 
+            changes, until interrupted.
+        debounce ('float') default=1: Number of seconds without change before
+            converting again, in watch mode.
         encode_password ('bool') default=False: Should generated testbed encode 
             its passwords.
 
@@ -25,10 +184,24 @@ class File(TestbedCreator):
     --path=value        |  path=value
     --encode-password   |  encode_password=True
     -r                  |  recurse=True
+    --workers=value     |  workers=value
+    --full              |  full=True
+    --merge             |  merge=True
+    --sheets s1 s2 ...  |  sheets=['s1', 's2', ...]
+    --merge-sheets      |  merge_sheets=True
+    --columns c1 c2 ... |  columns=['c1', 'c2', ...]
+    --watch             |  watch=True
+    --debounce=value    |  debounce=value
+    --record=value      |  record=value
+    --replay=value      |  replay=value
 
     pyATS Examples:
         pyats create testbed file --path=test.csv --output=testbed.yaml
         pyats create testbed file --path=folder --output=testbeds -r
+        pyats create testbed file --path=test.csv.gz --output=testbed.yaml.gz
+        pyats create testbed file --path=sites.xlsx --output=sites --sheets all
+        pyats create testbed file --path=folder --output=testbeds --watch
+        pyats create testbed file --path=folder --output=lab.yaml --merge -r
 
     Examples:
         # Create testbed from test.csv with encoded password
@@ -38,6 +211,23 @@ class File(TestbedCreator):
 
     """
 
+    _cpu_bound = True
+
+    # Manifest of the converted files, in the output folder
+    _MANIFEST = '.file_manifest.json'
+
+    # Size from which CSV files are parsed in chunks by several processes, and
+    # minimum size of a chunk
+    _CHUNKED_MINIMUM = 32 * 1024 * 1024
+    _CHUNK_MINIMUM = 4 * 1024 * 1024
+
+    # Pool of worker processes kept from one conversion to the next in watch
+    # mode
+    _pool = None
+
+    # Row number of each hostname of the file being read, while merging
+    _rows = None
+
     def _init_arguments(self):
         """ Specifies the arguments for the creator.
 
@@ -46,12 +236,22 @@ class File(TestbedCreator):
 
         """
         self._cli_replacements.setdefault('-r', ('recurse', True))
+        self._cli_list_arguments.append('--sheets')
+        self._cli_list_arguments.append('--columns')
         
         return {
             'required': ['path'],
             'optional': {
                 'recurse': False,
-                'encode_password': False
+                'encode_password': False,
+                'workers': None,
+                'full': False,
+                'merge': False,
+                'sheets': None,
+                'merge_sheets': False,
+                'columns': None,
+                'watch': False,
+                'debounce': 1
             }
         }
 
@@ -65,17 +265,105 @@ class File(TestbedCreator):
             bool: Indication that the operation is successful or not.
         
         """
-        testbed = self._generate()
+        if self._watch:
+            self._watch_path(output_location)
+        else:
+            self._convert(output_location)
+
+        return True
+
+    def _convert(self, output_location, changed=None):
+        """ Converts the source data into testbed files.
+
+        Args:
+            output_location ('str'): Where to save the files.
+            changed ('set') default=None: The absolute paths of the files
+                changed since the previous conversion of a folder, if known.
+
+        """
+        if self._convert_folder(output_location, changed):
+            return
+
+        testbed = self._generate_testbed()
 
         if isinstance(testbed, list):
             for base, item in testbed:
-                self._write_yaml(os.path.join(output_location, base), 
+                self._write_testbed(os.path.join(output_location, base), 
                             item, self._encode_password, input_file=self._path)
         else:
-            self._write_yaml(output_location, testbed, self._encode_password,
-                                                        input_file=self._path)
+            self._write_testbed(output_location, testbed, 
+                                self._encode_password, input_file=self._path)
 
-        return True
+    def _watch_path(self, output_location):
+        """ Converts the path, then again whenever it changes, in the same 
+            process, until interrupted. The changes are watched from before
+            the first conversion, so that none is missed, and folders only
+            convert their changed files again. The worker processes are kept
+            from one conversion to the next.
+
+        Args:
+            output_location ('str'): Where to save the files.
+
+        """
+        # watchdog is only imported in watch mode
+        from .libs.watcher import Watcher
+
+        # Testbed files written into the folder itself are skipped when the
+        # folder is converted
+        folder = os.path.isdir(self._path) and os.path.abspath(
+                            output_location) != os.path.abspath(self._path)
+        watcher = Watcher(self._path, recursive=self._recurse, 
+                                    ignore=output_location if folder else None)
+
+        workers = _default_workers(self._workers)
+        if workers > 1:
+            self._pool = _process_pool(workers, threaded=True)
+
+        changed = None
+        try:
+            while True:
+                try:
+                    self._convert(output_location, changed)
+                except Exception as e:
+                    self._result['errored'][self._path] = \
+                                        'has an error: {e}'.format(e=str(e))
+                self.print_result()
+
+                if changed is None:
+                    logger.info('Watching {p} for changes, press Ctrl+C to '
+                                                'stop'.format(p=self._path))
+
+                changed = watcher.wait(debounce=float(self._debounce))
+                logger.info('{n} file(s) changed, converting'.format(
+                                                            n=len(changed)))
+                self._result = {'success': {}, 'errored': {}, 'warning': {}}
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.stop()
+
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    @contextlib.contextmanager
+    def _worker_pool(self, workers):
+        """ Helper to get a pool of worker processes, the one kept in watch
+            mode if any, see '_process_pool'.
+
+        Args:
+            workers ('int'): The number of processes of a new pool.
+
+        Yields:
+            Executor: The pool.
+
+        """
+        if self._pool is not None:
+            yield self._pool
+            return
+
+        with _process_pool(workers) as executor:
+            yield executor
 
     def to_testbed_object(self):
         """ Creates testbed object from the source data.
@@ -84,7 +372,7 @@ class File(TestbedCreator):
             Testbed: The created testbed.
         
         """
-        testbed = self._generate()
+        testbed = self._generate_testbed()
         
         if isinstance(testbed, list):
             return [self._create_testbed(data) for _, data in testbed]
@@ -95,37 +383,721 @@ class File(TestbedCreator):
         """ Core implementation of how the testbed data is created.
 
         Returns: 
-            dict: The intermediate testbed dictionary.
+            dict: The intermediate testbed dictionary, or list: the file names
+                and testbed data of a folder or of the sheets of a workbook.
 
         """
-        if not os.path.exists(self._path):
-            raise FileNotFoundError('File or directory does not exist: %s' 
-                                                                % self._path)
-        
-        # if is a dir then walk through it
-        if os.path.isdir(self._path):
+        files = self._source_data('files', self._list_files)
+
+        if files is not None and self._merge:
+            return self._merge_files(files)
+
+        # if is a dir then convert every file in it
+        if files is not None:
             result = []
+            clashing = self._clashing(os.path.relpath(input_file, self._path)
+                                                    for input_file in files)
 
-            for root, _, files in os.walk(self._path):
-                for file in files:
-                    input_file = os.path.join(root, file)
-                    relative = os.path.relpath(input_file, self._path)
-                    devices = self._read_device_data(input_file)
+            for input_file in files:
+                relative = os.path.relpath(input_file, self._path)
+                if relative in clashing:
+                    continue
 
-                    # The testbed filename should be same as the file
-                    output = os.path.splitext(relative)[0] + '.yaml'
+                # An invalid file does not stop the conversion of the others
+                try:
+                    testbed = self._file_testbed(input_file)
+                except Exception as e:
+                    self._result['errored'][relative] = 'has an error: {e}'\
+                                                            .format(e=str(e))
+                    continue
 
-                    result.append((output, self._construct_yaml(devices)))
-            
-                # if recursive option is not set, then stop after first level
-                if not self._recurse:
-                    break
+                # The testbed filename should be same as the file
+                root = compression.split_extension(relative)[0]
+
+                if isinstance(testbed, list):
+                    result.extend((os.path.join(root, base), item) 
+                                                    for base, item in testbed)
+                else:
+                    result.append((root + '.yaml', testbed))
         else:
-            devices = self._read_device_data(self._path)
-            return self._construct_yaml(devices)
+            return self._file_testbed(self._path)
         
         return result
 
+    def _convert_folder(self, output_location, changed=None):
+        """ Converts the files of a folder, writing each testbed file as soon
+            as it is converted. Files unchanged since the previous conversion
+            into the same output folder are skipped, and the testbed files of
+            deleted inputs are removed. An error in a file is reported without
+            stopping the conversion of the others.
+
+            Snapshots use the regular path.
+
+        Args:
+            output_location ('str'): The folder where to save the files.
+            changed ('set') default=None: The absolute paths of the files
+                changed since the previous conversion, if known. The other
+                files are then not checked.
+
+        Returns:
+            bool: Whether the folder is converted, False if the regular path
+                should be used instead.
+
+        """
+        if self._record or self._replay or self._merge or \
+                                                not os.path.isdir(self._path):
+            return False
+
+        location = os.path.join(output_location, self._MANIFEST)
+        previous = self._load_manifest(location)
+        files, entries = self._changed_files(output_location, previous, 
+                                                                    changed)
+
+        # Clashing files keep their previous testbed files, and are converted
+        # again once renamed
+        clashing = self._clashing(entries)
+        files = [input_file for input_file in files if 
+                    os.path.relpath(input_file, self._path) not in clashing]
+        for relative in clashing:
+            entry = previous['files'].get(relative)
+            if entry:
+                entries[relative] = dict(entry, size=None, hash=None)
+            else:
+                del entries[relative]
+
+        # Testbed files of the inputs which no longer exist
+        for relative, entry in previous['files'].items():
+            if relative not in entries:
+                self._remove_outputs(output_location, entry['outputs'])
+
+        written = self._convert_files(output_location, files)
+
+        for relative, outputs in written.items():
+            entry = entries[relative]
+
+            # A failed file keeps its previous testbed files and is converted
+            # again on the next run
+            if outputs is None:
+                entry['size'] = entry['hash'] = None
+                continue
+
+            self._remove_outputs(output_location, 
+                                        set(entry['outputs']) - set(outputs))
+            entry['outputs'] = outputs
+
+        skipped = len(set(entries) - clashing) - len(files)
+        if skipped:
+            name = self._path.lstrip('./')
+            self._result['success'].setdefault(name, '')
+            self._result['success'][name] += \
+                            '{n} unchanged file(s) skipped\n'.format(n=skipped)
+
+        if entries or previous['files']:
+            self._save_manifest(location, entries)
+
+        return True
+
+    def _clashing(self, relatives):
+        """ Helper to find the files of the folder whose testbed file would be
+            the same as the one of another file, such as 'lab.csv' and 
+            'lab.yaml', and report them as errors.
+
+        Args:
+            relatives ('iterable'): The paths of the files, relative to the
+                folder.
+
+        Returns:
+            set: The paths of the clashing files.
+
+        """
+        targets = {}
+        for relative in sorted(relatives):
+            targets.setdefault(compression.split_extension(relative)[0], 
+                                                            []).append(relative)
+
+        clashing = set()
+        for names in targets.values():
+            if len(names) < 2:
+                continue
+
+            clashing.update(names)
+            for relative in names:
+                self._result['errored'][relative] = 'has the same testbed '\
+                    'file as {o}'.format(o=', '.join(name for name in names 
+                                                        if name != relative))
+
+        return clashing
+
+    def _merge_files(self, files):
+        """ Merges the files of a folder into a single testbed, in one pass.
+            Hostnames and connection addresses are indexed across all the 
+            files: a device whose hostname is already defined is skipped, and
+            devices sharing a connection IP and port are reported, along with
+            the file and row of the first definition.
+
+            An invalid file is reported without stopping the merge of the
+            others. Rows of CSV and Excel files are numbered as in the file,
+            the header being row 1, other devices are referred to by their
+            file only.
+
+        Args:
+            files ('list'): The paths of the files of the folder.
+
+        Returns:
+            dict: The merged testbed data, or None if there is no device.
+
+        """
+        testbed = {'devices': {}}
+        hostnames = {}
+        addresses = {}
+
+        # The first definition of a hostname is the same on every run
+        for input_file in sorted(files):
+            relative = os.path.relpath(input_file, self._path)
+
+            # The readers note the row of each hostname as they read them
+            self._rows = {}
+            try:
+                data = self._file_testbed(input_file)
+            except Exception as e:
+                self._result['errored'][relative] = 'has an error: {e}'\
+                                                            .format(e=str(e))
+                continue
+            finally:
+                rows, self._rows = self._rows, None
+
+            # Sheets of a workbook are referred to by their name
+            items = [('{f} [{s}]'.format(f=relative, s=os.path.splitext(base)
+                        [0]), item) for base, item in data] \
+                            if isinstance(data, list) else [(relative, data)]
+
+            # Rows of several sheets cannot be told apart
+            if self._sheets and compression.split_extension(input_file)[1] \
+                                                    in {'.xls', '.xlsx'}:
+                rows = {}
+
+            for source, item in items:
+                self._merge_file(testbed, item, source, rows, hostnames, 
+                                                                    addresses)
+
+        return testbed if testbed['devices'] else None
+
+    def _merge_file(self, testbed, data, source, rows, hostnames, addresses):
+        """ Helper to merge the testbed data of a file into the merged 
+            testbed.
+
+        Args:
+            testbed ('dict'): The merged testbed data.
+            data ('dict'): The testbed data of the file.
+            source ('str'): The file name, for the references.
+            rows ('dict'): Mapping of the hostnames of the file to their row,
+                if known.
+            hostnames ('dict'): Mapping of the merged hostnames to the file
+                and row defining them.
+            addresses ('dict'): Mapping of the merged connection IP and port
+                to the hostname, file and row using them.
+
+        """
+        for key, value in data.items():
+            if key not in ('devices', 'topology'):
+                testbed.setdefault(key, value)
+
+        topology = data.get('topology') or {}
+
+        for name, device in data['devices'].items():
+            reference = '{s} row {r}'.format(s=source, r=rows[name]) \
+                                                if name in rows else source
+            key = '{n} in {r}'.format(n=name, r=reference)
+
+            if name in hostnames:
+                self._result['warning'][key] = 'hostname is already defined '\
+                                'in {o}, skipping'.format(o=hostnames[name])
+                continue
+
+            hostnames[name] = reference
+
+            for connection in (device.get('connections') or {}).values():
+                if not isinstance(connection, dict) or 'ip' not in connection:
+                    continue
+
+                address = (str(connection['ip']), str(connection.get('port')))
+                other = addresses.setdefault(address, (name, reference))
+                if other[0] != name:
+                    self._result['warning'][key] = 'uses the same address as '\
+                                'device {d} in {o}'.format(d=other[0], o=other[1])
+
+            testbed['devices'][name] = device
+            testbed['devices'] = self._bounded_devices(testbed['devices'])
+
+            if name in topology:
+                testbed.setdefault('topology', {})[name] = topology[name]
+
+    def _fingerprint(self):
+        """ Helper to compute a hash of the arguments affecting the content of
+            the testbed files, so that changing them converts every file again.
+
+        Returns:
+            str: The hash of the arguments.
+
+        """
+        arguments = self._arguments()
+        for name in ('path', 'recurse', 'workers', 'full', 'watch', 
+                        'debounce', 'serialize_workers', 'store_threshold', 
+                                                            'lazy_testbed'):
+            arguments.pop(name, None)
+
+        return hashlib.sha256(json.dumps(arguments, sort_keys=True, 
+                                default=self._identity).encode()).hexdigest()
+
+    def _identity(self, value):
+        """ Helper to represent an argument value that is not JSON, such as a
+            'shard_by' callable or a transform stage, the same way in every 
+            run. Unlike their repr, it does not contain their address.
+
+        Args:
+            value ('object'): The argument value.
+
+        Returns:
+            str or dict: The representation of the value.
+
+        """
+        code = getattr(value, '__code__', None)
+        if code is not None:
+            # Functions of the same name, such as lambdas, differ by their 
+            # instructions and constants, wherever they are defined
+            def instructions(code):
+                return code.co_code, code.co_names, tuple(
+                    instructions(constant) if isinstance(constant, type(code))
+                        else constant for constant in code.co_consts)
+
+            return '{m}.{n}:{h}'.format(m=value.__module__, 
+                    n=value.__qualname__, h=hashlib.sha256(
+                        marshal.dumps(instructions(code))).hexdigest())
+
+        if hasattr(value, '__qualname__'):
+            return '{m}.{n}'.format(m=value.__module__, n=value.__qualname__)
+
+        if hasattr(value, '__dict__'):
+            return dict(vars(value), __class__=type(value))
+
+        return str(value)
+
+    def _hash_file(self, path):
+        """ Helper to compute the content hash of a file.
+
+        Args:
+            path ('str'): The file path.
+
+        Returns:
+            str: The hash of the file.
+
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+        return digest.hexdigest()
+
+    def _load_manifest(self, location):
+        """ Loads the manifest of the previous conversion of the folder.
+
+        Args:
+            location ('str'): The manifest path.
+
+        Returns:
+            dict: The argument fingerprint and the entries of the input files,
+                empty if there is no valid manifest.
+
+        """
+        try:
+            with open(location) as f:
+                manifest = json.load(f)
+            manifest['files'] = dict(manifest['files'])
+            return manifest
+        except (OSError, ValueError, KeyError, TypeError):
+            return {'arguments': None, 'files': {}}
+
+    def _save_manifest(self, location, entries):
+        """ Saves the manifest of the folder, replacing the previous one only
+            once it is completely written.
+
+        Args:
+            location ('str'): The manifest path.
+            entries ('dict'): The entries of the input files.
+
+        """
+        os.makedirs(os.path.dirname(location) or '.', exist_ok=True)
+
+        with compression.atomic_file(location) as f:
+            json.dump({'arguments': self._fingerprint(), 'files': entries}, 
+                                                f, indent=1, sort_keys=True)
+
+    def _changed_files(self, output_location, previous, changed=None):
+        """ Finds the files of the folder to convert. A file is unchanged if
+            its size and modification time, or else its content hash, are the
+            ones in the manifest, and its testbed files still exist.
+
+        Args:
+            output_location ('str'): The folder where to save the files.
+            previous ('dict'): The manifest of the previous conversion.
+            changed ('set') default=None: The absolute paths of the files
+                changed since the previous conversion, if known. Only they are
+                checked, the other files keep their manifest entry.
+
+        Returns:
+            tuple: The paths of the files to convert, and the manifest entries
+                of every file of the folder.
+
+        """
+        fresh = not self._full and previous['arguments'] == self._fingerprint()
+        files = []
+        entries = {}
+        inputs = None
+
+        if fresh and changed is not None:
+            changed = {os.path.relpath(path, self._path) for path in changed}
+            entries = {relative: entry for relative, entry in 
+                        previous['files'].items() if relative not in changed}
+            inputs = [os.path.join(self._path, relative) for relative in 
+                            sorted(changed) if os.path.isfile(os.path.join(
+                                                    self._path, relative))]
+
+        # Testbed files written into the folder itself are not inputs
+        generated = {os.path.normpath(output) for entry in 
+                    previous['files'].values() for output in entry['outputs']}
+        inside = os.path.abspath(output_location) == os.path.abspath(self._path)
+
+        if inputs is None:
+            inputs = self._list_files(output_location)
+
+        for input_file in inputs:
+            relative = os.path.relpath(input_file, self._path)
+            if inside and relative in generated and \
+                                            relative not in previous['files']:
+                continue
+
+            stat = os.stat(input_file)
+            current = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+            entry = previous['files'].get(relative)
+
+            exists = entry and all(os.path.exists(os.path.join(
+                        output_location, output)) for output in entry['outputs'])
+
+            if fresh and exists:
+                if entry['size'] == current['size'] and \
+                                            entry['mtime'] == current['mtime']:
+                    entries[relative] = entry
+                    continue
+
+                current['hash'] = self._hash_file(input_file)
+                if entry['hash'] == current['hash']:
+                    entries[relative] = dict(entry, **current)
+                    continue
+
+            if 'hash' not in current:
+                current['hash'] = self._hash_file(input_file)
+            current['outputs'] = entry['outputs'] if entry else []
+            entries[relative] = current
+            files.append(input_file)
+
+        return files, entries
+
+    def _remove_outputs(self, output_location, outputs):
+        """ Helper to remove testbed files of the output folder.
+
+        Args:
+            output_location ('str'): The output folder.
+            outputs ('list'): The testbed file paths, relative to the folder.
+
+        """
+        root = os.path.abspath(output_location)
+
+        for output in outputs:
+            path = os.path.abspath(os.path.join(root, output))
+
+            # Never remove anything outside of the output folder
+            if os.path.commonpath([root, path]) != root:
+                continue
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _convert_files(self, output_location, files):
+        """ Converts files of the folder into testbed files. The files are
+            converted in a pool of processes, unless a single worker is
+            requested or the arguments cannot be sent to other processes, such
+            as lambda transforms.
+
+        Args:
+            output_location ('str'): The folder where to save the files.
+            files ('list'): The paths of the files to convert.
+
+        Returns:
+            dict: Mapping of the files, relative to the folder, to the testbed
+                files written relative to the output folder, or None if the
+                conversion failed.
+
+        """
+        workers = _default_workers(self._workers)
+        arguments = self._arguments()
+        # Each file is converted by a single process, the pool being already
+        # as large as requested
+        arguments['workers'] = arguments['serialize_workers'] = 1
+        written = {}
+
+        tasks = []
+        for input_file in files:
+            relative = os.path.relpath(input_file, self._path)
+            output = os.path.join(output_location, 
+                            compression.split_extension(relative)[0] + '.yaml')
+            tasks.append((relative, 
+                                (arguments, input_file, output, self._path)))
+
+        def collect(relative, convert):
+            try:
+                result, outputs = convert()
+            except Exception as e:
+                self._result['errored'][relative] = 'has an error: {e}'\
+                                                            .format(e=str(e))
+                written[relative] = None
+                return
+
+            self._merge_result(result)
+            written[relative] = None if outputs is None else \
+                [os.path.relpath(output, output_location) for output in outputs]
+
+        parallel = workers > 1 and len(tasks) > 1
+        if parallel:
+            try:
+                pickle.dumps(arguments)
+            except Exception:
+                parallel = False
+
+        if not parallel:
+            for relative, task in tasks:
+                collect(relative, lambda: _convert_file(*task))
+            return written
+
+        with self._worker_pool(workers) as executor:
+            futures = {executor.submit(_convert_file, *task): relative 
+                                                    for relative, task in tasks}
+
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+
+        return written
+
+    def _merge_result(self, result):
+        """ Helper to merge the result of a file conversion into the result
+            of the folder.
+
+        Args:
+            result ('dict'): The result of the file conversion.
+
+        """
+        for status, entries in result.items():
+            for key, value in entries.items():
+                if status == 'success' and key in self._result[status]:
+                    self._result[status][key] += value
+                else:
+                    self._result[status][key] = value
+
+    def _file_testbed(self, file):
+        """ Helper to read a file and construct its testbed data.
+
+        Args:
+            file ('str'): Path of the file.
+
+        Returns:
+            dict: The intermediate testbed dictionary, or list: the file names
+                and testbed data of the sheets of a workbook, when they are not
+                merged.
+
+        """
+        _, extension, _ = compression.split_extension(file)
+
+        if self._sheets and extension in {'.xls', '.xlsx'}:
+            return self._workbook_testbed(file)
+
+        return self._testbed_data(self._read_source_file(file))
+
+    def _workbook_testbed(self, file):
+        """ Constructs the testbed data of the selected sheets of a workbook.
+            Sheets are parsed in a pool of processes, unless a single worker
+            is requested or the rows are recorded or replayed.
+
+        Args:
+            file ('str'): Path of the workbook.
+
+        Returns:
+            dict: The testbed data of the merged sheets, or list: the file 
+                names and testbed data of every sheet.
+
+        """
+        workers = _default_workers(self._workers)
+
+        if self._record or self._replay or workers < 2:
+            def read():
+                sheets = []
+                for sheet in self._sheet_names(file):
+                    rows = list(self._read_excel(file, sheet))
+                    sheets.append((sheet, self._keys, rows))
+                return sheets
+
+            sheets = {}
+            for sheet, keys, rows in self._source_data(file, read):
+                self._keys = keys
+                sheets[sheet] = list(self._construct_devices(rows))
+        else:
+            names = self._sheet_names(file)
+
+            with self._worker_pool(min(workers, len(names))) as executor:
+                futures = [executor.submit(_parse_sheet, file, sheet) 
+                                                            for sheet in names]
+                sheets = {sheet: future 
+                                    for sheet, future in zip(names, futures)}
+
+                for sheet, future in sheets.items():
+                    sheets[sheet] = future.result()
+
+        if self._merge_sheets:
+            entries = itertools.chain.from_iterable(sheets.values())
+            return self._merge_devices(entries)
+
+        # An invalid sheet does not stop the conversion of the others
+        result = []
+        for sheet, entries in sheets.items():
+            try:
+                testbed = self._merge_devices(entries)
+            except Exception as e:
+                self._result['errored']['{f} [{s}]'.format(f=file, s=sheet)] \
+                                        = 'has an error: {e}'.format(e=str(e))
+                continue
+
+            if testbed['devices']:
+                base = sheet.replace(os.sep, '_') + '.yaml'
+                result.append((base, testbed))
+
+        return result
+
+    def _sheet_names(self, file):
+        """ Helper to list the selected sheets of a workbook.
+
+        Args:
+            file ('str'): Path of the workbook.
+
+        Returns:
+            list: The sheet names, in the order of the workbook.
+
+        """
+        source = self._seekable_source(file)
+
+        if compression.split_extension(file)[1] == '.xlsx':
+            import openpyxl
+            workbook = openpyxl.load_workbook(source, read_only=True)
+            names = workbook.sheetnames
+            workbook.close()
+        else:
+            import xlrd
+            if isinstance(source, io.BytesIO):
+                workbook = xlrd.open_workbook(file_contents=source.getvalue(),
+                                                                on_demand=True)
+            else:
+                workbook = xlrd.open_workbook(source, on_demand=True)
+            names = workbook.sheet_names()
+            workbook.release_resources()
+
+        sheets = self._sheets
+        if sheets == 'all' or sheets == ['all']:
+            return names
+
+        sheets = [sheets] if isinstance(sheets, str) else list(sheets)
+        missing = [sheet for sheet in sheets if sheet not in names]
+        if missing:
+            raise Exception('Sheet(s) {m} not found in {f}'.format(
+                                                m=', '.join(missing), f=file))
+
+        return [name for name in names if name in sheets]
+
+    def _testbed_data(self, devices):
+        """ Helper to construct the testbed data from the device data read
+            from a file. Testbed files are already in that format.
+
+        Args:
+            devices ('list' or 'dict'): The device data, or the testbed data.
+
+        Returns:
+            dict: The intermediate testbed dictionary.
+
+        """
+        if isinstance(devices, dict):
+            return devices
+
+        return self._construct_yaml(devices)
+
+    def _list_files(self, output_location=None):
+        """ Lists the files to convert when the path is a folder, leaving out
+            the manifest and the output folder.
+
+        Args:
+            output_location ('str'): The folder where the files are saved, if
+                known.
+
+        Returns:
+            list: The path of the files, or None if the path is a file.
+
+        """
+        if not os.path.exists(self._path):
+            raise FileNotFoundError('File or directory does not exist: %s' 
+                                                                % self._path)
+
+        if not os.path.isdir(self._path):
+            return None
+
+        files = []
+        output = output_location and os.path.abspath(output_location)
+
+        # walk through the folder
+        for root, folders, names in os.walk(self._path):
+            folders[:] = [folder for folder in folders if 
+                        os.path.abspath(os.path.join(root, folder)) != output]
+            files.extend(os.path.join(root, name) for name in names 
+                                                    if name != self._MANIFEST)
+
+            # if recursive option is not set, then stop after first level
+            if not self._recurse:
+                break
+
+        return files
+
+    def _read_source_file(self, file):
+        """ Reads device data through the source snapshot, along with the
+            header of the file.
+
+        Args:
+            file ('str'): Path of the file.
+
+        Returns:
+            iterable: Dictionaries containing device data.
+
+        """
+        def read():
+            devices = self._read_device_data(file)
+
+            # Rows are read lazily, unless they are recorded
+            if self._record and not isinstance(devices, (list, dict)):
+                devices = list(devices)
+
+            return {'keys': self._keys, 'devices': devices}
+
+        data = self._source_data(file, read)
+        self._keys = data['keys']
+
+        return data['devices']
+
     def _read_device_data(self, file):
         """ Read device data based on file type.
 
@@ -133,10 +1105,12 @@ class File(TestbedCreator):
             file ('str'): Path of the file.
         
         Returns:
-            list: List of dictionaries containing device data.
+            iterable: Dictionaries containing device data, or the testbed data
+                for testbed files.
 
         """
-        _, extension = os.path.splitext(file)
+        # Compressed files are named after the format of their content
+        _, extension, _ = compression.split_extension(file)
         
         # Check if file is csv or xls
         devices = {}
@@ -145,48 +1119,390 @@ class File(TestbedCreator):
             devices = self._read_csv(file)
         elif extension in {'.xls', '.xlsx'}:
             devices = self._read_excel(file)
+        elif extension in {'.parquet', '.arrow', '.feather'}:
+            devices = self._read_columnar(file)
+        elif extension in {'.yaml', '.yml'}:
+            devices = self._read_testbed(file)
         else:
-            raise Exception("Given path is not a folder or a CSV/Excel file.")
+            raise Exception("Given path is not a folder or a CSV/Excel/Parquet/"
+                                                            "Arrow file.")
 
         return devices
 
     def _read_csv(self, file_name):
-        """ Reads CSV file containing device data.
+        """ Reads CSV file containing device data. The header is read right
+            away, the rows are read as they are consumed. Large files are 
+            parsed in chunks by several processes instead.
 
         Args:
             file_name ('str'): Name of the CSV file.
 
         Returns:
-            list: List of dictionaries containing the device attributes from 
-                each row of the file.
+            generator: The dictionaries containing the device attributes from 
+                each row of the file, or dict: the testbed data if the file is
+                parsed in chunks.
 
         """
-        row_lst = []
-        with open(file_name, 'r') as f:
+        testbed = self._read_csv_chunks(file_name)
+        if testbed is not None:
+            return testbed
+
+        f = compression.open_file(file_name)
+
+        try:
             reader = csv.reader(f)
             self._keys = next(reader)
+        except BaseException:
+            f.close()
+            raise
+
+        return self._csv_rows(f, reader, self._keys)
+
+    def _read_csv_chunks(self, file_name):
+        """ Parses a large CSV file in chunks of lines, in a pool of processes.
+            The workers map the file in memory and construct the devices of
+            their chunk, which are then merged in the order of the file so
+            that duplicate hostnames are still detected.
+
+            Compressed files, snapshots, a single worker and files where a
+            quoted value contains a line break use the regular path.
+
+        Args:
+            file_name ('str'): Name of the CSV file.
+
+        Returns:
+            dict: The testbed data, or None if the regular path should be used
+                instead.
+
+        """
+        workers = _default_workers(self._workers)
+
+        # Merged files note the row of every hostname as they are read
+        if workers < 2 or self._record or self._replay or \
+                self._rows is not None or \
+                compression.split_extension(file_name)[2] or \
+                        os.path.getsize(file_name) < self._CHUNKED_MINIMUM:
+            return None
+
+        with open(file_name, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            offset = mapped.find(b'\n') + 1
+            if not offset:
+                return None
+
+            header = mapped[:offset].decode(locale.getpreferredencoding(False))
+            keys = next(csv.reader([header]), [])
+
+            # Several chunks per worker even out their parse time, the 
+            # boundaries are moved to the next line break
+            count = max(1, min(workers * 4, size // self._CHUNK_MINIMUM))
+            ranges = []
+            for index in range(1, count + 1):
+                end = size if index == count else \
+                    mapped.find(b'\n', size * index // count) + 1 or size
+                if end > offset:
+                    ranges.append((offset, end))
+                    offset = end
+
+        with self._worker_pool(workers) as executor:
+            chunks = list(executor.map(_parse_csv_chunk, 
+                                        *zip(*[(file_name, start, end, keys) 
+                                                for start, end in ranges])))
+
+        # A boundary preceded by an odd number of quotes is within a quoted
+        # value containing a line break
+        quotes = header.count('"')
+        for count, devices in chunks:
+            if quotes % 2 or devices is None:
+                return None
+            quotes += count
+
+        self._keys = keys
+
+        return self._merge_devices(itertools.chain.from_iterable(
+                            marshal.loads(devices) for _, devices in chunks))
+
+    def _csv_rows(self, f, reader, keys):
+        """ Helper to read the rows of a CSV file one at a time.
+
+        Args:
+            f ('file'): The CSV file, closed once all the rows are read.
+            reader ('reader'): The CSV reader, past the header.
+            keys ('list'): The header of the file.
+
+        Yields:
+            dict: The device attributes of a row.
+
+        """
+        with f:
+            # A quoted value can span several lines, a row is numbered by its
+            # first line
+            line = reader.line_num
             for row in reader:
                 # Only take key which has value
-                row_lst.append({k: v for k, v in dict(
-                                            zip(self._keys, row)).items() if v})
-        return row_lst
+                device = {k: v for k, v in zip(keys, row) if v}
 
-    def _read_excel(self, file_name):
-        """ Read Excel file containing device data.
+                if self._rows is not None and 'hostname' in device:
+                    self._rows[device['hostname']] = line + 1
+                line = reader.line_num
+
+                yield device
+
+    def _read_excel(self, file_name, sheet=None):
+        """ Read Excel file containing device data. XLSX workbooks are read
+            row by row, XLS workbooks are read through xlrd.
 
         Args:
             file_name ('str'): name of the excel file
+            sheet ('str') default=None: The sheet to read, the first one by 
+                default.
 
         Returns:
-            list: List of dictionaries containing device attributes from each
-                row of the file.
+            iterable: Dictionaries containing device attributes from each row
+                of the file.
 
         """
+        _, extension, compressed = compression.split_extension(file_name)
+        source = self._seekable_source(file_name)
+
+        if extension == '.xlsx':
+            return self._read_xlsx(source, sheet)
+
+        # xlrd is only imported when an Excel file is read
+        import xlrd
+
         row_lst = []
-        ws = xlrd.open_workbook(file_name).sheet_by_index(0)
+
+        if compressed:
+            workbook = xlrd.open_workbook(file_contents=source.getvalue())
+        else:
+            workbook = xlrd.open_workbook(file_name)
+
+        ws = workbook.sheet_by_name(sheet) if sheet is not None \
+                                                else workbook.sheet_by_index(0)
         self._keys = ws.row_values(0)
         for i in range(1, ws.nrows):
             # Only take key which has value
             row_lst.append({k: v for k, v in dict(
                             zip(self._keys, ws.row_values(i))).items() if v})
+
+            if self._rows is not None and 'hostname' in row_lst[-1]:
+                self._rows[row_lst[-1]['hostname']] = i + 1
         return row_lst
+
+    def _seekable_source(self, file_name):
+        """ Helper to get the source to open a workbook or a columnar file
+            from. They need random access, compressed ones are decompressed in
+            memory.
+
+        Args:
+            file_name ('str'): Name of the file.
+
+        Returns:
+            str: The file name, or BytesIO: the decompressed file.
+
+        """
+        if not compression.split_extension(file_name)[2]:
+            return file_name
+
+        with compression.open_file(file_name, 'rb') as f:
+            return io.BytesIO(f.read())
+
+    def _read_xlsx(self, source, sheet=None):
+        """ Reads an XLSX workbook in read-only mode, where rows are loaded as
+            they are consumed instead of all at once. The header is read right
+            away.
+
+        Args:
+            source ('str' or 'file'): The workbook path or file object.
+            sheet ('str') default=None: The sheet to read, the first one by 
+                default.
+
+        Returns:
+            generator: The dictionaries containing the device attributes from
+                each row of the file.
+
+        """
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(source, read_only=True, 
+                                                            data_only=True)
+
+        try:
+            worksheet = workbook[sheet] if sheet is not None \
+                                                    else workbook.worksheets[0]
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, ())
+        except BaseException:
+            workbook.close()
+            raise
+
+        # Trailing empty header cells are not columns
+        self._keys = [str(key) if key is not None else '' for key in header]
+        while self._keys and not self._keys[-1]:
+            self._keys.pop()
+
+        return self._xlsx_rows(workbook, rows, self._keys)
+
+    def _xlsx_rows(self, workbook, rows, keys):
+        """ Helper to read the rows of an XLSX workbook one at a time.
+
+        Args:
+            workbook ('Workbook'): The workbook, closed once all the rows are 
+                read.
+            rows ('generator'): The rows of the sheet, past the header.
+            keys ('list'): The header of the sheet.
+
+        Yields:
+            dict: The device attributes of a row.
+
+        """
+        try:
+            for number, row in enumerate(rows, 2):
+                # Only take key which has value
+                device = {k: v for k, v in zip(keys, row) 
+                                                if v is not None and v != ''}
+
+                # Formatted cells can extend the sheet with empty rows
+                if device:
+                    if self._rows is not None and 'hostname' in device:
+                        self._rows[device['hostname']] = number
+                    yield device
+        finally:
+            workbook.close()
+
+    def _read_columnar(self, file_name):
+        """ Reads a Parquet, Arrow or Feather file containing device data, one
+            record batch at a time. Only the needed columns are read, and the
+            connection port is split from the IP for a whole batch at once.
+
+        Args:
+            file_name ('str'): Name of the file.
+
+        Returns:
+            generator: The dictionaries containing the device attributes from 
+                each row of the file.
+
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            raise Exception('pyarrow must be installed to read Parquet, Arrow '
+                        'and Feather files: pip install pyats.contrib[arrow]')
+
+        source = self._seekable_source(file_name)
+
+        if compression.split_extension(file_name)[1] == '.parquet':
+            import pyarrow.parquet
+
+            parquet = pyarrow.parquet.ParquetFile(source)
+            names = self._columnar_columns(parquet.schema_arrow.names)
+            batches = parquet.iter_batches(columns=names)
+        else:
+            import pyarrow.ipc
+
+            try:
+                reader = pyarrow.ipc.open_file(source)
+                schema = reader.schema
+                batches = (reader.get_batch(index) 
+                                for index in range(reader.num_record_batches))
+            except pyarrow.ArrowInvalid:
+                # Arrow streams and Feather version 1 files
+                import pyarrow.feather
+                table = pyarrow.feather.read_table(source)
+                schema = table.schema
+                batches = iter(table.to_batches())
+
+            names = self._columnar_columns(schema.names)
+            batches = (batch.select(names) for batch in batches)
+
+        self._keys = names
+
+        return self._columnar_rows(batches)
+
+    def _columnar_columns(self, names):
+        """ Helper to select the columns of a columnar file to read.
+
+        Args:
+            names ('list'): The columns of the file.
+
+        Returns:
+            list: The columns to read, in the order of the file.
+
+        """
+        if not self._columns:
+            return list(names)
+
+        # The device, connection and credential columns are always read
+        wanted = _FIXED | set(self._columns)
+
+        return [name for name in names if name in wanted]
+
+    def _columnar_rows(self, batches):
+        """ Helper to turn record batches into device attributes. Empty values
+            are dropped and the port is split from the IP column by column,
+            only the rows are built in Python.
+
+        Args:
+            batches ('iterable'): The record batches.
+
+        Yields:
+            dict: The device attributes of a row.
+
+        """
+        import pyarrow
+        import pyarrow.compute as pc
+
+        for batch in batches:
+            names = list(batch.schema.names)
+            columns = []
+
+            for name, column in zip(names, batch.columns):
+                if pyarrow.types.is_dictionary(column.type):
+                    column = column.dictionary_decode()
+                if pyarrow.types.is_string(column.type) or \
+                                    pyarrow.types.is_large_string(column.type):
+                    column = pc.if_else(pc.equal(column, ''), None, column)
+                columns.append(column)
+
+            if 'ip' in names:
+                index = names.index('ip')
+                address = pc.extract_regex(pc.utf8_trim_whitespace(
+                        columns[index].cast(pyarrow.string())), 
+                        r'^(?P<ip>[^: ]*)(?:(?::| +)(?P<port>[^: ]*))?')
+                columns[index] = address.field('ip')
+
+                # An explicit port takes precedence over the one of the IP
+                port = pc.if_else(pc.equal(address.field('port'), ''), None,
+                                                        address.field('port'))
+                if 'port' in names:
+                    position = names.index('port')
+                    columns[position] = pc.coalesce(columns[position].cast(
+                                                    pyarrow.string()), port)
+                else:
+                    names.append('port')
+                    columns.append(port)
+
+            values = [column.to_pylist() for column in columns]
+
+            for row in zip(*values):
+                yield {k: v for k, v in zip(names, row) if v is not None}
+
+    def _read_testbed(self, file_name):
+        """ Reads a testbed YAML file, such as one generated by a creator.
+
+        Args:
+            file_name ('str'): Name of the testbed file.
+
+        Returns:
+            dict: The testbed data.
+
+        """
+        with compression.open_file(file_name) as f:
+            testbed = yaml.safe_load(f)
+
+        if not isinstance(testbed, dict) or 'devices' not in testbed:
+            raise Exception("{f} is not a testbed file.".format(f=file_name))
+
+        return testbed
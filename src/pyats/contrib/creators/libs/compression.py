@@ -0,0 +1,100 @@
+import os
+import gzip
+import lzma
+import tempfile
+import contextlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Extensions of the supported compression formats
+EXTENSIONS = ('.gz', '.xz', '.zst')
+
+# Temporary files are created private, written files get the usual mode. The
+# mask can only be read by setting it, do it once at import
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def split_extension(path):
+    """ Splits a path into its root, its extension and its compression
+        extension, such as 'testbed', '.yaml' and '.gz' for 'testbed.yaml.gz'.
+
+    Args:
+        path ('str'): The file path.
+
+    Returns:
+        tuple: The root, the extension and the compression extension, which is
+            empty if the file is not compressed.
+
+    """
+    root, compression = os.path.splitext(path)
+
+    if compression not in EXTENSIONS:
+        root, compression = path, ''
+
+    root, extension = os.path.splitext(root)
+
+    return root, extension, compression
+
+def open_file(path, mode='r'):
+    """ Opens a file, compressing or decompressing it as a stream if its
+        extension is one of a compression format.
+
+    Args:
+        path ('str'): The file path.
+        mode ('str') default='r': 'r' or 'w' for text, 'rb' or 'wb' for bytes.
+
+    Returns:
+        file: The file object.
+
+    """
+    _, _, compression = split_extension(path)
+    mode = mode if 'b' in mode else mode + 't'
+
+    if compression == '.gz':
+        return gzip.open(path, mode)
+    elif compression == '.xz':
+        return lzma.open(path, mode)
+    elif compression == '.zst':
+        if zstandard is None:
+            raise Exception('zstandard must be installed to read and write '
+                                        '".zst" files: pip install zstandard')
+        return zstandard.open(path, mode)
+
+    return open(path, mode)
+
+@contextlib.contextmanager
+def atomic_file(path, mode='w'):
+    """ Opens a temporary file next to a path, compressed like 'open_file'
+        would, and moves it to the path once completely written. Readers of
+        the path never see a partially written file.
+
+    Args:
+        path ('str'): The file path.
+        mode ('str') default='w': 'w' for text, 'wb' for bytes.
+
+    Yields:
+        file: The file object.
+
+    """
+    directory, name = os.path.split(path)
+
+    # A unique temporary file, so that concurrent writers of the same path do
+    # not share it. It keeps the name for the compression extension
+    descriptor, temporary = tempfile.mkstemp(dir=directory or '.', 
+                                            prefix='.', suffix='.' + name)
+    os.close(descriptor)
+
+    try:
+        with open_file(temporary, mode) as f:
+            yield f
+        os.chmod(temporary, 0o666 & ~_UMASK)
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,629 @@
+import os
+import re
+import ast
+import json
+import shlex
+import string
+import warnings
+import configparser
+
+import yaml
+
+# Extensions of YAML inventories and of variable files
+_YAML_EXTENSIONS = ('.yml', '.yaml', '.json')
+_COMMENT_MARKERS = ('#', ';')
+_SECTION = re.compile(r'^\[([^:\]\s]+)(?::(\w+))?\]\s*(?:#.*)?$')
+_GROUP_NAME = re.compile(r'^([^:\]\s]+)\s*(?:#.*)?$')
+_RANGE = re.compile(r'\[[^\]]*\]')
+_HOSTNAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+_UNQUOTED = re.compile(r'^[^\'"\\]*$')
+_BLANKS = re.compile(r'[ \t\r\n]+')
+
+# Variables Ansible adds to hosts, not exported
+_INTERNAL = ('inventory_file', 'inventory_dir')
+
+# Settings changing how Ansible reads inventories, the native reader only
+# knows the defaults
+_SETTINGS = ('hash_behaviour', 'vars_plugins', 'vars_plugins_enabled',
+                                                    'force_valid_group_names')
+_SECTIONS = ('inventory', 'yaml_inventory', 'ini_inventory')
+_ENVIRONMENT = ('ANSIBLE_INVENTORY_', 'ANSIBLE_HASH_BEHAVIOUR',
+                'ANSIBLE_VARS_', 'ANSIBLE_TRANSFORM_INVALID_GROUP_CHARS',
+                'ANSIBLE_YAML_FILENAME_EXT')
+
+def read_inventory(source, basedir='.'):
+    """ Reads a static INI or YAML inventory, with the group_vars and host_vars
+        folders next to it and in the base folder, without Ansible. The data
+        is the same as exported by 'ansible-inventory --list --export'.
+
+    Args:
+        source ('str'): The inventory file.
+        basedir ('str') default='.': The playbook folder, whose group_vars and
+            host_vars folders are also read.
+
+    Returns:
+        dict: The inventory in Ansible JSON format, or None if the inventory
+            needs Ansible: dynamic inventory plugins and scripts, folders,
+            host lists, vault content or Ansible settings changing how
+            inventories are read.
+
+    """
+    if not os.path.isfile(source) or os.access(source, os.X_OK) or \
+                                                            _ansible_settings():
+        return None
+
+    inventory = _Inventory()
+    try:
+        with open(source) as f:
+            text = f.read()
+
+        if text.startswith('$ANSIBLE_VAULT'):
+            return None
+
+        extension = os.path.splitext(source)[1]
+        if extension == '.toml':
+            return None
+
+        data = None
+        if not extension or extension in _YAML_EXTENSIONS:
+            try:
+                data = yaml.safe_load(text)
+            except yaml.YAMLError:
+                # Files without extension are tried as INI afterwards
+                if extension or '!vault' in text:
+                    return None
+
+        if isinstance(data, dict):
+            if data.get('plugin'):
+                return None
+            _parse_yaml(inventory, data)
+        elif extension and extension in _YAML_EXTENSIONS:
+            return None
+        else:
+            _parse_ini(inventory, text.splitlines())
+
+        inventory.reconcile()
+        folders = []
+        for folder in (os.path.dirname(source) or '.', basedir):
+            folder = os.path.realpath(folder)
+            if folder not in folders:
+                folders.append(folder)
+
+        return inventory.export(folders)
+    except (ValueError, TypeError, yaml.YAMLError, UnicodeDecodeError):
+        # Anything unexpected is left to Ansible, which reports it properly
+        return None
+
+def _ansible_settings():
+    """ Helper to find Ansible settings changing how inventories are read,
+        in the environment or in the Ansible configuration file.
+
+    Returns:
+        bool: Whether such settings are found.
+
+    """
+    if any(name.startswith(_ENVIRONMENT) for name in os.environ):
+        return True
+
+    # Ansible only reads the first configuration file found
+    for path in (os.environ.get('ANSIBLE_CONFIG'), 'ansible.cfg',
+                    os.path.expanduser('~/.ansible.cfg'),
+                    '/etc/ansible/ansible.cfg'):
+        if not path or not os.path.isfile(path):
+            continue
+
+        config = configparser.ConfigParser(allow_no_value=True, strict=False,
+                                                            interpolation=None)
+        try:
+            config.read(path)
+        except configparser.Error:
+            return True
+
+        if any(config.has_section(section) for section in _SECTIONS):
+            return True
+
+        return config.has_section('defaults') and \
+                    any(config.has_option('defaults', key) for key in _SETTINGS)
+
+    return False
+
+class _Inventory(object):
+    """ _Inventory class
+
+    Groups and hosts of an inventory, following the rules of the Ansible
+    inventory data: every group belongs to 'all', and hosts without group
+    belong to 'ungrouped'.
+
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.hosts = {}
+        self.add_group('all')
+        self.add_group('ungrouped')
+        self.add_child('all', 'ungrouped')
+
+    def add_group(self, name):
+        if not isinstance(name, str) or not name:
+            raise ValueError('Invalid group name {n}'.format(n=name))
+
+        self.groups.setdefault(name, {'vars': {}, 'hosts': [], 'children': [],
+                                            'parents': [], 'priority': 1})
+
+        return name
+
+    def add_host(self, name, group, port=None):
+        if not isinstance(name, str) or not name:
+            raise ValueError('Invalid host name {n}'.format(n=name))
+
+        if name not in self.hosts:
+            self.hosts[name] = {'vars': {}, 'groups': []}
+            if port:
+                self.hosts[name]['vars']['ansible_port'] = int(port)
+
+        if name not in self.groups[group]['hosts']:
+            self.groups[group]['hosts'].append(name)
+            self.hosts[name]['groups'].append(group)
+
+    def add_child(self, group, child):
+        if child in self.groups:
+            if child == group or group in self._descendants(child):
+                raise ValueError('Group {c} is an ancestor of group {g}'
+                                                    .format(c=child, g=group))
+            if child not in self.groups[group]['children']:
+                self.groups[group]['children'].append(child)
+                self.groups[child]['parents'].append(group)
+        elif child in self.hosts:
+            self.add_host(child, group)
+        else:
+            raise ValueError('{c} is not a known host nor group'.format(
+                                                                    c=child))
+
+    def set_variable(self, group, key, value):
+        if key == 'ansible_group_priority':
+            self.groups[group]['priority'] = int(value)
+        else:
+            self.groups[group]['vars'][key] = value
+
+    def _descendants(self, group):
+        found = set()
+        pending = [group]
+        while pending:
+            for child in self.groups[pending.pop()]['children']:
+                if child not in found:
+                    found.add(child)
+                    pending.append(child)
+
+        return found
+
+    def reconcile(self):
+        """ Applies the rules of the Ansible inventory data, once parsed.
+
+        """
+        for name, group in self.groups.items():
+            if name != 'all' and not group['parents']:
+                self.add_child('all', name)
+
+        ungrouped = self.groups['ungrouped']['hosts']
+        for name, host in self.hosts.items():
+            others = [group for group in host['groups']
+                                        if group not in ('all', 'ungrouped')]
+            if 'ungrouped' in host['groups']:
+                if others:
+                    ungrouped.remove(name)
+                    host['groups'].remove('ungrouped')
+            elif not others:
+                self.add_host(name, 'ungrouped')
+
+    def export(self, folders):
+        """ Exports the inventory as 'ansible-inventory --list --export' does.
+
+        Args:
+            folders ('list'): The folders whose group_vars and host_vars
+                folders are read, in order.
+
+        Returns:
+            dict: The inventory in Ansible JSON format.
+
+        """
+        cache = {}
+        results = {}
+        seen = set()
+
+        def format_group(name):
+            group = self.groups[name]
+            entry = results[name] = {}
+            if name != 'all':
+                entry['hosts'] = list(group['hosts'])
+
+            entry['children'] = []
+            for child in group['children']:
+                entry['children'].append(child)
+                if child not in seen:
+                    format_group(child)
+                    seen.add(child)
+
+            entry['vars'] = dict(group['vars'])
+            entry['vars'].update(_folder_vars(folders, 'group_vars', name,
+                                                                        cache))
+            if group['priority'] != 1:
+                entry['vars']['ansible_group_priority'] = group['priority']
+
+            for key in ('hosts', 'vars', 'children'):
+                if key in entry and not entry[key]:
+                    del entry[key]
+            if not entry:
+                del results[name]
+
+        format_group('all')
+
+        results['_meta'] = {'hostvars': {}}
+        for name, host in self.hosts.items():
+            hostvars = dict(host['vars'])
+            hostvars.update(_folder_vars(folders, 'host_vars', name, cache))
+            for key in _INTERNAL:
+                hostvars.pop(key, None)
+            if hostvars:
+                results['_meta']['hostvars'][name] = hostvars
+
+        return results
+
+def _folder_vars(folders, subfolder, name, cache):
+    """ Helper to read the variables of a group or host from the group_vars or
+        host_vars folders, as the Ansible 'host_group_vars' plugin does.
+
+    Args:
+        folders ('list'): The folders containing the group_vars and host_vars
+            folders.
+        subfolder ('str'): 'group_vars' or 'host_vars'.
+        name ('str'): The group or host name.
+        cache ('dict'): Variables of the files already read.
+
+    Returns:
+        dict: The variables.
+
+    """
+    data = {}
+    if name.startswith(os.path.sep):
+        return data
+
+    for folder in folders:
+        path = os.path.join(folder, subfolder)
+        if not os.path.isdir(path):
+            continue
+
+        for file in _vars_files(path, name):
+            if file not in cache:
+                cache[file] = _load_vars(file)
+            data.update(cache[file])
+
+    return data
+
+def _vars_files(path, name):
+    """ Helper to find the variable files of a group or host: a file named
+        after it, with or without a YAML extension, or all the files of a
+        folder named after it.
+
+    Args:
+        path ('str'): The group_vars or host_vars folder.
+        name ('str'): The group or host name.
+
+    Returns:
+        list: The file paths, in reading order.
+
+    """
+    for extension in ('',) + _YAML_EXTENSIONS:
+        full = os.path.join(path, name + extension)
+        if not os.path.exists(full):
+            continue
+
+        if not os.path.isdir(full):
+            return [full]
+
+        found = []
+        for root, folders, files in os.walk(full):
+            folders[:] = [folder for folder in folders
+                        if not folder.startswith('.') and
+                                                not os.path.splitext(folder)[1]]
+            found.extend(os.path.join(root, file) for file in files
+                if not file.startswith('.') and not file.endswith('~') and
+                    os.path.splitext(file)[1] in ('',) + _YAML_EXTENSIONS)
+
+        # Ansible reads the files of a folder in sorted path order
+        return sorted(found, key=lambda file: os.path.relpath(file, full)
+                                                            .split(os.sep))
+
+    return []
+
+def _load_vars(file):
+    """ Helper to load a variable file, in JSON or YAML format.
+
+    Args:
+        file ('str'): The file path.
+
+    Returns:
+        dict: The variables.
+
+    """
+    with open(file) as f:
+        text = f.read()
+
+    if text.lstrip().startswith('$ANSIBLE_VAULT'):
+        raise ValueError('{f} is encrypted'.format(f=file))
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = yaml.safe_load(text)
+
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError('{f} must contain a dictionary'.format(f=file))
+
+    return data
+
+def _parse_ini(inventory, lines):
+    """ Helper to parse the lines of an INI inventory, as the Ansible 'ini'
+        inventory plugin does.
+
+    Args:
+        inventory ('_Inventory'): The inventory to populate.
+        lines ('list'): The lines of the inventory file.
+
+    """
+    pending = {}
+    group = 'ungrouped'
+    state = 'hosts'
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith(_COMMENT_MARKERS):
+            continue
+
+        match = _SECTION.match(line)
+        if match:
+            group, state = match.groups()
+            state = state or 'hosts'
+            if state not in ('hosts', 'children', 'vars'):
+                raise ValueError('Unknown section type {s}'.format(s=state))
+
+            # Groups may be used as children or vars before they are defined
+            if group not in inventory.groups:
+                if state == 'vars' and group not in pending:
+                    pending[group] = {'state': state}
+                inventory.add_group(group)
+
+            if group in pending and state != 'vars':
+                if pending[group]['state'] == 'children':
+                    _add_pending_children(inventory, group, pending)
+                elif pending[group]['state'] == 'vars':
+                    del pending[group]
+            continue
+        elif line.startswith('[') and line.endswith(']'):
+            raise ValueError('Invalid section {l}'.format(l=line))
+
+        if state == 'hosts':
+            # Lines without quotes nor escapes split the same as with shlex,
+            # which is slow
+            if _UNQUOTED.match(line):
+                tokens = _BLANKS.split(line.split('#', 1)[0].strip(' \t\r\n'))
+            else:
+                tokens = shlex.split(line, comments=True)
+            hosts, port = _expand_pattern(tokens[0])
+            variables = {}
+            for token in tokens[1:]:
+                if '=' not in token:
+                    raise ValueError('Expected key=value, got {t}'.format(
+                                                                    t=token))
+                key, value = token.split('=', 1)
+                variables[key] = _parse_value(value)
+
+            for host in hosts:
+                inventory.add_host(host, group, port)
+                inventory.hosts[host]['vars'].update(variables)
+        elif state == 'vars':
+            if '=' not in line:
+                raise ValueError('Expected key=value, got {l}'.format(l=line))
+            key, value = [part.strip() for part in line.split('=', 1)]
+            inventory.set_variable(group, key, _parse_value(value))
+        else:
+            match = _GROUP_NAME.match(line)
+            if not match:
+                raise ValueError('Expected group name, got {l}'.format(l=line))
+
+            child = match.group(1)
+            if child not in inventory.groups:
+                pending.setdefault(child, {'state': state, 'parents': []})[
+                                                    'parents'].append(group)
+            else:
+                inventory.add_child(group, child)
+
+    if pending:
+        raise ValueError('Undefined groups {g}'.format(g=', '.join(pending)))
+
+def _add_pending_children(inventory, group, pending):
+    """ Helper to add a group to the parents that used it before it was
+        defined.
+
+    Args:
+        inventory ('_Inventory'): The inventory.
+        group ('str'): The group now defined.
+        pending ('dict'): The groups used before being defined.
+
+    """
+    for parent in pending[group]['parents']:
+        inventory.add_child(parent, group)
+        if parent in pending and pending[parent]['state'] == 'children':
+            _add_pending_children(inventory, parent, pending)
+
+    del pending[group]
+
+def _parse_yaml(inventory, data):
+    """ Helper to parse the data of a YAML inventory, as the Ansible 'yaml'
+        inventory plugin does.
+
+    Args:
+        inventory ('_Inventory'): The inventory to populate.
+        data ('dict'): The loaded inventory file.
+
+    """
+    def parse_group(group, group_data):
+        if group_data is not None and not isinstance(group_data, dict):
+            raise ValueError('Invalid group {g}'.format(g=group))
+
+        inventory.add_group(group)
+
+        for key, value in (group_data or {}).items():
+            if isinstance(value, str) and key in ('vars', 'children', 'hosts'):
+                value = {value: None}
+
+            if value is None:
+                continue
+            if not isinstance(value, dict) or \
+                                    key not in ('vars', 'children', 'hosts'):
+                raise ValueError('Invalid key {k} in group {g}'.format(k=key,
+                                                                    g=group))
+
+            if key == 'vars':
+                for name, variable in value.items():
+                    inventory.set_variable(group, name, variable)
+            elif key == 'children':
+                for child, child_data in value.items():
+                    inventory.add_child(group, parse_group(child, child_data))
+            else:
+                for pattern, variables in value.items():
+                    if not isinstance(pattern, str):
+                        raise ValueError('Host pattern {p} must be a string'
+                                                            .format(p=pattern))
+                    if variables is not None and \
+                                            not isinstance(variables, dict):
+                        raise ValueError('Invalid variables for {p}'.format(
+                                                                    p=pattern))
+
+                    hosts, port = _expand_pattern(pattern)
+                    for host in hosts:
+                        inventory.add_host(host, group, port)
+                        inventory.hosts[host]['vars'].update(variables or {})
+
+        return group
+
+    for group, group_data in data.items():
+        parse_group(group, group_data)
+
+def _expand_pattern(pattern):
+    """ Helper to expand a host pattern, such as 'web[01:10].lab:2222', into
+        host names and a port.
+
+    Args:
+        pattern ('str'): The host pattern.
+
+    Returns:
+        tuple: The list of host names and the port, or None.
+
+    """
+    port = None
+    bare = _RANGE.sub('', pattern)
+
+    if ':' in bare:
+        # Only 'host:port' is handled, IPv6 addresses are left to Ansible
+        host, _, port = pattern.rpartition(':')
+        if not port.isdigit() or not _HOSTNAME.match(_RANGE.sub('', host)):
+            raise ValueError('Unsupported host pattern {p}'.format(p=pattern))
+        pattern, port = host, int(port)
+
+    return _expand_range(pattern), port
+
+def _expand_range(pattern):
+    """ Helper to expand the '[begin:end]' and '[begin:end:step]' ranges of
+        a host name.
+
+    Args:
+        pattern ('str'): The host name, with or without ranges.
+
+    Returns:
+        list: The host names.
+
+    """
+    if '[' not in pattern:
+        return [pattern]
+
+    head, rest = pattern.split('[', 1)
+    bounds, tail = rest.split(']', 1)
+    bounds = bounds.split(':')
+    if len(bounds) not in (2, 3) or not bounds[1]:
+        raise ValueError('Invalid host range in {p}'.format(p=pattern))
+
+    begin = bounds[0] or '0'
+    end = bounds[1]
+    step = int(bounds[2]) if len(bounds) == 3 else 1
+
+    if begin[0] == '0' and len(begin) > 1:
+        if len(begin) != len(end):
+            raise ValueError('Invalid host range in {p}'.format(p=pattern))
+        fill = lambda value: str(value).zfill(len(begin))
+    else:
+        fill = str
+
+    if begin in string.ascii_letters and end in string.ascii_letters:
+        first = string.ascii_letters.index(begin)
+        last = string.ascii_letters.index(end)
+        if first > last:
+            raise ValueError('Invalid host range in {p}'.format(p=pattern))
+        sequence = string.ascii_letters[first:last + 1:step]
+    else:
+        sequence = range(int(begin), int(end) + 1, step)
+
+    hosts = []
+    for value in sequence:
+        hosts.extend(_expand_range(head + fill(value) + tail))
+
+    return hosts
+
+def _parse_value(value):
+    """ Helper to convert a value of an INI inventory to a Python value, as
+        the Ansible 'ini' inventory plugin does.
+
+    Args:
+        value ('str'): The value.
+
+    Returns:
+        The int, float, bool, None, string, list or dict value.
+
+    """
+    # Names are not literals
+    if value.isidentifier() and value not in ('True', 'False', 'None'):
+        return value
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', SyntaxWarning)
+            value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass
+
+    return _plain_value(value)
+
+def _plain_value(value):
+    """ Helper to convert the values 'ast.literal_eval' accepts but Ansible
+        variables do not.
+
+    Args:
+        value: The evaluated value.
+
+    Returns:
+        The converted value.
+
+    """
+    if isinstance(value, (list, tuple, set)):
+        return [_plain_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain_value(item) for key, item in value.items()}
+    if value is ...:
+        return '...'
+    if isinstance(value, complex):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode()
+
+    return value
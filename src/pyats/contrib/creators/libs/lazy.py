@@ -0,0 +1,259 @@
+from pyats.topology import Link
+from pyats.topology.bases import TopologyDict
+from pyats.topology.loader.base import BaseTestbedLoader
+
+def create_lazy_testbed(data):
+    """ Creates a testbed object whose devices are only created on first
+        access, from the intermediate testbed data.
+
+    Args:
+        data ('dict'): The testbed data.
+
+    Returns:
+        Testbed: The testbed object.
+
+    """
+    testbed = BaseTestbedLoader.create_testbed({
+        'testbed': {
+            'name': 'testbed'
+        },
+        'devices': {},
+        'topology': {}
+    })
+    testbed.devices = LazyDevices(testbed, data.get('devices') or {},
+                                                    data.get('topology') or {})
+
+    return testbed
+
+class LazyDevices(TopologyDict):
+    """ LazyDevices class (TopologyDict)
+
+    Devices of a testbed, created with their interfaces the first time they are
+    accessed by name or alias. Iterating over the names does not create any
+    device, iterating over the values creates all of them.
+
+    Links are shared between the created devices, and listing the interfaces
+    of a link creates the devices at its other ends, so that topology can be
+    traversed from any device.
+
+    Args:
+        testbed ('Testbed'): The testbed the devices belong to.
+        devices ('dict'): Mapping of device names to device data.
+        topology ('dict'): Mapping of device names to their topology data.
+
+    """
+
+    # Attribute access is item access on topology dictionaries, keep the state
+    # in slots instead
+    __slots__ = ('_testbed', '_devices', '_topology', '_pending', '_aliases',
+                 '_links', '_peers', '_loading')
+
+    def __init__(self, testbed, devices, topology):
+        super().__init__()
+        self._testbed = testbed
+        self._devices = devices
+        self._topology = topology
+        self._pending = {}
+        self._aliases = {}
+        self._links = {}
+        self._peers = {}
+        self._loading = False
+
+        # Index the names and aliases, and the devices of every link
+        for name, device in devices.items():
+            self._pending[name] = None
+            if isinstance(device, dict) and device.get('alias'):
+                self._aliases.setdefault(device['alias'], name)
+
+        for name, data in topology.items():
+            for attributes in (data or {}).get('interfaces', {}).values():
+                if attributes and attributes.get('link'):
+                    self._peers.setdefault(attributes['link'], []).append(name)
+
+    def _resolve(self, key):
+        """ Helper to find the pending device with the given name or alias.
+
+        Args:
+            key ('str'): The device name or alias.
+
+        Returns:
+            str: The device name, or None if it is not pending.
+
+        """
+        if key in self._pending:
+            return key
+
+        name = self._aliases.get(key)
+
+        return name if name in self._pending else None
+
+    def _materialize(self, name):
+        """ Creates a pending device and adds it to the testbed. Its interfaces
+            are connected to the links shared with the other devices.
+
+        Args:
+            name ('str'): The device name.
+
+        """
+        del self._pending[name]
+
+        topology = {name: self._topology[name]} if name in self._topology \
+                                                                        else {}
+        loaded = BaseTestbedLoader.create_testbed({
+            'testbed': {
+                'name': self._testbed.name
+            },
+            'devices': {name: self._devices[name]},
+            'topology': topology
+        })
+        device = loaded.devices[name]
+        loaded.remove_device(device)
+
+        # Adding the device checks the other devices, and connecting it to
+        # its links lists their interfaces, neither must create devices
+        self._loading = True
+        try:
+            self._testbed.add_device(device)
+
+            for interface in device.interfaces.values():
+                link = interface.link
+                if link is None:
+                    continue
+
+                shared = self._links.get(link.name)
+                if shared is None:
+                    shared = self._links[link.name] = LazyLink(link.name, self)
+
+                link.disconnect_interface(interface)
+                shared.connect_interface(interface)
+        finally:
+            self._loading = False
+
+    def _materialize_link(self, link):
+        """ Creates the pending devices connected to a link.
+
+        Args:
+            link ('str'): The link name.
+
+        """
+        if self._loading:
+            return
+
+        for name in self._peers.pop(link, ()):
+            if name in self._pending:
+                self._materialize(name)
+
+    def _materialize_all(self):
+        """ Creates all the pending devices.
+
+        """
+        if self._loading:
+            return
+
+        for name in list(self._pending):
+            if name in self._pending:
+                self._materialize(name)
+
+    def _find(self, key):
+        """ Helper to find a device by name or alias, creating it if it is 
+            pending.
+
+        Args:
+            key ('str'): The device name or alias.
+
+        Returns:
+            Device: The device, or None if there is no such device.
+
+        """
+        name = self._resolve(key)
+        if name is not None:
+            self._materialize(name)
+
+        name = key if dict.__contains__(self, key) else self._aliases.get(key)
+        if name is not None and dict.__contains__(self, name):
+            return dict.__getitem__(self, name)
+
+        # Devices added to the testbed afterwards are not indexed
+        for device in dict.values(self):
+            if getattr(device, 'alias', None) == key:
+                return device
+
+        return None
+
+    def __getitem__(self, key):
+        device = self._find(key)
+        if device is None:
+            raise KeyError(key)
+
+        return device
+
+    def __getattr__(self, attribute):
+        device = None if attribute.startswith('_') else self._find(attribute)
+        if device is None:
+            raise AttributeError(attribute)
+
+        return device
+
+    def __contains__(self, key):
+        return self._resolve(key) is not None or self._find(key) is not None
+
+    def __iter__(self):
+        return iter(list(dict.keys(self)) + list(self._pending))
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._pending)
+
+    def __repr__(self):
+        self._materialize_all()
+        return super().__repr__()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        self._materialize_all()
+        return dict.values(self)
+
+    def items(self):
+        self._materialize_all()
+        return dict.items(self)
+
+    @property
+    def names(self):
+        return set(self)
+
+    @property
+    def aliases(self):
+        self._materialize_all()
+        return TopologyDict.aliases.__get__(self)
+
+class LazyLink(Link):
+    """ LazyLink class (Link)
+
+    Link shared by lazily created devices. Listing its interfaces creates the
+    devices at its other ends first.
+
+    Args:
+        name ('str'): The link name.
+        devices ('LazyDevices'): The devices of the testbed.
+
+    """
+
+    def __init__(self, name, devices):
+        self.__dict__['_lazy_devices'] = devices
+        super().__init__(name)
+
+    @property
+    def interfaces(self):
+        self.__dict__['_lazy_devices']._materialize_link(self.name)
+        return self.__dict__['_interfaces']
+
+    @interfaces.setter
+    def interfaces(self, interfaces):
+        self.__dict__['_interfaces'] = interfaces
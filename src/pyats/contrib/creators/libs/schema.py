@@ -0,0 +1,157 @@
+import re
+
+# Separators of the port in a connection IP, such as '10.0.0.1:2001'
+_ADDRESS = re.compile(':| +')
+
+# Columns with a dedicated place in the device data
+_FIXED = {'hostname', 'ip', 'port', 'os', 'protocol', 'username', 'password',
+          'enable_password', 'type'}
+
+# Required columns, in the order they are reported missing
+_REQUIRED = ('ip', 'os', 'protocol', 'username')
+
+def coerce_port(value):
+    """ Converts a port value to an integer. Spreadsheets give numbers as
+        floats, such as 22.0, or as their text.
+
+    Args:
+        value: The port value.
+
+    Returns:
+        int: The port.
+
+    Raises:
+        ValueError: If the value is not a whole number.
+
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        number = float(value)
+
+    if not number.is_integer():
+        raise ValueError(value)
+
+    return int(number)
+
+class RowSchema(object):
+    """ RowSchema class
+
+    Construction of the device testbed data from table rows, compiled once for
+    a set of columns. The place of every column in the device data, the
+    custom keys and the missing required columns are found when compiling,
+    so that each row only copies its values.
+
+    Args:
+        columns ('tuple'): The columns of the rows, in order.
+        enable_column ('bool') default=False: Whether the table has an
+            'enable_password' column. Without it, the enable password is the
+            device password, otherwise it is asked for when empty.
+
+    Examples:
+        schema = RowSchema(('hostname', 'ip', 'os', 'protocol', 'username'))
+        name, device, error = schema.device(('R1', '10.0.0.1:22', 'iosxe',
+                                             'ssh', 'admin'))
+
+    """
+
+    def __init__(self, columns, enable_column=False):
+        index = {column: position for position, column in enumerate(columns)}
+
+        self._hostname = index.get('hostname')
+        self._missing = next((column for column in _REQUIRED 
+                                            if column not in index), None)
+        self._ip = index.get('ip')
+        self._port = index.get('port')
+        self._os = index.get('os')
+        self._protocol = index.get('protocol')
+        self._username = index.get('username')
+        self._password = index.get('password')
+        self._enable = index.get('enable_password')
+        self._enable_column = enable_column
+        self._type = index.get('type')
+
+        # Other columns are custom keys, or device keys, in column order
+        self._others = [(position, column.replace('custom:', ''), 
+                                                        'custom:' in column)
+                            for position, column in enumerate(columns)
+                                if column not in _FIXED]
+
+    def device(self, values):
+        """ Constructs the testbed data of a device.
+
+        Args:
+            values ('tuple'): The values of the row, in column order.
+
+        Returns:
+            tuple: The device name, its testbed data and None, or the device
+                name, None and the error message if the row is invalid. The
+                name is None for an empty line.
+
+        """
+        if self._hostname is None:
+            return None, None, 'Empty line found in given CSV/Excel file.'
+
+        name = values[self._hostname]
+
+        if self._missing is not None:
+            return name, None, 'Missing required key {k} for device {d}'\
+                                    .format(k=repr(self._missing), d=name)
+
+        ip = str(values[self._ip]).strip()
+        port = None
+        if ':' in ip or ' ' in ip:
+            address = _ADDRESS.split(ip)
+            ip = address[0]
+            port = address[1] if len(address) > 1 else None
+
+        if self._port is not None:
+            port = values[self._port]
+
+        os = values[self._os]
+        connections = {
+            'cli': {
+                'ip': ip,
+                'protocol': values[self._protocol]}}
+
+        if port:
+            try:
+                connections['cli']['port'] = coerce_port(port)
+            except ValueError:
+                return name, None, 'Invalid port "{p}" for device {d}'\
+                                                    .format(p=port, d=name)
+
+        password = values[self._password] if self._password is not None \
+                                                                else '%ASK{}'
+        if self._enable is not None:
+            enable_password = values[self._enable]
+        elif self._enable_column:
+            enable_password = '%ASK{}'
+        else:
+            enable_password = password
+
+        type = values[self._type] if self._type is not None else None
+
+        dev = {
+            'os': os,
+            'connections': connections,
+            'credentials': {
+                'default': {
+                    'username': values[self._username],
+                    'password': password},
+                'enable': {
+                    'password': enable_password
+                }},
+            'type': type if type else os
+        }
+
+        for position, key, custom in self._others:
+            if custom:
+                dev.setdefault('custom', {}).setdefault(key, values[position])
+            else:
+                dev.setdefault(key, values[position])
+
+        return name, dev, None
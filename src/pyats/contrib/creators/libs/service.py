@@ -0,0 +1,393 @@
+import io
+import os
+import sys
+import copy
+import hmac
+import json
+import time
+import logging
+import secrets
+import argparse
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from ..multi import Multi, _creator_class
+
+logger = logging.getLogger(__name__)
+
+# Creator arguments naming files or folders to read or write
+_PATHS = ('path', 'record', 'replay', 'inventory_name', 'inventory_cache', 
+                                                                'testbed_file')
+
+class CreatorService(object):
+    """ CreatorService class
+
+    Long running service generating testbeds on request. The creator classes
+    stay imported, the HTTP sessions of the creators stay open, and generated
+    testbed data is cached for a while, so that repeated requests for the same
+    source do not pay for it again.
+
+    Requests run in a bounded pool of threads. Requests waiting for a thread
+    are queued, and requests beyond the queue size are rejected.
+
+    HTTP requests must be JSON and carry the token of the service as a bearer
+    token, and the files they read or write must be in the root folder.
+
+    Args:
+        workers ('int') default=4: Maximum number of testbeds generated at the
+            same time.
+        queue_size ('int') default=100: Maximum number of requests waiting for
+            a worker.
+        cache_ttl ('int') default=300: Number of seconds generated testbed data
+            is reused for, 0 to disable the cache.
+        token ('str') default=None: The token HTTP requests must carry, a
+            random one by default.
+        root ('str') default=None: The folder of the files HTTP requests may
+            read or write, the current folder by default.
+
+    Examples:
+        service = CreatorService(workers=8, token='s3cr3t', root='/srv/lab')
+        service.generate('netbox', {'netbox_url': 'https://netbox.com',
+                                    'user_token': '72830d67'},
+                         output='testbed.yaml')
+        service.serve(port=8080)
+
+    """
+
+    def __init__(self, workers=4, queue_size=100, cache_ttl=300, token=None,
+                                                                    root=None):
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._cache_ttl = cache_ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.token = token or secrets.token_urlsafe(24)
+        self._root = os.path.realpath(root or os.getcwd())
+
+    def generate(self, source, arguments=None, output=None, refresh=False):
+        """ Generates a testbed in a worker, waiting for a worker if they are
+            all busy.
+
+        Args:
+            source ('str'): The source name, such as 'netbox' or 'file'.
+            arguments ('dict'): Arguments for the creator of the source.
+            output ('str'): Where to save the testbed file. The testbed is
+                returned as YAML if not given.
+            refresh ('bool') default=False: Generate the testbed again even if
+                cached data is available.
+
+        Returns:
+            dict: The response, with the creator result, the YAML testbed if
+                no output is given, whether cached data was used and the
+                elapsed time.
+
+        """
+        if not self._slots.acquire(blocking=False):
+            raise Exception('The service is busy, try again later')
+
+        try:
+            future = self._executor.submit(self._generate, source,
+                                        dict(arguments or {}), output, refresh)
+            return future.result()
+        finally:
+            self._slots.release()
+
+    def _generate(self, source, arguments, output, refresh):
+        """ Generates a testbed, reusing cached testbed data if available.
+
+        Args:
+            source ('str'): The source name.
+            arguments ('dict'): Arguments for the creator of the source.
+            output ('str'): Where to save the testbed file, if any.
+            refresh ('bool'): Ignore cached testbed data.
+
+        Returns:
+            dict: The response.
+
+        """
+        start = time.time()
+        creator = _creator_class(source)(parse_cli=False, **arguments)
+        key = (source, json.dumps(arguments, sort_keys=True, default=str))
+
+        cached = None if refresh else self._cached(key)
+
+        hit = cached is not None
+        if hit:
+            testbed = copy.deepcopy(cached)
+        else:
+            testbed = creator._generate_testbed()
+
+            if self._cache_ttl:
+                self._store(key, copy.deepcopy(testbed))
+
+        response = {
+            'source': source,
+            'cached': hit,
+            'testbed': self._render(creator, testbed, output)
+        }
+        response['result'] = creator._result
+        response['elapsed'] = time.time() - start
+
+        logger.info('{s} generated in {t:.3f}s{c}'.format(s=source,
+                    t=response['elapsed'], c=' (cached)' if hit else ''))
+
+        return response
+
+    def _cached(self, key):
+        """ Helper to find cached testbed data, removing it once expired.
+
+        Args:
+            key ('tuple'): The source and its arguments.
+
+        Returns:
+            dict: The testbed data, or None if not cached.
+
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                return None
+
+            if time.time() - cached[0] < self._cache_ttl:
+                return cached[1]
+
+            del self._cache[key]
+            return None
+
+    def _store(self, key, testbed):
+        """ Helper to cache testbed data. Expired entries are removed at the
+            same time, so that the cache only holds recent requests.
+
+        Args:
+            key ('tuple'): The source and its arguments.
+            testbed ('dict'): The testbed data.
+
+        """
+        now = time.time()
+
+        with self._lock:
+            for other in [other for other, (stored, _) in self._cache.items()
+                                        if now - stored >= self._cache_ttl]:
+                del self._cache[other]
+
+            self._cache[key] = (now, testbed)
+
+    def _check_paths(self, source, arguments, output):
+        """ Checks that the files read or written by a request are in the
+            root folder of the service. The sources of the 'multi' source are
+            checked as well.
+
+        Args:
+            source ('str'): The source name.
+            arguments ('dict'): Arguments for the creator of the source.
+            output ('str'): Where to save the testbed file, if any.
+
+        Raises:
+            PermissionError: A path is outside of the root folder.
+
+        """
+        paths = [('output', output)] + [(name, arguments.get(name)) 
+                                                        for name in _PATHS]
+
+        for name, path in paths:
+            if path is None:
+                continue
+
+            location = os.path.realpath(path) if isinstance(path, str) \
+                                                                    else None
+            if location is None or \
+                    os.path.commonpath([self._root, location]) != self._root:
+                raise PermissionError('{n} "{p}" is outside of {r}'.format(
+                                                n=name, p=path, r=self._root))
+
+        if source == 'multi':
+            for spec in arguments.get('sources') or []:
+                self._check_paths(*Multi._parse_source(spec), None)
+
+    def _render(self, creator, testbed, output):
+        """ Writes the testbed file, or dumps the testbed as YAML.
+
+        Args:
+            creator ('TestbedCreator'): The creator of the testbed.
+            testbed ('dict' or 'list'): The testbed data, or the file names and
+                testbed data of a folder.
+            output ('str'): Where to save the testbed file, if any.
+
+        Returns:
+            str: The YAML testbed, or a dictionary of file names to YAML
+                testbeds for a folder, or None if the testbed is saved.
+
+        """
+        encode_password = getattr(creator, '_encode_password', False)
+
+        if testbed is None:
+            return None
+
+        if isinstance(testbed, list):
+            if output:
+                for base, item in testbed:
+                    creator._write_testbed(os.path.join(output, base), item,
+                                                            encode_password)
+                return None
+
+            return {base: self._render(creator, item, None)
+                                                    for base, item in testbed}
+
+        if output:
+            creator._write_testbed(output, testbed, encode_password)
+            return None
+
+        if encode_password:
+            creator._encode_all_password(testbed)
+
+        stream = io.StringIO()
+        creator._dump_testbed(testbed, stream, encode_password)
+
+        return stream.getvalue()
+
+    def clear(self):
+        """ Drops all the cached testbed data.
+
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def server(self, host='127.0.0.1', port=8080):
+        """ Creates the HTTP server of the service. Testbeds are generated by
+            posting a JSON object with 'source', 'arguments', 'output' and
+            'refresh' keys to '/generate', the response is the JSON object
+            returned by 'generate'. The cache is dropped by posting to
+            '/clear', and '/health' tells if the service is up.
+
+            Posted requests must have the 'application/json' content type, so
+            that web pages cannot send them as forms, and an 'Authorization:
+            Bearer <token>' header with the token of the service.
+
+        Args:
+            host ('str') default='127.0.0.1': The address to listen on.
+            port ('int') default=8080: The port to listen on.
+
+        Returns:
+            ThreadingHTTPServer: The server, not started yet.
+
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                data = json.dumps(body, default=str).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self._reply(200, {'status': 'ok'})
+                else:
+                    self._reply(404, {'error': 'Not found'})
+
+            def do_POST(self):
+                if self.headers.get_content_type() != 'application/json':
+                    self._reply(415, {'error': 'Content type must be '
+                                                        'application/json'})
+                    return
+
+                scheme, _, token = self.headers.get('Authorization', '')\
+                                                                .partition(' ')
+                if scheme.lower() != 'bearer' or not hmac.compare_digest(
+                            token.strip().encode(), service.token.encode()):
+                    self._reply(401, {'error': 'Invalid or missing token'})
+                    return
+
+                if self.path == '/clear':
+                    service.clear()
+                    self._reply(200, {'status': 'ok'})
+                    return
+
+                if self.path != '/generate':
+                    self._reply(404, {'error': 'Not found'})
+                    return
+
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                    source = request['source']
+                    arguments = dict(request.get('arguments') or {})
+                except (ValueError, KeyError, TypeError):
+                    self._reply(400, {'error': 'Request must be a JSON object '
+                                                    'with at least a source'})
+                    return
+
+                try:
+                    service._check_paths(source, arguments, 
+                                                        request.get('output'))
+                except (PermissionError, ValueError, TypeError) as e:
+                    self._reply(403, {'error': str(e)})
+                    return
+
+                try:
+                    response = service.generate(source, arguments, 
+                                                        request.get('output'),
+                        request.get('refresh', False))
+                except Exception as e:
+                    self._reply(503 if 'busy' in str(e) else 500,
+                                                            {'error': str(e)})
+                    return
+
+                self._reply(200, response)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return ThreadingHTTPServer((host, port), Handler)
+
+    def serve(self, host='127.0.0.1', port=8080):
+        """ Serves requests until interrupted.
+
+        Args:
+            host ('str') default='127.0.0.1': The address to listen on.
+            port ('int') default=8080: The port to listen on.
+
+        """
+        server = self.server(host, port)
+        logger.info('Creator service listening on {h}:{p}'.format(h=host,
+                                                                    p=port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self._executor.shutdown()
+
+def main(argv=None):
+    """ Command line entry point of the creator service.
+
+    Args:
+        argv ('list'): The command line arguments, taken from sys.argv by
+            default.
+
+    """
+    parser = argparse.ArgumentParser(description='pyATS testbed creator '
+                                                                    'service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queue-size', type=int, default=100)
+    parser.add_argument('--cache-ttl', type=int, default=300)
+    parser.add_argument('--token', default=os.environ.get(
+                                                    'PYATS_CREATOR_TOKEN'))
+    parser.add_argument('--root', default=None)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    service = CreatorService(args.workers, args.queue_size, args.cache_ttl,
+                                                        args.token, args.root)
+    if not args.token:
+        logger.info('Token of the service: {t}'.format(t=service.token))
+
+    service.serve(args.host, args.port)
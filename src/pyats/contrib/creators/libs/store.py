@@ -0,0 +1,149 @@
+import os
+import json
+import sqlite3
+import tempfile
+
+from collections.abc import MutableMapping
+
+class DeviceStore(MutableMapping):
+    """ DeviceStore class
+
+    Mapping of device names to device data kept in a temporary SQLite database
+    instead of memory, so that very large inventories can be handled with
+    bounded memory. Devices are indexed by name and by connection IP, and are
+    read back in name order, one at a time.
+
+    Device data is stored as JSON. Modifying the data returned by the store
+    does not modify the stored device, it must be set again.
+
+    Examples:
+        store = DeviceStore()
+        store['R1'] = {'os': 'iosxe', 'connections': {'cli': {'ip': '1.1.1.1'}}}
+        store.find_by_ip('1.1.1.1')
+        for name, device in store.items():
+            pass
+        store.close()
+
+    """
+
+    # Limit the SQLite page cache to 16MB
+    _CACHE_SIZE = -16000
+
+    def __init__(self):
+        descriptor, self._path = tempfile.mkstemp(prefix='testbed_',
+                                                            suffix='.db')
+        os.close(descriptor)
+
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=OFF')
+        self._db.execute('PRAGMA synchronous=OFF')
+        self._db.execute('PRAGMA cache_size={}'.format(self._CACHE_SIZE))
+        self._db.execute('CREATE TABLE devices '
+                            '(name TEXT PRIMARY KEY, ip TEXT, data TEXT)')
+        self._db.execute('CREATE INDEX devices_ip ON devices (ip)')
+
+    def _ip(self, device):
+        """ Helper to find the IP of the first connection of a device.
+
+        Args:
+            device ('dict'): The device data.
+
+        Returns:
+            str: The IP, or None if the device has no connection IP.
+
+        """
+        connections = device.get('connections') if isinstance(device, dict) \
+                                                                    else None
+
+        for connection in (connections or {}).values():
+            if isinstance(connection, dict) and connection.get('ip'):
+                return str(connection['ip'])
+
+        return None
+
+    def __getitem__(self, name):
+        row = self._db.execute('SELECT data FROM devices WHERE name = ?',
+                                                        (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+
+        return json.loads(row[0])
+
+    def __setitem__(self, name, device):
+        self._db.execute('INSERT OR REPLACE INTO devices VALUES (?, ?, ?)',
+                                (name, self._ip(device), json.dumps(device)))
+
+    def __delitem__(self, name):
+        if self._db.execute('DELETE FROM devices WHERE name = ?',
+                                                    (name,)).rowcount == 0:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        return self._db.execute('SELECT 1 FROM devices WHERE name = ?',
+                                                (name,)).fetchone() is not None
+
+    def __iter__(self):
+        for row in self._db.execute('SELECT name FROM devices ORDER BY name'):
+            yield row[0]
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM devices').fetchone()[0]
+
+    def __reduce__(self):
+        # The database cannot be sent to another process, send its devices
+        return dict, (list(self.items()),)
+
+    def __del__(self):
+        self.close()
+
+    def items(self):
+        """ Reads all the devices in name order, one at a time.
+
+        Yields:
+            tuple: The name and data of every device.
+
+        """
+        for name, data in self._db.execute(
+                            'SELECT name, data FROM devices ORDER BY name'):
+            yield name, json.loads(data)
+
+    def update(self, devices):
+        """ Stores several devices at once.
+
+        Args:
+            devices ('dict' or 'iterable'): Mapping of device names to device
+                data, or the name and data pairs.
+
+        """
+        if hasattr(devices, 'items'):
+            devices = devices.items()
+
+        self._db.executemany('INSERT OR REPLACE INTO devices VALUES (?, ?, ?)',
+                ((name, self._ip(device), json.dumps(device))
+                                                for name, device in devices))
+
+    def find_by_ip(self, ip):
+        """ Finds the devices whose first connection uses the given IP.
+
+        Args:
+            ip ('str'): The IP.
+
+        Returns:
+            list: The names of the devices.
+
+        """
+        return [row[0] for row in self._db.execute(
+                'SELECT name FROM devices WHERE ip = ? ORDER BY name', (ip,))]
+
+    def close(self):
+        """ Closes and removes the database.
+
+        """
+        if getattr(self, '_db', None) is None:
+            return
+
+        self._db.close()
+        self._db = None
+
+        if os.path.isfile(self._path):
+            os.remove(self._path)
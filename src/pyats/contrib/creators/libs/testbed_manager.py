@@ -2,7 +2,6 @@ import logging
 import argparse
 import ipaddress
 from concurrent.futures import ThreadPoolExecutor
-from genie.conf.base import Testbed, Device, Interface, Link
 from pyats.async_ import pcall
 from pyats.log import TaskLogHandler
 from pyats.log import ScreenHandler
@@ -0,0 +1,216 @@
+import yaml
+
+class Stage(object):
+    """ Stage class
+
+    Base class of the transform stages applied to the generated devices before
+    they are written. A stage is called with the name and data of a device and
+    returns the transformed name and data, or None to drop the device.
+
+    """
+
+    def __call__(self, name, device):
+        raise NotImplementedError(
+            "Derived class must implement `__call__` method."
+        )
+
+class Filter(Stage):
+    """ Filter class (Stage)
+
+    Keeps only the devices for which the predicate is true.
+
+    Args:
+        predicate ('callable'): Takes the device name and data.
+
+    """
+
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    def __call__(self, name, device):
+        return (name, device) if self.predicate(name, device) else None
+
+class Drop(Stage):
+    """ Drop class (Stage)
+
+    Drops the devices for which the predicate is true.
+
+    Args:
+        predicate ('callable'): Takes the device name and data.
+
+    """
+
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    def __call__(self, name, device):
+        return None if self.predicate(name, device) else (name, device)
+
+class Map(Stage):
+    """ Map class (Stage)
+
+    Replaces the data of every device with the result of the function.
+
+    Args:
+        function ('callable'): Takes the device name and data, and returns the
+            new device data.
+
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, name, device):
+        return name, self.function(name, device)
+
+class Rename(Stage):
+    """ Rename class (Stage)
+
+    Renames the devices, the topology of the device follows its new name.
+
+    Args:
+        names ('dict' or 'callable'): Mapping of the old names to the new ones,
+            or function taking the device name and data and returning the new
+            name.
+
+    """
+
+    def __init__(self, names):
+        self.names = names
+
+    def __call__(self, name, device):
+        if callable(self.names):
+            return self.names(name, device), device
+
+        return self.names.get(name, name), device
+
+def get_value(device, path):
+    """ Gets a value from device data.
+
+    Args:
+        device ('dict'): The device data.
+        path ('str'): Dotted path of the value, such as 'custom.site'.
+
+    Returns:
+        The value, or None if the path does not exist.
+
+    """
+    value = device
+
+    for key in path.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+
+    return value
+
+def set_value(device, path, value):
+    """ Sets a value in device data. The dictionaries along the path are
+        copied, since they may be shared between several devices.
+
+    Args:
+        device ('dict'): The device data.
+        path ('str'): Dotted path of the value, such as 'custom.site'.
+        value: The value to set.
+
+    Returns:
+        dict: The new device data.
+
+    """
+    keys = path.split('.')
+    result = current = dict(device)
+
+    for key in keys[:-1]:
+        inner = current.get(key)
+        current[key] = dict(inner) if isinstance(inner, dict) else {}
+        current = current[key]
+
+    current[keys[-1]] = value
+
+    return result
+
+def matcher(condition):
+    """ Builds a predicate from a 'path=value1,value2' condition. The predicate
+        is true if the value at the path is one of the given values, or, if no
+        value is given, if the value at the path is truthy.
+
+    Args:
+        condition ('str'): The condition.
+
+    Returns:
+        callable: The predicate.
+
+    """
+    path, separator, values = condition.partition('=')
+
+    if not separator:
+        return lambda name, device: bool(get_value(device, path))
+
+    expected = [(value, yaml.safe_load(value)) for value in values.split(',')]
+
+    def predicate(name, device):
+        actual = get_value(device, path)
+        return any(actual == loaded or str(actual) == value
+                                                for value, loaded in expected)
+
+    return predicate
+
+def parse_stage(spec):
+    """ Builds a stage from its command line format:
+
+            filter:path=value   keep devices whose value at path matches
+            drop:path=value     drop devices whose value at path matches
+            map:path=value      set the value at path on every device
+            rename:old=new      rename a device
+
+        Several values separated by commas can be given to filter and drop.
+        Without value, filter and drop check if the value at path is truthy.
+        Values are parsed as YAML scalars, so 'map:connections.cli.port=22'
+        sets an integer.
+
+    Args:
+        spec ('str'): The stage specification.
+
+    Returns:
+        Stage: The stage.
+
+    """
+    kind, _, argument = spec.partition(':')
+
+    if kind == 'filter':
+        return Filter(matcher(argument))
+    elif kind == 'drop':
+        return Drop(matcher(argument))
+    elif kind == 'map':
+        path, _, value = argument.partition('=')
+        value = yaml.safe_load(value)
+        return Map(lambda name, device: set_value(device, path, value))
+    elif kind == 'rename':
+        old, _, new = argument.partition('=')
+        return Rename({old: new})
+
+    raise Exception('Transform "{s}" is not valid, it must start with filter, '
+                                'drop, map or rename'.format(s=spec))
+
+def apply(stages, devices):
+    """ Lazily applies the stages to device records, one record at a time.
+
+    Args:
+        stages ('list'): The stages, applied in order.
+        devices ('iterable'): The device name and data pairs.
+
+    Yields:
+        tuple: The original name, the new name and the new data of every
+            device that was not dropped.
+
+    """
+    for original, device in devices:
+        name = original
+
+        for stage in stages:
+            record = stage(name, device)
+
+            if record is None:
+                break
+
+            name, device = record
+        else:
+            yield original, name, device
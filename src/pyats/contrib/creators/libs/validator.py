@@ -0,0 +1,249 @@
+import os
+import re
+import ipaddress
+import importlib.util
+
+# Hostnames are accepted as connection IP, pyATS resolves them
+_HOSTNAME = re.compile(r'^(?=.{1,253}$)[A-Za-z0-9_]([A-Za-z0-9_-]{0,62})'
+                                    r'(\.[A-Za-z0-9_]([A-Za-z0-9_-]{0,62}))*\.?$')
+_NUMERIC = re.compile(r'^[0-9.]+$')
+_OS = re.compile(r'^[a-z][a-z0-9_]*$')
+
+# Genie libraries whose folders are named after the OS they support
+_GENIE_LIBS = ('parser', 'conf', 'ops', 'sdk', 'clean')
+
+def _folders(path):
+    """ Helper to list the package folders of a folder.
+
+    Args:
+        path ('str'): The folder.
+
+    Returns:
+        set: The folder names, without the private and test ones.
+
+    """
+    if not os.path.isdir(path):
+        return set()
+
+    return {name for name in os.listdir(path)
+                    if os.path.isdir(os.path.join(path, name)) and
+                                not name.startswith('_') and name != 'tests'}
+
+def supported_os():
+    """ Finds the OS values supported by Unicon and Genie, from the plugin
+        folders of Unicon and the OS folders of the Genie libraries. Neither
+        is imported, since importing them is slow.
+
+    Returns:
+        set: The OS values, or None if neither is installed.
+
+    """
+    values = None
+
+    for name in ('unicon', 'genie'):
+        try:
+            spec = importlib.util.find_spec(name)
+        except ValueError:
+            spec = None
+
+        if spec is None:
+            continue
+
+        # Genie is a namespace package spread over several folders
+        for location in spec.submodule_search_locations or []:
+            if name == 'unicon':
+                found = _folders(os.path.join(location, 'plugins'))
+            else:
+                found = set().union(*(_folders(os.path.join(location, 'libs',
+                                            lib)) for lib in _GENIE_LIBS))
+            if found:
+                values = (values or set()) | found
+
+    return values
+
+class Validator(object):
+    """ Validator class
+
+    Checks generated testbed data in a single pass and reports every error
+    found, instead of stopping at the first one:
+
+        - the required fields of the devices
+        - the OS values, to be lower case words, and against the OS supported
+          by Unicon and Genie as warnings, since pyATS accepts other ones
+        - the connection IP and port formats
+        - the devices sharing a connection IP and port
+        - the topology of devices that do not exist, and the links with a
+          single interface
+
+    Args:
+        required ('list') default=None: The required device fields, 'os',
+            'type' and 'connections' by default.
+        os_values ('set') default=None: The known OS values, the OS supported
+            by Unicon and Genie by default. Without them, the OS is only
+            checked to be a lower case word.
+        addresses ('bool') default=True: Whether devices sharing a connection
+            IP and port are reported.
+
+    Examples:
+        warnings = {}
+        errors = Validator().validate(testbed, warnings)
+        for name, messages in errors.items():
+            print(name, messages)
+
+    """
+
+    REQUIRED = ('os', 'type', 'connections')
+
+    def __init__(self, required=None, os_values=None, addresses=True):
+        self._required = tuple(required or self.REQUIRED)
+        self._addresses = addresses
+        self._os_values = os_values if os_values is not None \
+                                                            else supported_os()
+
+    def _check_os(self, value):
+        """ Helper to check the format of an OS value.
+
+        Args:
+            value: The OS value.
+
+        Returns:
+            bool: Whether the value is valid.
+
+        """
+        return isinstance(value, str) and _OS.match(value) is not None
+
+    def _known_os(self, value):
+        """ Helper to check that an OS value is supported by Unicon or Genie.
+
+        Args:
+            value ('str'): The OS value.
+
+        Returns:
+            bool: Whether the value is known, True if the OS values are not
+                known either.
+
+        """
+        return self._os_values is None or value in self._os_values
+
+    def _check_ip(self, value):
+        """ Helper to check a connection IP, or hostname.
+
+        Args:
+            value: The IP value.
+
+        Returns:
+            bool: Whether the value is valid.
+
+        """
+        try:
+            ipaddress.ip_address(str(value))
+            return True
+        except ValueError:
+            # Numbers only are a malformed IP rather than a hostname
+            return isinstance(value, str) and not _NUMERIC.match(value) and \
+                                            _HOSTNAME.match(value) is not None
+
+    def _check_port(self, value):
+        """ Helper to check a connection port.
+
+        Args:
+            value: The port value.
+
+        Returns:
+            bool: Whether the value is valid.
+
+        """
+        if isinstance(value, bool):
+            return False
+
+        try:
+            port = int(str(value))
+        except ValueError:
+            return False
+
+        return 0 < port < 65536
+
+    def validate(self, testbed, warnings=None):
+        """ Validates testbed data.
+
+        Args:
+            testbed ('dict'): Dictionary containing testbed data.
+            warnings ('dict') default=None: Where to report the OS values not
+                supported by Unicon or Genie, as a mapping of device names to
+                messages. They are not reported without it.
+
+        Returns:
+            dict: Mapping of device names, or 'topology' for links, to the
+                list of their error messages. Empty if the testbed is valid.
+
+        """
+        errors = {}
+        addresses = {}
+        devices = testbed.get('devices') or {}
+
+        def error(name, message):
+            errors.setdefault(name, []).append(message)
+
+        for name, device in devices.items():
+            if not isinstance(device, dict):
+                error(name, 'device data must be a dictionary')
+                continue
+
+            for field in self._required:
+                if device.get(field) in (None, '', {}):
+                    error(name, 'missing required field "{f}"'.format(f=field))
+
+            value = device.get('os')
+            if value not in (None, ''):
+                if not self._check_os(value):
+                    error(name, 'os "{o}" is not valid'.format(o=value))
+                elif not self._known_os(value) and warnings is not None:
+                    warnings.setdefault(name, []).append('os "{o}" is not '
+                        'supported by Unicon or Genie'.format(o=value))
+
+            connections = device.get('connections') or {}
+            if not isinstance(connections, dict):
+                error(name, 'connections must be a dictionary')
+                continue
+
+            for connection, attributes in connections.items():
+                if not isinstance(attributes, dict) or connection == 'defaults':
+                    continue
+
+                ip = attributes.get('ip')
+                port = attributes.get('port')
+
+                if ip is not None and not self._check_ip(ip):
+                    error(name, 'connection {c} ip "{i}" is not valid'
+                                                    .format(c=connection, i=ip))
+
+                if port is not None and not self._check_port(port):
+                    error(name, 'connection {c} port "{p}" is not valid'
+                                                .format(c=connection, p=port))
+
+                # Console servers share an IP, a device is identified by the
+                # IP and the port
+                if ip is not None and self._addresses:
+                    key = (str(ip), str(port))
+                    other = addresses.setdefault(key, name)
+                    if other != name:
+                        error(name, 'connection {c} uses the same address as '
+                                'device {d}'.format(c=connection, d=other))
+
+        endpoints = {}
+        for name, data in (testbed.get('topology') or {}).items():
+            if name not in devices:
+                error('topology', 'device {d} does not exist'.format(d=name))
+
+            interfaces = (data or {}).get('interfaces') or {}
+            for interface, attributes in interfaces.items():
+                if attributes and attributes.get('link'):
+                    endpoints.setdefault(attributes['link'], []).append(
+                                        '{d} {i}'.format(d=name, i=interface))
+
+        for link, ends in endpoints.items():
+            if len(ends) < 2:
+                error('topology', 'link {l} only connects {e}'.format(l=link,
+                                                                    e=ends[0]))
+
+        return errors
@@ -0,0 +1,192 @@
+import os
+import time
+import logging
+import threading
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = FileSystemEventHandler = None
+
+logger = logging.getLogger(__name__)
+
+# Events of watchdog changing the content of files
+_CHANGES = {'created', 'modified', 'deleted', 'moved', 'closed'}
+
+class Watcher(object):
+    """ Watcher class
+
+    Watches a file or a folder for changes. Changes are notified by the
+    operating system, such as through inotify, when watchdog is installed, and
+    found by polling the modification time of the files otherwise.
+
+    Args:
+        path ('str'): The file or folder to watch.
+        recursive ('bool') default=False: Whether changes in the subfolders of
+            a folder are watched too.
+        ignore ('str') default=None: A folder, such as the output one, whose
+            changes are ignored.
+        interval ('float') default=1: Number of seconds between two scans,
+            when polling.
+        polling ('bool') default=False: Poll even if watchdog is installed.
+
+    Examples:
+        watcher = Watcher('inventory', recursive=True)
+        while True:
+            changed = watcher.wait(debounce=1)
+
+    """
+
+    def __init__(self, path, recursive=False, ignore=None, interval=1,
+                                                            polling=False):
+        self._path = os.path.abspath(path)
+        self._file = not os.path.isdir(self._path)
+        self._recursive = recursive
+        self._ignore = os.path.abspath(ignore) if ignore else None
+        self._interval = interval
+        self._changes = set()
+        self._last = 0
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+
+        folder = os.path.dirname(self._path) if self._file else self._path
+
+        if Observer is not None and not polling:
+            watcher = self
+
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    # Reading the files to convert them must not be a change
+                    if event.is_directory or event.event_type not in \
+                                                                _CHANGES:
+                        return
+                    watcher._record(event.src_path)
+                    # Editors often save through a temporary file renamed
+                    watcher._record(getattr(event, 'dest_path', None))
+
+            self._observer = Observer()
+            self._observer.schedule(Handler(), folder, 
+                                    recursive=recursive and not self._file)
+            self._observer.start()
+        else:
+            self._observer = None
+            thread = threading.Thread(target=self._poll, daemon=True)
+            thread.start()
+
+    def _watched(self, path):
+        """ Helper to check if a changed path is watched.
+
+        Args:
+            path ('str'): The changed path.
+
+        Returns:
+            bool: Whether the change is watched.
+
+        """
+        path = os.path.abspath(path)
+
+        if self._ignore and (path == self._ignore or 
+                                    path.startswith(self._ignore + os.sep)):
+            return False
+
+        if self._file:
+            return path == self._path
+
+        return os.path.basename(path)[:1] != '.' and \
+                    (self._recursive or os.path.dirname(path) == self._path)
+
+    def _record(self, path):
+        """ Helper to record a change and wake up the waiting thread.
+
+        Args:
+            path ('str'): The changed path.
+
+        """
+        if not path or not self._watched(path):
+            return
+
+        with self._condition:
+            self._changes.add(os.path.abspath(path))
+            self._last = time.monotonic()
+            self._condition.notify_all()
+
+    def _scan(self):
+        """ Helper to collect the size and modification time of the watched
+            files.
+
+        Returns:
+            dict: The size and modification time of every file.
+
+        """
+        if self._file:
+            paths = [self._path]
+        else:
+            paths = []
+            for root, folders, names in os.walk(self._path):
+                paths.extend(os.path.join(root, name) for name in names)
+                if not self._recursive:
+                    break
+
+        files = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+
+        return files
+
+    def _poll(self):
+        """ Scans the watched files until stopped, recording the files added,
+            modified or deleted since the previous scan.
+
+        """
+        previous = self._scan()
+
+        while not self._stopped.wait(self._interval):
+            current = self._scan()
+            for path in set(previous) | set(current):
+                if previous.get(path) != current.get(path):
+                    self._record(path)
+            previous = current
+
+    def wait(self, debounce=1, timeout=None):
+        """ Waits for changes, until no other change happens for a while so
+            that a file being saved is only reported once.
+
+        Args:
+            debounce ('float') default=1: Number of seconds without change
+                before the changes are returned.
+            timeout ('float') default=None: Maximum number of seconds to wait
+                for a first change, forever by default.
+
+        Returns:
+            set: The absolute paths of the changed files, empty if the timeout
+                expired.
+
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._changes, timeout):
+                return set()
+
+            while True:
+                remaining = self._last + debounce - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            changes, self._changes = self._changes, set()
+
+        return changes
+
+    def stop(self):
+        """ Stops watching.
+
+        """
+        self._stopped.set()
+
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
@@ -0,0 +1,224 @@
+import time
+import logging
+import importlib
+
+from concurrent.futures import ThreadPoolExecutor
+from .creator import TestbedCreator, _process_pool
+
+logger = logging.getLogger(__name__)
+
+def _run_source(source, arguments):
+    """ Runs the creator of a source. Defined at module level so that it can
+        be sent to worker processes.
+
+    Args:
+        source ('str'): The source name, such as 'netbox' or 'file'.
+        arguments ('dict'): Arguments for the creator of the source.
+
+    Returns:
+        tuple: The testbed data, the creator result and the elapsed time.
+
+    """
+    start = time.time()
+    creator = _creator_class(source)(parse_cli=False, **arguments)
+    testbed = creator._generate_testbed()
+
+    return testbed, creator._result, time.time() - start
+
+def _creator_class(source):
+    """ Finds the creator class of a source.
+
+    Args:
+        source ('str'): The source name.
+
+    Returns:
+        type: The creator class.
+
+    """
+    module = importlib.import_module('.' + source, __package__)
+
+    return getattr(module, source.title())
+
+class Multi(TestbedCreator):
+    """ Multi class (TestbedCreator)
+
+    Creator for the 'multi' source. Runs the creators of several sources
+    concurrently and merges their data into a single testbed file or object.
+    Sources bound by I/O, such as NetBox, run in threads while sources bound
+    by CPU, such as files or Ansible inventories, run in their own process.
+
+    Args:
+        sources ('list'): The sources to run, either as tuples of source name
+            and arguments dictionary, or as strings in the
+            'source:key=value,key=value' format.
+        workers ('int') default=None: Maximum number of sources running at the
+            same time, all of them by default.
+        encode_password ('bool') default=False: Should generated testbed encode
+            its passwords.
+
+    CLI Argument           |  Class Argument
+    ------------------------------------------------
+    --sources s1 s2 ...    |  sources=['s1', 's2', ...]
+    --workers=value        |  workers=value
+    --encode-password      |  encode_password=True
+
+    pyATS Examples:
+        pyats create testbed multi --output=lab.yaml --sources
+        netbox:netbox_url=https://netbox.com,user_token=72830d67
+        ansible:inventory_name=inventory.ini file:path=lab.csv
+
+    Examples:
+        # Create testbed from NetBox and a CSV file
+        creator = Multi(sources=[
+            ('netbox', {'netbox_url': 'https://netbox.com',
+                        'user_token': '72830d67'}),
+            ('file', {'path': 'lab.csv'})
+        ])
+        creator.to_testbed_file("testbed.yaml")
+        creator.to_testbed_object()
+
+    """
+
+    def _init_arguments(self):
+        """ Specifies the arguments for the creator.
+
+        Returns:
+            dict: Arguments for the creator.
+
+        """
+        self._cli_list_arguments.append('--sources')
+
+        return {
+            'required': ['sources'],
+            'optional': {
+                'workers': None,
+                'encode_password': False
+            }
+        }
+
+    @staticmethod
+    def _parse_source(spec):
+        """ Helper to parse a source given in 'source:key=value,key=value'
+            format. Keys without value are considered flags.
+
+        Args:
+            spec ('str' or 'tuple'): The source specification.
+
+        Returns:
+            tuple: The source name and its arguments.
+
+        """
+        if not isinstance(spec, str):
+            source, arguments = spec
+            return source, dict(arguments)
+
+        source, _, options = spec.partition(':')
+        arguments = {}
+
+        for option in filter(None, options.split(',')):
+            key, separator, value = option.partition('=')
+            key = key.replace('--', '').replace('-', '_')
+            arguments[key] = value if separator else True
+
+        return source, arguments
+
+    def _generate(self):
+        """ Runs the sources concurrently and merges their testbed data.
+
+        Returns:
+            dict: The intermediate dictionary format of the testbed data.
+
+        """
+        sources = [self._parse_source(spec) for spec in self._sources]
+        names = [source for source, _ in sources]
+        labels = [source if names.count(source) == 1 else
+                    '{s}#{i}'.format(s=source, i=index + 1)
+                        for index, source in enumerate(names)]
+        workers = int(self._workers) if self._workers else len(sources)
+
+        # An unknown source is reported like a failing one, without stopping
+        # the others
+        classes = {}
+        for label, (source, _) in zip(labels, sources):
+            try:
+                classes[label] = _creator_class(source)
+            except Exception as e:
+                self._result['errored'][label] = 'has an error: {e}'\
+                                                            .format(e=str(e))
+
+        # The processes are not forked, as threads run beside them
+        threads = ThreadPoolExecutor(max_workers=workers)
+        processes = _process_pool(workers, threaded=True)
+
+        try:
+            futures = {}
+            for label, (source, arguments) in zip(labels, sources):
+                if label not in classes:
+                    continue
+
+                # The merged testbed is validated as a whole
+                arguments.setdefault('validate', False)
+                executor = processes if classes[label]._cpu_bound else threads
+                futures[label] = executor.submit(_run_source, source, arguments)
+
+            testbed = {}
+            for label, future in futures.items():
+                try:
+                    data, result, elapsed = future.result()
+                except Exception as e:
+                    self._result['errored'][label] = 'has an error: {e}'\
+                                                            .format(e=str(e))
+                    continue
+
+                logger.info('{l} generated in {t:.2f}s'.format(l=label,
+                                                                t=elapsed))
+
+                # Collect the result of the source for print_result
+                for status in ('errored', 'warning'):
+                    for key, value in result[status].items():
+                        self._result[status]['{l}: {k}'.format(l=label,
+                                                                k=key)] = value
+
+                # Files from a folder are generated as a list of testbeds
+                if isinstance(data, list):
+                    for _, item in data:
+                        self._merge_testbed(testbed, item, label)
+                else:
+                    self._merge_testbed(testbed, data, label)
+        finally:
+            threads.shutdown()
+            processes.shutdown()
+
+        return testbed if testbed.get('devices') else None
+
+    def _merge_testbed(self, testbed, data, label):
+        """ Merges the testbed data of a source into the combined testbed.
+            Devices already generated by a previous source are kept.
+
+        Args:
+            testbed ('dict'): The combined testbed data.
+            data ('dict'): The testbed data of the source.
+            label ('str'): The source label, for the warnings.
+
+        """
+        if not data:
+            return
+
+        for key, value in data.items():
+            if key not in ('devices', 'topology'):
+                testbed.setdefault(key, value)
+
+        devices = testbed.setdefault('devices', {})
+        topology = data.get('topology') or {}
+
+        for name, device in data.get('devices', {}).items():
+            if name in devices:
+                self._result['warning']['{l}: {n}'.format(l=label, n=name)] = \
+                    'is already generated by another source, skipping'
+                continue
+
+            devices[name] = device
+            devices = testbed['devices'] = self._bounded_devices(devices)
+
+            if name in topology:
+                testbed.setdefault('topology', {})[name] = topology[name]
@@ -1,11 +1,37 @@
-import requests 
 import copy
 import logging
+import threading
 
 from .creator import TestbedCreator
 
 logger = logging.getLogger(__name__)
 
+# Shared by the creators of the same NetBox instance and token, so that
+# connections to NetBox are reused across runs, such as in the creator service,
+# without sharing cookies between callers
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def _get_session(url, token):
+    """ Creates the HTTP session of a NetBox instance and token on first use.
+        Requests is imported there, since it is slow to import.
+
+    Args:
+        url ('str'): The URL of the NetBox instance.
+        token ('str'): The REST API access token.
+
+    Returns:
+        Session: The HTTP session.
+
+    """
+    with _sessions_lock:
+        session = _sessions.get((url, token))
+        if session is None:
+            import requests
+            session = _sessions[(url, token)] = requests.Session()
+
+    return session
+
 class Netbox(TestbedCreator):
     """ Netbox class (TestbedCreator)
 
@@ -38,6 +64,8 @@ class Netbox(TestbedCreator):
     --def_user=value    |  def_user=value
     --def_pass=value    |  def_pass=value
     --tag_telnet=value  |  tag_telnet=value
+    --record=value      |  record=value
+    --replay=value      |  replay=value
 
     pyATS Examples:
         pyats create testbed netbox --output=out --netbox-url=https://netbox.com
@@ -95,7 +123,24 @@ class Netbox(TestbedCreator):
 
     def _get_request(self, url, headers=None, return_property=None):
         """ Helper to send GET request and returns the response JSON in 
-            dictionary form.
+            dictionary form. All the pages of the response are retrieved, 
+            through the source snapshot.
+
+        Args:
+            url ('str'): URL of where to send the GET request to.
+            headers ('dict'): The headers used in the HTTP request.
+            return_property ('str'): Any filtering applied to the dictionary
+                after parsing the JSON.
+
+        Returns:
+            dict: The response JSON in dictionary form.
+    
+        """
+        return self._source_data(url, lambda: self._send_request(url, headers,
+                                                            return_property))
+
+    def _send_request(self, url, headers=None, return_property=None):
+        """ Helper to send GET request for every page of the response.
 
         Args:
             url ('str'): URL of where to send the GET request to.
@@ -109,20 +154,21 @@ class Netbox(TestbedCreator):
         """
         try:
             response = None
+            session = _get_session(self._netbox_url, self._user_token)
 
             if not headers:
-                response = requests.get(url, verify=self._verify)
+                response = session.get(url, verify=self._verify)
             else:
-                response = requests.get(url, headers=headers, verify=self._verify)
+                response = session.get(url, headers=headers, verify=self._verify)
             
             results = self._parse_response(response, return_property)
 
             while "next" in response.json().keys() and response.json()["next"]:
                 next_url = response.json()["next"]
                 if not headers:
-                    response = requests.get(next_url, verify=self._verify)
+                    response = session.get(next_url, verify=self._verify)
                 else:
-                    response = requests.get(next_url, headers=headers, verify=self._verify)
+                    response = session.get(next_url, headers=headers, verify=self._verify)
                 
                 results += self._parse_response(response, return_property)
 
@@ -598,6 +644,9 @@ class Netbox(TestbedCreator):
                     "Skipping..."
                 )
                 
+                self._result['warning'][device_name] = ('has no valid OS '
+                                                            'type, skipping')
+
                 # Delete the device from testbed
                 del data[device_name]
                 continue
@@ -632,6 +681,9 @@ class Netbox(TestbedCreator):
                         "Skipping device..."
                     )
 
+                    self._result['warning'][device_name] = ('has no '
+                                                    'interface, skipping')
+
                     # Delete device data from testbed
                     del data[device_name]
                     continue
@@ -692,6 +744,8 @@ class Netbox(TestbedCreator):
                     "Connection IP not found for {}. ".format(device_name) +
                     "Skipping device..."
                 )
+                self._result['warning'][device_name] = ('has no connection '
+                                                            'IP, skipping')
                 
                 del data[device_name]
                 continue
@@ -1,6 +1,3 @@
-import xlrd
-import xlwt
-import xlsxwriter
 import csv
 import os
 import logging
@@ -116,6 +113,8 @@ class Template(TestbedCreator):
         """ Helper for writing keys to XLS.
         
         """
+        import xlwt
+
         wb = xlwt.Workbook()
         ws = wb.add_sheet('testbed')
         for i, k in enumerate(self._keys):
@@ -126,6 +125,8 @@ class Template(TestbedCreator):
         """ Helper for writing keys to XLSX.
         
         """
+        import xlsxwriter
+
         wb = xlsxwriter.Workbook(output)
         ws = wb.add_worksheet('testbed')
         ws.write_row('A1', self._keys)
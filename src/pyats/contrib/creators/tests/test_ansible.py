@@ -1,4 +1,9 @@
+import os
+import sys
+import shutil
+
 from ..ansible import Ansible
+from ..libs.inventory import read_inventory
 from unittest import TestCase, main
 from pyats.topology import Testbed
 
@@ -176,5 +181,108 @@ ansible_become_pass=Cisc0123
         with open(self.output) as file:
             self.assertEqual(file.read(), expected)
 
+    def test_native_inventory(self):
+        directory = '/tmp/inventory'
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.makedirs(os.path.join(directory, 'group_vars', 'iosxe'))
+        os.makedirs(os.path.join(directory, 'host_vars'))
+        with open(os.path.join(directory, 'inventory.yaml'), 'w') as file:
+            file.write("""all:
+  children:
+    iosxe:
+      hosts:
+        R[1:2]_xe:2222:
+        R3_xe:
+          ansible_host: 172.16.1.230
+      vars:
+        ansible_network_os: ios
+    core:
+      children:
+        iosxe:
+""")
+        with open(os.path.join(directory, 'group_vars', 'iosxe', 'a.yml'),
+                                                                'w') as file:
+            file.write('ansible_user: admin\nansible_ssh_pass: Cisc0123\n'
+                                                        'ntp: 10.0.0.1\n')
+        with open(os.path.join(directory, 'host_vars', 'R1_xe.json'),
+                                                                'w') as file:
+            file.write('{"ansible_host": "172.16.1.228"}')
+
+        creator = Ansible(inventory_name=os.path.join(directory,
+                                                            'inventory.yaml'))
+        inventory = read_inventory(creator._inventory_name)
+        self.assertEqual(inventory['iosxe']['vars']['ansible_user'], 'admin')
+        self.assertEqual(inventory['iosxe']['vars']['ntp'], '10.0.0.1')
+        self.assertEqual(inventory['_meta']['hostvars']['R2_xe'],
+                                                        {'ansible_port': 2222})
+
+        testbed = creator._generate()
+        self.assertEqual(sorted(testbed['devices']), ['R1_xe', 'R2_xe',
+                                                                    'R3_xe'])
+        self.assertEqual(testbed['devices']['R1_xe']['connections']['cli']
+                                                    ['ip'], '172.16.1.228')
+
+        # Ansible only resolves the variables used by the creator
+        exported = creator._ansible_inventory()
+        self.assertEqual(exported['iosxe']['hosts'], ['R1_xe', 'R2_xe',
+                                                                    'R3_xe'])
+        self.assertNotIn('ntp', exported['iosxe']['vars'])
+        self.assertNotIn('R2_xe', exported['_meta']['hostvars'])
+        creator._export_inventory = creator._ansible_inventory
+        self.assertEqual(creator._generate(), testbed)
+
+        # Plugin configurations and folders are left to Ansible
+        with open(os.path.join(directory, 'netbox.yml'), 'w') as file:
+            file.write('plugin: netbox.netbox.nb_inventory\n')
+        self.assertIsNone(read_inventory(os.path.join(directory,
+                                                                'netbox.yml')))
+        self.assertIsNone(read_inventory(directory))
+
+    def test_inventory_cache(self):
+        directory = '/tmp/inventory_cache'
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+
+        # Dynamic inventory script counting its calls
+        script = os.path.join(directory, 'inventory.py')
+        calls = os.path.join(directory, 'calls')
+        with open(script, 'w') as file:
+            file.write("""#!{python}
+import json
+with open('{calls}', 'a') as file:
+    file.write('.')
+print(json.dumps({{
+    'iosxe': {{
+        'hosts': ['R1_xe'],
+        'vars': {{'ansible_network_os': 'ios', 'ansible_user': 'admin',
+                 'ansible_ssh_pass': 'Cisc0123'}}
+    }},
+    '_meta': {{'hostvars': {{'R1_xe': {{'ansible_host': '172.16.1.228'}}}}}}
+}}))
+""".format(python=sys.executable, calls=calls))
+        os.chmod(script, 0o755)
+
+        def generate(**kwargs):
+            creator = Ansible(inventory_name=script, inventory_cache=
+                                    os.path.join(directory, 'cache'), **kwargs)
+            testbed = creator._generate()
+            self.assertEqual(list(testbed['devices']), ['R1_xe'])
+            with open(calls) as file:
+                return len(file.read())
+
+        self.assertEqual(generate(), 1)
+        self.assertEqual(generate(), 1)
+        self.assertEqual(generate(cache_ttl=3600), 1)
+        self.assertEqual(generate(refresh=True), 2)
+        self.assertEqual(generate(cache_ttl=0), 3)
+
+        # Changing the script runs it again
+        with open(script, 'a') as file:
+            file.write('# changed\n')
+        self.assertEqual(generate(), 4)
+        self.assertEqual(generate(), 4)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,45 @@
+import os
+import shutil
+import threading
+
+from ..libs.compression import atomic_file
+from unittest import TestCase, main
+
+class TestCompression(TestCase):
+    def setUp(self):
+        self.folder = '/tmp/atomic_output'
+        if os.path.isdir(self.folder):
+            shutil.rmtree(self.folder)
+        os.makedirs(self.folder)
+
+    def test_atomic_file(self):
+        with self.assertRaises(ValueError):
+            with atomic_file(self.folder + '/lab.yaml') as file:
+                file.write('devices:\n')
+                raise ValueError()
+        self.assertEqual(os.listdir(self.folder), [])
+
+        # Concurrent writers of the same path each write a whole file
+        barrier = threading.Barrier(4)
+        def write(index):
+            with atomic_file(self.folder + '/lab.yaml') as file:
+                barrier.wait()
+                file.write('devices: {}\n'.format(index) * 1000)
+        threads = [threading.Thread(target=write, args=(index,))
+                                                    for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(os.listdir(self.folder), ['lab.yaml'])
+        with open(self.folder + '/lab.yaml') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(len(lines), 1000)
+        self.assertEqual(len(set(lines)), 1)
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(os.stat(self.folder + '/lab.yaml').st_mode & 0o777,
+                                                            0o666 & ~umask)
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,14 @@
 
 import os
 import sys
+import gzip
+import yaml
+import shutil
+import threading
 
 from ..creator import TestbedCreator
+from ..libs.transforms import Filter, Map, Rename
+from ..libs.validator import Validator
 from unittest import TestCase, main
 from pyats.topology import Testbed
 from pyats.topology.loader.base import BaseTestbedLoader
@@ -108,8 +114,12 @@ class TestCreator(TestCase):
         class Test(TestbedCreator):
             def _init_arguments(self):
                 self._cli_list_arguments.append('--items')
+                self._cli_replacements.setdefault('-r', ('recurse', True))
                 return {
-                    "required": ["items", "a", "b"]
+                    "required": ["items", "a", "b"],
+                    "optional": {
+                        "recurse": False
+                    }
                 }
         sys.argv = ["creator", "--items", "1", "2", "3", "--a=1", "--b=1"]
         test = Test()
@@ -136,6 +146,11 @@ class TestCreator(TestCase):
         self.assertEqual(test._items, [])
         self.assertEqual(test._a, '1')
         self.assertEqual(test._b, '1')
+        sys.argv = ["creator", "--items", "rename:lab-r1=core1", "a--b", "-r",
+                    "--a=1", "--b=1"]
+        test = Test()
+        self.assertEqual(test._items, ['rename:lab-r1=core1', 'a--b'])
+        self.assertTrue(test._recurse)
 
     def test_cli_replacements(self):
         class Test(TestbedCreator):
@@ -185,5 +200,335 @@ class TestCreator(TestCase):
                 return {}
         self.assertTrue(isinstance(Test().to_testbed_object(), Testbed))
 
+    def test_shard_by_key(self):
+        folder = '/tmp/shards'
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        class Test(TestbedCreator):
+            def _generate(self):
+                return {
+                    'devices': {
+                        'R{}'.format(i): {'os': 'iosxe' if i < 3 else 'nxos'}
+                            for i in range(5)
+                    },
+                    'topology': {
+                        'R0': {'interfaces': {'Gi1': {'link': 'l1'}}},
+                        'R1': {'interfaces': {'Gi1': {'link': 'l1'},
+                                              'Gi2': {'link': 'l2'}}},
+                        'R3': {'interfaces': {'Eth1': {'link': 'l2'}}}
+                    }
+                }
+        sys.argv = ["creator"]
+        Test(shard_by='os').to_testbed_file(folder + '/lab.yaml')
+        with open(folder + '/lab_iosxe.yaml') as file:
+            shard = yaml.safe_load(file)
+        self.assertEqual(sorted(shard['devices']), ['R0', 'R1', 'R2'])
+        self.assertEqual(sorted(shard['topology']), ['R0', 'R1'])
+        with open(folder + '/lab_nxos.yaml') as file:
+            shard = yaml.safe_load(file)
+        self.assertEqual(sorted(shard['devices']), ['R3', 'R4'])
+        with open(folder + '/lab.manifest.yaml') as file:
+            manifest = yaml.safe_load(file)
+        self.assertEqual(manifest['shards'], 
+                        {'iosxe': 'lab_iosxe.yaml', 'nxos': 'lab_nxos.yaml'})
+        self.assertEqual(manifest['devices']['R3'], 'nxos')
+        self.assertEqual(list(manifest['links']), ['l2'])
+        self.assertEqual(len(manifest['links']['l2']), 2)
+
+    def test_shard_by_size(self):
+        folder = '/tmp/shards'
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        class Test(TestbedCreator):
+            def _generate(self):
+                return {'devices': {'R{}'.format(i): {'os': 'ios'} 
+                                                        for i in range(5)}}
+        sys.argv = ["creator"]
+        creator = Test(shard_size=2)
+        creator.to_testbed_file(folder + '/lab.yaml')
+        sizes = []
+        for i in range(1, 4):
+            with open('{}/lab_{}.yaml'.format(folder, i)) as file:
+                sizes.append(len(yaml.safe_load(file)['devices']))
+        self.assertEqual(sorted(sizes), [1, 2, 2])
+        self.assertFalse(os.path.isfile(folder + '/lab_4.yaml'))
+        creator = Test(shard_by=lambda name, device: name[-1] in '02')
+        shards, links = creator._shard_testbed(creator._generate())
+        self.assertEqual(sorted(shards), ['False', 'True'])
+        self.assertEqual(links, {})
+        # Numbered shards do not replace a shard named after a key
+        creator = Test(shard_size=2, shard_by=lambda name, device: 
+                                            'x_1' if name == 'R0' else 'x')
+        shards, links = creator._shard_testbed(creator._generate())
+        self.assertEqual(sorted(shards), ['x_1', 'x_1_2', 'x_2'])
+        self.assertEqual(list(shards['x_1']['devices']), ['R0'])
+
+    def test_replay_other_source(self):
+        snapshot = '/tmp/snapshots/test.json.gz'
+        class Test(TestbedCreator):
+            def _generate(self):
+                return self._source_data('devices', lambda: {'devices': {}})
+        class Other(Test):
+            pass
+        sys.argv = ["creator"]
+        Test(record=snapshot).to_testbed_object()
+        self.assertIsInstance(Test(replay=snapshot).to_testbed_object(), 
+                                                                    Testbed)
+        with self.assertRaises(Exception):
+            Other(replay=snapshot).to_testbed_object()
+
+    def test_transforms(self):
+        class Test(TestbedCreator):
+            def _generate(self):
+                credentials = {'default': {'username': 'admin'}}
+                return {
+                    'devices': {
+                        'R1': {'os': 'iosxe', 'credentials': credentials,
+                               'custom': {'lab': True}},
+                        'R2': {'os': 'iosxe', 'credentials': credentials},
+                        'R3': {'os': 'nxos', 'credentials': credentials}
+                    },
+                    'topology': {
+                        'R1': {'interfaces': {}},
+                        'R2': {'interfaces': {'Gi1': {'link': 'l1'}}}
+                    }
+                }
+        sys.argv = ["creator", "--transforms", "filter:os=iosxe,ios", 
+                    "drop:custom.lab", "map:credentials.default.username=bob",
+                    "rename:R2=core"]
+        testbed = Test()._generate_testbed()
+        self.assertEqual(list(testbed['devices']), ['core'])
+        self.assertEqual(testbed['topology'], 
+                                {'core': {'interfaces': {'Gi1': {'link': 'l1'}}}})
+        self.assertEqual(
+            testbed['devices']['core']['credentials']['default']['username'],
+                                                                        'bob')
+        sys.argv = ["creator"]
+        testbed = Test(transforms=[
+            Filter(lambda name, device: device['os'] == 'nxos'),
+            Map(lambda name, device: dict(device, type='switch')),
+            Rename(lambda name, device: name.lower())
+        ])._generate_testbed()
+        self.assertEqual(testbed['devices']['r3']['type'], 'switch')
+        self.assertEqual(testbed['topology'], {})
+        with self.assertRaises(Exception):
+            Test(transforms=['keep:os=nxos'])._generate_testbed()
+
+    def test_yaml_anchors(self):
+        output = '/tmp/anchors.yaml'
+        class Test(TestbedCreator):
+            def _generate(self):
+                return {'devices': {
+                    'R{}'.format(i): {
+                        'os': 'iosxe',
+                        'connections': {'cli': {'ip': '10.0.0.{}'.format(i)},
+                                        'defaults': {'via': 'cli'}},
+                        'credentials': {'default': {'username': 'admin',
+                                                    'password': 'admin'}}
+                    } for i in range(3)
+                }}
+        sys.argv = ["creator"]
+        Test().to_testbed_file(output)
+        with open(output) as file:
+            plain = file.read()
+        creator = Test(yaml_anchors=True)
+        creator._write_yaml(output, creator._generate(), True)
+        with open(output) as file:
+            shared = file.read()
+        self.assertEqual(shared.count('&id'), 2)
+        self.assertEqual(shared.count('*id'), 4)
+        self.assertEqual(shared.count('%ENC{'), 1)
+        Test(yaml_anchors=True).to_testbed_file(output)
+        with open(output) as file:
+            self.assertEqual(yaml.safe_load(file), yaml.safe_load(plain))
+
+    def test_parallel_dump(self):
+        output = '/tmp/parallel.yaml'
+        class Test(TestbedCreator):
+            _PARALLEL_MINIMUM = 10
+            _CHUNK_SIZE = 7
+            def _generate(self):
+                return {
+                    'devices': {'R{}'.format(i): {
+                        'os': 'iosxe',
+                        'connections': {'cli': {'ip': '10.0.0.{}'.format(i)}}
+                    } for i in range(50)},
+                    'topology': {'R{}'.format(i): {
+                        'interfaces': {'Gi1': {'link': 'L{}'.format(i // 2)}}
+                    } for i in range(50)}
+                }
+        sys.argv = ["creator"]
+        Test(serialize_workers=1).to_testbed_file(output)
+        with open(output) as file:
+            serial = file.read()
+        Test(serialize_workers=3).to_testbed_file(output)
+        with open(output) as file:
+            self.assertEqual(file.read(), serial)
+        Test(serialize_workers=3, store_threshold=20).to_testbed_file(output)
+        with open(output) as file:
+            self.assertEqual(file.read(), serial)
+
+        # Threads other than the main one dump in their own process by default
+        workers = []
+        thread = threading.Thread(target=lambda: workers.extend([
+                                    Test()._dump_workers(),
+                                    Test(serialize_workers=3)._dump_workers()]))
+        thread.start()
+        thread.join()
+        self.assertEqual(workers, [1, 3])
+        self.assertEqual(Test()._dump_workers(), os.cpu_count() or 1)
+
+    def test_lazy_testbed(self):
+        class Test(TestbedCreator):
+            def _generate(self):
+                devices = {'R{}'.format(i): {
+                    'os': 'iosxe',
+                    'type': 'router',
+                    'alias': 'r{}'.format(i),
+                    'connections': {'cli': {'ip': '10.0.0.{}'.format(i)}}
+                } for i in range(4)}
+                topology = {'R{}'.format(i): {'interfaces': {
+                    'Gi1': {'type': 'ethernet', 'link': 'L1'}
+                }} for i in range(2)}
+                return {'devices': devices, 'topology': topology}
+        sys.argv = ["creator"]
+        testbed = Test(lazy_testbed=True).to_testbed_object()
+        self.assertTrue(isinstance(testbed, Testbed))
+        self.assertEqual(sorted(testbed.devices), ['R0', 'R1', 'R2', 'R3'])
+        self.assertEqual(dict.__len__(testbed.devices), 0)
+        device = testbed.devices['r0']
+        self.assertEqual(device.os, 'iosxe')
+        self.assertIs(device.testbed, testbed)
+        self.assertEqual(dict.__len__(testbed.devices), 1)
+        remote = device.interfaces['Gi1'].remote_devices
+        self.assertEqual([d.name for d in remote], ['R1'])
+        self.assertEqual(dict.__len__(testbed.devices), 2)
+        self.assertIn('R3', testbed.devices)
+        self.assertNotIn('R4', testbed.devices)
+        self.assertEqual(len(testbed.links), 1)
+        self.assertEqual(dict.__len__(testbed.devices), 4)
+
+    def test_compressed_shards(self):
+        directory = '/tmp/compressed'
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        class Test(TestbedCreator):
+            def _generate(self):
+                return {'devices': {'R{}'.format(i): {'os': 'iosxe'} 
+                                                        for i in range(4)}}
+        sys.argv = ["creator"]
+        Test(shard_size=2).to_testbed_file(directory + '/testbed.yaml.gz')
+        self.assertEqual(sorted(os.listdir(directory)), ['testbed.manifest.yaml.gz',
+                            'testbed_1.yaml.gz', 'testbed_2.yaml.gz'])
+        with gzip.open(directory + '/testbed_2.yaml.gz', 'rt') as file:
+            self.assertEqual(sorted(yaml.safe_load(file)['devices']), 
+                                                                ['R2', 'R3'])
+
+    def test_validate(self):
+        class Test(TestbedCreator):
+            def _generate(self):
+                return {
+                    'devices': {
+                        'R1': {'os': 'iosxe', 'type': 'router', 'connections': 
+                                {'cli': {'ip': '10.0.0.1', 'port': 22}}},
+                        'R2': {'os': 'not-an-os', 'connections': 
+                                {'cli': {'ip': '10.0.0.1', 'port': 22},
+                                 'a': {'ip': '10.0.0.2', 'port': 'ssh'}}},
+                        'R3': {'os': 'nxos', 'type': 'switch', 'connections': 
+                                {'cli': {'ip': '10.0.0.300'}}}
+                    },
+                    'topology': {
+                        'R1': {'interfaces': {'Gi1': {'link': 'L1'}}},
+                        'R4': {'interfaces': {'Gi1': {'link': 'L2'}}}
+                    }
+                }
+        sys.argv = ["creator"]
+        creator = Test()
+        creator._generate_testbed()
+        errored = creator._result['errored']
+        self.assertEqual(sorted(errored), ['R2', 'R3', 'topology'])
+        self.assertIn('missing required field "type"', errored['R2'])
+        self.assertIn('os "not-an-os"', errored['R2'])
+        self.assertIn('port "ssh"', errored['R2'])
+        self.assertIn('same address as device R1', errored['R2'])
+        self.assertIn('ip "10.0.0.300"', errored['R3'])
+        self.assertIn('device R4 does not exist', errored['topology'])
+        self.assertIn('link L1 only connects R1 Gi1', errored['topology'])
+        creator = Test(validate=False)
+        creator._generate_testbed()
+        self.assertEqual(creator._result['errored'], {})
+
+        # OS values unknown to Unicon and Genie are only warnings
+        warnings = {}
+        testbed = {'devices': {'F1': {'os': 'bigip', 'type': 'lb', 
+                            'connections': {'cli': {'ip': '10.0.0.5'}}}}}
+        self.assertEqual(
+            Validator(os_values={'iosxe'}).validate(testbed, warnings), {})
+        self.assertEqual(warnings, 
+                    {'F1': ['os "bigip" is not supported by Unicon or Genie']})
+        self.assertEqual(Validator(os_values={'iosxe'}).validate(testbed), {})
+
+        # Flags given as strings on the command line
+        for value in ('False', 'false', '0', 'no'):
+            sys.argv = ['pyats', '--validate={}'.format(value)]
+            creator = Test()
+            self.assertIs(creator._validate, False)
+            creator._generate_testbed()
+            self.assertEqual(creator._result['errored'], {})
+        sys.argv = ['pyats', '--validate=True', '--yaml-anchors']
+        creator = Test()
+        self.assertIs(creator._validate, True)
+        self.assertIs(creator._yaml_anchors, True)
+        class Flags(TestbedCreator):
+            def _init_arguments(self):
+                return {'optional': {'full': False, 'merge': True}}
+        sys.argv = ['pyats', '--full=False', '--merge=no']
+        creator = Flags()
+        self.assertIs(creator._full, False)
+        self.assertIs(creator._merge, False)
+        sys.argv = ["creator"]
+
+    def test_construct_errors(self):
+        sys.argv = ["creator"]
+        creator = TestbedCreator()
+        rows = [
+            {'hostname': 'R1', 'ip': '10.0.0.1', 'protocol': 'ssh', 
+                                            'username': 'a', 'os': 'iosxe'},
+            {'hostname': 'R1', 'ip': '10.0.0.2', 'protocol': 'ssh', 
+                                            'username': 'a', 'os': 'iosxe'},
+            {'hostname': 'R2', 'ip': '10.0.0.3', 'username': 'a'},
+            {}
+        ]
+        with self.assertRaises(Exception) as context:
+            creator._construct_yaml(rows)
+        message = str(context.exception)
+        self.assertIn('Duplicate hostname "R1"', message)
+        self.assertIn('for device R2', message)
+        self.assertIn('Empty line', message)
+
+    def test_construct_ports(self):
+        sys.argv = ["creator"]
+        creator = TestbedCreator()
+        device = {'ip': '10.0.0.1', 'protocol': 'ssh', 'username': 'a', 
+                                                                'os': 'iosxe'}
+        rows = [
+            dict(device, **{'hostname': 'R1', 'ip': '10.0.0.1:2001', 
+                                                'custom:site': 'paris'}),
+            dict(device, hostname='R2', port=22.0, type='router'),
+            dict(device, hostname='R3', port='23.0', enable_password='e'),
+        ]
+        devices = creator._construct_yaml(rows)['devices']
+        self.assertEqual(devices['R1']['connections']['cli']['port'], 2001)
+        self.assertEqual(devices['R1']['custom'], {'site': 'paris'})
+        self.assertEqual(devices['R2']['connections']['cli']['port'], 22)
+        self.assertEqual(devices['R2']['type'], 'router')
+        self.assertEqual(devices['R3']['connections']['cli']['port'], 23)
+        self.assertEqual(devices['R3']['credentials']['enable']['password'], 
+                                                                        'e')
+        with self.assertRaises(Exception) as context:
+            creator._construct_yaml([dict(device, hostname='R4', port='ssh')])
+        self.assertEqual(str(context.exception), 
+                                        'Invalid port "ssh" for device R4')
+
 if __name__ == '__main__':
     main()        
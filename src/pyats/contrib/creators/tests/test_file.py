@@ -1,9 +1,20 @@
 import os
+import gzip
+import lzma
 import shutil
+import threading
+import yaml
 import xlwt
+import xlsxwriter
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 from ..file import File
-from unittest import TestCase, main
+from ..libs.transforms import Filter
+from unittest import TestCase, main, skipUnless
 from pyats.topology import Testbed
 
 class TestFile(TestCase):
@@ -80,6 +91,56 @@ class TestFile(TestCase):
         self.assertEqual('admin', 
                     testbed.devices['nx-osv-1'].credentials.default.username)
 
+    def test_streaming_csv(self):
+        creator = File(path=self.test_csv)
+        rows = creator._read_csv(self.test_csv)
+        self.assertEqual(creator._keys[:2], ['hostname', 'ip'])
+        self.assertFalse(isinstance(rows, list))
+        self.assertEqual(next(rows)['custom:opt2'], 'ss2')
+        self.assertEqual(list(rows), [])
+
+    def test_chunked_csv(self):
+        path = '/tmp/chunked.csv'
+        rows = ['R{i},10.0.{j}.{k}:22,admin,"pw,{i}",ssh,iosxe,s{j}'.format(
+                    i=i, j=i // 250, k=i % 250) for i in range(2000)]
+        header = 'hostname,ip,username,password,protocol,os,custom:site\n'
+
+        def generate(text, **kwargs):
+            with open(path, 'w') as file:
+                file.write(header + text)
+            creator = File(path=path, **kwargs)
+            creator._CHUNKED_MINIMUM = 1
+            creator._CHUNK_MINIMUM = 1024
+            return creator._generate_testbed()
+
+        serial = generate('\n'.join(rows) + '\n', workers=1)
+        chunked = generate('\n'.join(rows) + '\n', workers=2)
+        self.assertEqual(list(chunked['devices']), list(serial['devices']))
+        self.assertEqual(chunked, serial)
+        # Pools are not forked from other threads, and use a single process
+        # without a number of workers
+        results = []
+        def convert():
+            results.append(generate('\n'.join(rows) + '\n', workers=2))
+            creator = File(path=path)
+            creator._CHUNKED_MINIMUM = 1
+            results.append(creator._read_csv_chunks(path))
+        thread = threading.Thread(target=convert)
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [serial, None])
+        # Hostnames are unique across the chunks
+        with self.assertRaises(Exception) as context:
+            generate('\n'.join(rows + rows[:1]) + '\n', workers=2)
+        self.assertEqual(str(context.exception), 
+                                        'Duplicate hostname "R0" detected')
+        # Line breaks in quoted values are read by the regular path
+        rows[1000] = rows[1000].replace('pw,', 'pw\n')
+        chunked = generate('\n'.join(rows) + '\n', workers=2)
+        self.assertEqual(
+            chunked['devices']['R1000']['credentials']['default']['password'],
+            'pw\n1000')
+
     def test_encode_password(self):
         File(path=self.test_csv, encode_password=True).to_testbed_file(
                                                                     self.output)
@@ -122,6 +183,163 @@ class TestFile(TestCase):
         with open('{}/1.yaml'.format(outsubdir)) as file: 
             self.assertEqual(file.read(), self.expected)
 
+    def test_parallel_directory(self):
+        directory = '/tmp/parallel_sources'
+        outdir = '/tmp/parallel_testbeds'
+        for folder in (directory, outdir):
+            if os.path.isdir(folder):
+                shutil.rmtree(folder)
+        os.makedirs(directory + '/subdir')
+        for name in ('0.csv', '1.csv', 'subdir/2.csv'):
+            with open('{}/{}'.format(directory, name), 'w') as file:
+                file.write(self.csv_file)
+        with open('{}/broken.csv'.format(directory), 'w') as file:
+            file.write("hostname,ip\nR1,10.0.0.1")
+        creator = File(path=directory, recurse=True, workers=2)
+        creator.to_testbed_file(outdir)
+        for name in ('0.yaml', '1.yaml', 'subdir/2.yaml'):
+            with open('{}/{}'.format(outdir, name)) as file: 
+                self.assertEqual(file.read(), self.expected)
+        self.assertFalse(os.path.exists('{}/broken.yaml'.format(outdir)))
+        self.assertIn('broken.csv', creator._result['errored'])
+        self.assertEqual(
+            creator._result['success'][directory.lstrip('./')].count('->'), 3)
+        creator = File(path=directory, workers=1)
+        self.assertEqual(len(creator.to_testbed_object()), 2)
+        self.assertIn('broken.csv', creator._result['errored'])
+
+    def test_incremental_directory(self):
+        directory = '/tmp/incremental_sources'
+        outdir = '/tmp/incremental_testbeds'
+        for folder in (directory, outdir):
+            if os.path.isdir(folder):
+                shutil.rmtree(folder)
+        os.makedirs(directory)
+        for i in range(3):
+            with open('{}/{}.csv'.format(directory, i), 'w') as file:
+                file.write(self.csv_file)
+        File(path=directory, workers=1).to_testbed_file(outdir)
+        self.assertTrue(os.path.isfile(outdir + '/.file_manifest.json'))
+        with open(directory + '/1.csv', 'a') as file:
+            file.write('\n')
+        os.remove(directory + '/2.csv')
+        creator = File(path=directory, workers=1)
+        creator.to_testbed_file(outdir)
+        self.assertEqual(creator._result['success'][directory.lstrip('./')],
+            '-> {}/1.yaml\n1 unchanged file(s) skipped\n'.format(outdir))
+        self.assertTrue(os.path.isfile(outdir + '/0.yaml'))
+        self.assertFalse(os.path.exists(outdir + '/2.yaml'))
+        # Touched but identical files and removed outputs
+        os.utime(directory + '/0.csv', (0, 0))
+        os.remove(outdir + '/1.yaml')
+        creator = File(path=directory, workers=1)
+        creator.to_testbed_file(outdir)
+        self.assertEqual(creator._result['success'][directory.lstrip('./')],
+            '-> {}/1.yaml\n1 unchanged file(s) skipped\n'.format(outdir))
+        creator = File(path=directory, workers=1, full=True)
+        creator.to_testbed_file(outdir)
+        self.assertEqual(
+            creator._result['success'][directory.lstrip('./')].count('->'), 2)
+        # In watch mode, only the changed files are checked
+        for name in ('0.csv', '1.csv'):
+            with open('{}/{}'.format(directory, name), 'w') as file:
+                file.write(self.csv_file.replace('ss2', 'ss3'))
+        creator = File(path=directory, workers=1)
+        creator._convert(outdir, {os.path.abspath(directory + '/1.csv')})
+        self.assertEqual(creator._result['success'][directory.lstrip('./')],
+            '-> {}/1.yaml\n1 unchanged file(s) skipped\n'.format(outdir))
+        # Failed writes are reported for the file and converted again
+        shutil.rmtree(outdir)
+        os.makedirs(outdir + '/0.yaml')
+        creator = File(path=directory, workers=1)
+        creator.to_testbed_file(outdir)
+        self.assertEqual(list(creator._result['errored']), ['0.csv'])
+        os.rmdir(outdir + '/0.yaml')
+        creator = File(path=directory, workers=1)
+        creator.to_testbed_file(outdir)
+        self.assertEqual(creator._result['success'][directory.lstrip('./')],
+            '-> {}/0.yaml\n1 unchanged file(s) skipped\n'.format(outdir))
+        # Testbed files and manifest written into the folder are not inputs
+        for _ in range(2):
+            creator = File(path=directory, workers=1, recurse=True)
+            creator.to_testbed_file(directory)
+            self.assertEqual(creator._result['errored'], {})
+        self.assertEqual(creator._result['success'][directory.lstrip('./')],
+                                            '2 unchanged file(s) skipped\n')
+        # Files writing the same testbed file are reported, not converted
+        for name in ('0.yaml', '1.yaml', '.file_manifest.json'):
+            os.remove('{}/{}'.format(directory, name))
+        shutil.copy(outdir + '/0.yaml', directory + '/0.yaml')
+        for full in (False, True):
+            creator = File(path=directory, workers=1, full=full)
+            creator.to_testbed_file(outdir)
+            self.assertEqual(sorted(creator._result['errored']), 
+                                                        ['0.csv', '0.yaml'])
+            self.assertEqual(creator._result['errored']['0.csv'], 
+                                    'has the same testbed file as 0.yaml')
+            self.assertTrue(os.path.isfile(outdir + '/0.yaml'))
+        os.remove(directory + '/0.yaml')
+        creator = File(path=directory, workers=1)
+        creator.to_testbed_file(outdir)
+        self.assertEqual(creator._result['success'][directory.lstrip('./')],
+            '-> {}/0.yaml\n1 unchanged file(s) skipped\n'.format(outdir))
+
+    def test_fingerprint(self):
+        def fingerprint(**arguments):
+            creator = File(path='/tmp', **arguments)
+            return creator._fingerprint()
+        # Same options whatever the run, the workers or the callable objects
+        self.assertEqual(
+            fingerprint(shard_by=lambda name, device: name[0], 
+                        transforms=[Filter(lambda name, device: True)]),
+            fingerprint(shard_by=lambda name, device: name[0], 
+                        transforms=[Filter(lambda name, device: True)],
+                        serialize_workers=3, store_threshold=10))
+        self.assertNotEqual(
+            fingerprint(shard_by=lambda name, device: name[0]),
+            fingerprint(shard_by=lambda name, device: name[1]))
+        self.assertNotEqual(fingerprint(), fingerprint(encode_password=True))
+
+    def test_merge_directory(self):
+        directory = '/tmp/merge_sources'
+        output = '/tmp/merged.yaml'
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        header = 'hostname,ip,username,password,protocol,os\n'
+        with open(directory + '/a.csv', 'w') as file:
+            file.write(header + 'R1,10.0.0.1,a,a,ssh,iosxe\n'
+                                'R2,10.0.0.2,a,"a\nb",ssh,iosxe\n'
+                                'R6,10.0.0.6,a,a,ssh,iosxe\n')
+        with open(directory + '/b.csv', 'w') as file:
+            file.write(header + 'R3,10.0.0.3,a,a,ssh,iosxe\n'
+                                'R1,10.0.0.4,a,a,ssh,iosxe\n'
+                                'R4,10.0.0.2,a,a,ssh,iosxe\n')
+        with open(directory + '/c.csv', 'w') as file:
+            file.write(header + 'R5,10.0.0.5\n')
+        with open(directory + '/d.yaml', 'w') as file:
+            yaml.safe_dump({'devices': {'R7': {'os': 'iosxe', 'type': 'iosxe',
+                'connections': {'cli': {'ip': '10.0.0.6'}}}}}, file)
+        for validate in (True, False):
+            creator = File(path=directory, merge=True, validate=validate)
+            creator.to_testbed_file(output)
+            with open(output) as file:
+                devices = yaml.safe_load(file)['devices']
+            self.assertEqual(sorted(devices), 
+                                        ['R1', 'R2', 'R3', 'R4', 'R6', 'R7'])
+            self.assertEqual(devices['R1']['connections']['cli']['ip'], 
+                                                                '10.0.0.1')
+            # Shared addresses are reported once, with the file and row
+            self.assertEqual(creator._result['warning'], {
+                'R1 in b.csv row 3': 'hostname is already defined in a.csv '
+                                                        'row 2, skipping',
+                'R4 in b.csv row 4': 'uses the same address as device R2 in '
+                                                                'a.csv row 3',
+                'R7 in d.yaml': 'uses the same address as device R6 in a.csv '
+                                                                    'row 5'
+            })
+            self.assertEqual(list(creator._result['errored']), ['c.csv'])
+
     def test_excel_load(self):
         wb = xlwt.Workbook()
         ws = wb.add_sheet('testbed')
@@ -141,5 +359,140 @@ class TestFile(TestCase):
         with open(self.output) as file: 
             self.assertEqual(file.read(), self.expected_encoded)
 
+    def test_xlsx_load(self):
+        workbook_name = '/tmp/test.xlsx'
+        workbook = xlsxwriter.Workbook(workbook_name)
+        sheet = workbook.add_worksheet('testbed')
+        sheet.write_row('A1', ['hostname', 'ip', 'username', 'password', 
+                                'protocol', 'os', 'custom:opt1', 'custom:opt2'])
+        sheet.write_row('A2', ['nx-osv-1', '172.25.192.90', 'admin', 'admin', 
+                                'telnet', 'nxos', 'ss1', 'ss2'])
+        sheet.write('A5', None, workbook.add_format({'bold': True}))
+        workbook.close()
+        File(path=workbook_name, encode_password=True).to_testbed_file(
+                                                                    self.output)
+        with open(self.output) as file: 
+            self.assertEqual(file.read(), self.expected_encoded)
+
+    def test_excel_sheets(self):
+        workbook_name = '/tmp/sites.xlsx'
+        outdir = '/tmp/site_testbeds'
+        if os.path.isdir(outdir):
+            shutil.rmtree(outdir)
+        workbook = xlsxwriter.Workbook(workbook_name)
+        for index, site in enumerate(['paris', 'tokyo', 'lima']):
+            sheet = workbook.add_worksheet(site)
+            sheet.write_row('A1', ['hostname', 'ip', 'username', 'password',
+                                                            'protocol', 'os'])
+            sheet.write_row('A2', ['{}-1'.format(site), '10.0.{}.1'.format(
+                            index), 'admin', 'admin', 'ssh', 'iosxe'])
+        workbook.close()
+        for workers in (1, 2):
+            File(path=workbook_name, sheets='all', 
+                                    workers=workers).to_testbed_file(outdir)
+            self.assertEqual(sorted(os.listdir(outdir)), 
+                                    ['lima.yaml', 'paris.yaml', 'tokyo.yaml'])
+            shutil.rmtree(outdir)
+        testbeds = File(path=workbook_name, 
+                            sheets=['lima', 'paris']).to_testbed_object()
+        self.assertEqual([list(testbed.devices) for testbed in testbeds], 
+                                                    [['paris-1'], ['lima-1']])
+        testbed = File(path=workbook_name, sheets='all', workers=2,
+                            merge_sheets=True)._generate_testbed()
+        self.assertEqual(list(testbed['devices']), 
+                                            ['paris-1', 'tokyo-1', 'lima-1'])
+        with self.assertRaises(Exception):
+            File(path=workbook_name, sheets=['rome'])._generate_testbed()
+
+    @skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_columnar_load(self):
+        import pyarrow.parquet
+        import pyarrow.feather
+        table = pyarrow.table({
+            'hostname': ['nx-osv-1'], 'ip': ['172.25.192.90'], 
+            'username': ['admin'], 'password': ['admin'], 
+            'protocol': ['telnet'], 'os': ['nxos'], 'custom:opt1': ['ss1'], 
+            'custom:opt2': ['ss2'], 'owner': ['']
+        })
+        pyarrow.parquet.write_table(table, '/tmp/test.parquet')
+        pyarrow.feather.write_feather(table, '/tmp/test.feather')
+        for path in ('/tmp/test.parquet', '/tmp/test.feather'):
+            File(path=path).to_testbed_file(self.output)
+            with open(self.output) as file: 
+                self.assertEqual(file.read(), self.expected)
+        table = table.set_column(1, 'ip', pyarrow.array(['10.0.0.1:2001']))
+        table = table.append_column('port', pyarrow.array([None], 
+                                                            pyarrow.int64()))
+        pyarrow.parquet.write_table(table, '/tmp/test.parquet')
+        testbed = File(path='/tmp/test.parquet', 
+                            columns=['custom:opt1'])._generate_testbed()
+        device = testbed['devices']['nx-osv-1']
+        self.assertEqual(device['connections']['cli'], 
+                {'ip': '10.0.0.1', 'port': 2001, 'protocol': 'telnet'})
+        self.assertEqual(device['custom'], {'opt1': 'ss1'})
+        # The header of a previously read file selects no column
+        creator = File(path='/tmp/test.parquet', columns=['custom:opt1'])
+        creator._keys = ['custom:opt2']
+        device = creator._generate_testbed()['devices']['nx-osv-1']
+        self.assertEqual(device['custom'], {'opt1': 'ss1'})
+
+    def test_record_replay(self):
+        snapshot = '/tmp/snapshots/file.json.gz'
+        if os.path.isfile(snapshot):
+            os.remove(snapshot)
+        File(path=self.test_csv, record=snapshot).to_testbed_file(self.output)
+        self.assertTrue(os.path.isfile(snapshot))
+        os.remove(self.test_csv)
+        os.remove(self.output)
+        File(path=self.test_csv, replay=snapshot).to_testbed_file(self.output)
+        with open(self.output) as file: 
+            self.assertEqual(file.read(), self.expected)
+        with self.assertRaises(FileNotFoundError):
+            File(path=self.test_csv).to_testbed_file(self.output)
+
+    def test_store_threshold(self):
+        with open(self.test_csv, 'a') as csv:
+            csv.write("\nnx-osv-0,172.25.192.91,admin,admin,telnet,nxos,s,s")
+        File(path=self.test_csv).to_testbed_file(self.output)
+        with open(self.output) as file: 
+            expected = file.read()
+        creator = File(path=self.test_csv, store_threshold=1)
+        testbed = creator._generate_testbed()
+        self.assertEqual(len(testbed['devices']), 2)
+        self.assertEqual(testbed['devices'].find_by_ip('172.25.192.91'), 
+                                                                ['nx-osv-0'])
+        creator.to_testbed_file(self.output)
+        with open(self.output) as file: 
+            self.assertEqual(file.read(), expected)
+        testbed = creator.to_testbed_object()
+        self.assertIn('nx-osv-0', testbed.devices)
+        File(path=self.test_csv, store_threshold=1, 
+                        encode_password=True).to_testbed_file(self.output)
+        with open(self.output) as file: 
+            self.assertIn(self.expected_encoded[10:], file.read())
+
+        # Thresholds from the CLI are strings, '0' disables the store
+        testbed = File(path=self.test_csv, store_threshold='0')\
+                                                        ._generate_testbed()
+        self.assertIsInstance(testbed['devices'], dict)
+        testbed = File(path=self.test_csv, store_threshold='1')\
+                                                        ._generate_testbed()
+        self.assertNotIsInstance(testbed['devices'], dict)
+
+    def test_compressed(self):
+        compressed_csv = self.test_csv + '.gz'
+        with gzip.open(compressed_csv, 'wt') as file:
+            file.write(self.csv_file)
+        output = self.output + '.xz'
+        File(path=compressed_csv).to_testbed_file(output)
+        with lzma.open(output, 'rt') as file:
+            self.assertEqual(file.read(), self.expected)
+        creator = File(path=output)
+        testbed = creator.to_testbed_object()
+        self.assertEqual(testbed.devices['nx-osv-1'].os, 'nxos')
+        creator.to_testbed_file(self.output)
+        with open(self.output) as file:
+            self.assertEqual(file.read(), self.expected)
+
 if __name__ == '__main__':
     main()
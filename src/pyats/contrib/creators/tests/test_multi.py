@@ -0,0 +1,61 @@
+import os
+import sys
+
+from ..multi import Multi
+from unittest import TestCase, main
+from pyats.topology import Testbed
+
+class TestMulti(TestCase):
+    def setUp(self):
+        self.header = "hostname,ip,username,password,protocol,os\n"
+        self.first_csv = "/tmp/multi_first.csv"
+        self.second_csv = "/tmp/multi_second.csv"
+        self.output = "/tmp/multi_testbed.yaml"
+        with open(self.first_csv, "w") as file:
+            file.write(self.header)
+            file.write("R1,10.0.0.1,admin,admin,ssh,iosxe\n")
+            file.write("R2,10.0.0.2,admin,admin,ssh,iosxe\n")
+        with open(self.second_csv, "w") as file:
+            file.write(self.header)
+            file.write("R2,10.0.1.2,admin,admin,ssh,nxos\n")
+            file.write("R3,10.0.1.3,admin,admin,ssh,nxos\n")
+        sys.argv = ["creator"]
+
+    def test_no_arguments(self):
+        with self.assertRaises(Exception):
+            Multi()
+
+    def test_parse_source(self):
+        creator = Multi(sources=[])
+        self.assertEqual(creator._parse_source(
+                    'netbox:netbox-url=https://a.com/?x=1,user_token=abc,topology'),
+            ('netbox', {'netbox_url': 'https://a.com/?x=1',
+                        'user_token': 'abc', 'topology': True}))
+        self.assertEqual(creator._parse_source(('file', {'path': 'a.csv'})),
+                                                    ('file', {'path': 'a.csv'}))
+
+    def test_merge(self):
+        creator = Multi(sources=['file:path=' + self.first_csv,
+                                 ('file', {'path': self.second_csv})])
+        creator.to_testbed_file(self.output)
+        self.assertTrue(os.path.isfile(self.output))
+        testbed = creator.to_testbed_object()
+        self.assertTrue(isinstance(testbed, Testbed))
+        self.assertEqual(sorted(testbed.devices), ['R1', 'R2', 'R3'])
+        self.assertEqual(testbed.devices['R2'].os, 'iosxe')
+        self.assertIn('file#2: R2', creator._result['warning'])
+
+    def test_errored_source(self):
+        creator = Multi(sources=['file:path=/tmp/multi_missing.csv',
+                                 'file:path=' + self.first_csv])
+        testbed = creator.to_testbed_object()
+        self.assertEqual(sorted(testbed.devices), ['R1', 'R2'])
+        self.assertIn('file#1', creator._result['errored'])
+        creator = Multi(sources=['fiel:path=' + self.first_csv,
+                                 'file:path=' + self.first_csv])
+        testbed = creator.to_testbed_object()
+        self.assertEqual(sorted(testbed.devices), ['R1', 'R2'])
+        self.assertIn('fiel', creator._result['errored'])
+
+if __name__ == '__main__':
+    main()
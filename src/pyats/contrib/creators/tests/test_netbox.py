@@ -1,5 +1,5 @@
 from unittest import TestCase, main
-from ..netbox import Netbox
+from ..netbox import Netbox, _get_session
 from pyats.topology import Testbed
 
 class TestNetbox(TestCase):
@@ -11,5 +11,13 @@ class TestNetbox(TestCase):
         with self.assertRaises(Exception):
             Netbox(netbox_url="abc")
 
+    def test_sessions(self):
+        session = _get_session('https://netbox.com', '72830d67')
+        self.assertIs(_get_session('https://netbox.com', '72830d67'), session)
+        self.assertIsNot(_get_session('https://netbox.com', 'a7e1b5c2'),
+                                                                    session)
+        self.assertIsNot(_get_session('https://lab.netbox.com', '72830d67'),
+                                                                    session)
+
 if __name__ == '__main__':
     main()
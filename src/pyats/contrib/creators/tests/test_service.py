@@ -0,0 +1,75 @@
+import os
+import json
+import time
+import threading
+
+from ..libs.service import CreatorService
+from unittest import TestCase, main
+from urllib.error import HTTPError
+from urllib.request import urlopen, Request
+
+class TestService(TestCase):
+    def setUp(self):
+        self.csv = "/tmp/service.csv"
+        self.output = "/tmp/service_testbed.yaml"
+        with open(self.csv, "w") as file:
+            file.write("hostname,ip,username,password,protocol,os\n")
+            file.write("R1,10.0.0.1,admin,admin,ssh,iosxe\n")
+        self.service = CreatorService(workers=2, cache_ttl=60, token='abc', 
+                                                                root='/tmp')
+
+    def test_generate(self):
+        response = self.service.generate('file', {'path': self.csv})
+        self.assertFalse(response['cached'])
+        self.assertIn('R1:', response['testbed'])
+        os.remove(self.csv)
+        response = self.service.generate('file', {'path': self.csv}, 
+                                                                self.output)
+        self.assertTrue(response['cached'])
+        self.assertIsNone(response['testbed'])
+        self.assertTrue(os.path.isfile(self.output))
+        with self.assertRaises(FileNotFoundError):
+            self.service.generate('file', {'path': self.csv}, refresh=True)
+
+    def test_cache_expiry(self):
+        self.service._cache[('old', '{}')] = (time.time() - 60, {})
+        self.assertIsNone(self.service._cached(('old', '{}')))
+        self.service._cache[('old', '{}')] = (time.time() - 60, {})
+        self.service._store(('new', '{}'), {})
+        self.assertEqual(list(self.service._cache), [('new', '{}')])
+
+    def test_server(self):
+        server = self.service.server(port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = 'http://127.0.0.1:{}/generate'.format(server.server_port)
+            def post(body, content_type='application/json', token='abc'):
+                request = Request(url, data=json.dumps(body).encode(), 
+                    headers={'Content-Type': content_type, 
+                             'Authorization': 'Bearer ' + token})
+                try:
+                    with urlopen(request) as reply:
+                        return reply.status, json.loads(reply.read())
+                except HTTPError as e:
+                    return e.code, None
+            status, response = post({'source': 'file', 
+                'arguments': {'path': self.csv, 'encode_password': True}})
+            self.assertEqual(status, 200)
+            self.assertIn('%ENC{', response['testbed'])
+            request = {'source': 'file', 'arguments': {'path': self.csv}}
+            self.assertEqual(post(request, 'text/plain')[0], 415)
+            self.assertEqual(post(request, token='abd')[0], 401)
+            for request in ({'source': 'file', 'output': '/etc/lab.yaml', 
+                                            'arguments': {'path': self.csv}},
+                            {'source': 'file', 'arguments': {'path': self.csv,
+                                                    'replay': '/etc/passwd'}},
+                            {'source': 'multi', 'arguments': 
+                                    {'sources': ['file:path=/etc/passwd']}}):
+                self.assertEqual(post(request)[0], 403)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import shutil
+import threading
+
+from ..libs import watcher
+from ..libs.watcher import Watcher
+from ..libs.compression import atomic_file
+from unittest import TestCase, main, skipUnless
+
+class TestWatcher(TestCase):
+    def setUp(self):
+        self.folder = '/tmp/watched'
+        self.output = '/tmp/watched/testbeds'
+        if os.path.isdir(self.folder):
+            shutil.rmtree(self.folder)
+        os.makedirs(self.output)
+        with open(self.folder + '/lab.csv', 'w') as file:
+            file.write('hostname,ip\n')
+
+    def watch(self, polling):
+        watch = Watcher(self.folder, ignore=self.output, interval=0.05, 
+                                                            polling=polling)
+        try:
+            def edit():
+                for line in ('R1,10.0.0.1\n', 'R2,10.0.0.2\n'):
+                    with open(self.folder + '/lab.csv', 'a') as file:
+                        file.write(line)
+                with atomic_file(self.output + '/lab.yaml') as file:
+                    file.write('devices: {}\n')
+            threading.Timer(0.2, edit).start()
+            self.assertEqual(watch.wait(debounce=0.2, timeout=5), 
+                                                {self.folder + '/lab.csv'})
+            self.assertEqual(watch.wait(debounce=0.2, timeout=0.3), set())
+        finally:
+            watch.stop()
+        self.assertEqual(os.listdir(self.output), ['lab.yaml'])
+
+    def test_polling(self):
+        self.watch(polling=True)
+
+    @skipUnless(watcher.Observer, 'watchdog is not installed')
+    def test_notified(self):
+        self.watch(polling=False)
+
+if __name__ == '__main__':
+    main()
@@ -11,11 +11,7 @@ from collections import OrderedDict
 from yaml import YAMLError, safe_load
 from concurrent.futures import ThreadPoolExecutor
 
-from genie.conf import Genie
-from genie.testbed import load
 from pyats.async_ import pcall
-from genie.conf.base import Testbed, Device, Interface, Link
-from genie.metaparser.util.exceptions import SchemaEmptyParserError
 from pyats.log import ScreenHandler
 from pyats.log import TaskLogHandler
 
@@ -104,6 +100,8 @@ class Topology(TestbedCreator):
     --debug-log='<log name>'                       |  debug_log = '<log name>'
     --disable-config                               |  disable_config = True
     --telnet-connect                               |  telnet_connect = True
+    --record=value                                 |  record=value
+    --replay=value                                 |  replay=value
     """
 
     def _init_arguments(self):
@@ -139,6 +137,10 @@ class Topology(TestbedCreator):
         Returns:
             dict: The intermediate dictionary format of the testbed data.
         """
+        # Genie is slow to import, so it is only imported when the topology
+        # is discovered rather than along with the other creators
+        from genie.testbed import load
+
         if self._debug_log:
             log_file = self.create_debug_log()
         else:
@@ -156,7 +158,7 @@ class Topology(TestbedCreator):
             except YAMLError as exc:
                 raise exc('Error Loading Yaml file {}'.format(self._testbed_file))
 
-        if self._config_discovery:
+        if self._config_discovery and not self._replay:
             reply = ''
             while reply != 'y':
                 reply = input('Running creator with config-discovery will '
@@ -209,44 +211,21 @@ class Topology(TestbedCreator):
         device_list = {}
         count = 1
         while len(testbed.devices) > len(dev_man.visited_devices):
-            # connect to unvisited devices
             log.info ('Discovery Process Round {}'.format(count))
-            log.info ('   Connecting to devices')
 
-            log.debug('--------DEBUG LOGS-------')
-            connect, noconnect, skip= dev_man.connect_all_devices(len(testbed.devices))
-            log.debug('--------CONSOLE LOGS--------')
-            if connect:
-                log.info('     Successfully connected to devices {}'.format(connect))
-            if noconnect:
-                log.info('     Failed to connect to devices {}'.format(noconnect))
-            if skip:
-                log.info('     Skipped connecting to devices {}'.format(skip))
-
-            # Configure these connected devices
-            if dev_man.config:
-                log.info('   Configuring Testbed devices cdp and lldp protocol')
-
-                log.debug('--------DEBUG LOGS-------')
-                dev_man.configure_testbed_cdp_protocol()
-                dev_man.configure_testbed_lldp_protocol()
-                log.debug('--------CONSOLE LOGS--------')
-                time.sleep(5)
-
-                if dev_man.cdp_configured:
-                    log.info('     cdp was configured for devices {}'.format(dev_man.cdp_configured))
-                else:
-                    log.info('     cdp was not configured on any device')
-                if dev_man.lldp_configured:
-                    log.info('     lldp was configured for devices {}'.format(dev_man.lldp_configured))
-                else:
-                    log.info('     lldp was not configured on any device')
+            if self._replay:
+                # Devices are not accessed when replaying, all the devices
+                # known at this point were visited during the recording
+                dev_man.visited_devices.update(testbed.devices)
+            else:
+                self._connect_and_configure(dev_man, testbed)
 
             # Get the cdp/lldp operation data and massage it into our structure format
             log.info('   Finding neighbors information')
 
             log.debug('--------DEBUG LOGS-------')
-            result = dev_man.get_neigbor_data()
+            result = self._source_data('neighbors_{}'.format(count),
+                                                    dev_man.get_neigbor_data)
             connections = self.process_neighbor_data(testbed, device_list,
                                                      exclude_networks, result)
             log.debug('Connections found in current set of devices: {}'.format(connections))
@@ -274,12 +253,16 @@ class Topology(TestbedCreator):
         log.debug('--------DEBUG LOGS-------')
         # get IP address for interfaces
         log.debug('Get interface ip addresses')
-        pcall(dev_man.get_interfaces_ipV4_address,
-              device = testbed.devices.values())
+        addresses = self._source_data('addresses', 
+                lambda: self._get_interface_addresses(dev_man, testbed))
+        for device_name, interfaces in addresses.items():
+            for interface_name, ip in interfaces.items():
+                testbed.devices[device_name].interfaces[interface_name].ipv4 = \
+                                                    ipaddress.IPv4Interface(ip)
         log.debug('--------CONSOLE LOGS--------')
 
         # unconfigure cdp and lldp on devices that were configured by script
-        if self._config_discovery:
+        if self._config_discovery and not self._replay:
             log.info('Unconfiguring cdp and lldp protocols on configured devices')
 
             log.debug('--------DEBUG LOGS-------')
@@ -302,6 +285,68 @@ class Topology(TestbedCreator):
         # return final topology
         return final_yaml
 
+    def _connect_and_configure(self, dev_man, testbed):
+        '''Connects to the unvisited devices of the testbed and configures
+        cdp and lldp on them if config discovery is enabled
+
+        Args:
+            dev_man ('TestbedManager'): manager handling the device interactions
+            testbed ('testbed'): testbed of devices to connect to
+        '''
+        # connect to unvisited devices
+        log.info ('   Connecting to devices')
+
+        log.debug('--------DEBUG LOGS-------')
+        connect, noconnect, skip= dev_man.connect_all_devices(len(testbed.devices))
+        log.debug('--------CONSOLE LOGS--------')
+        if connect:
+            log.info('     Successfully connected to devices {}'.format(connect))
+        if noconnect:
+            log.info('     Failed to connect to devices {}'.format(noconnect))
+        if skip:
+            log.info('     Skipped connecting to devices {}'.format(skip))
+
+        # Configure these connected devices
+        if dev_man.config:
+            log.info('   Configuring Testbed devices cdp and lldp protocol')
+
+            log.debug('--------DEBUG LOGS-------')
+            dev_man.configure_testbed_cdp_protocol()
+            dev_man.configure_testbed_lldp_protocol()
+            log.debug('--------CONSOLE LOGS--------')
+            time.sleep(5)
+
+            if dev_man.cdp_configured:
+                log.info('     cdp was configured for devices {}'.format(dev_man.cdp_configured))
+            else:
+                log.info('     cdp was not configured on any device')
+            if dev_man.lldp_configured:
+                log.info('     lldp was configured for devices {}'.format(dev_man.lldp_configured))
+            else:
+                log.info('     lldp was not configured on any device')
+
+    def _get_interface_addresses(self, dev_man, testbed):
+        '''Gets the ipv4 address of the interfaces of all the devices
+
+        Args:
+            dev_man ('TestbedManager'): manager handling the device interactions
+            testbed ('testbed'): testbed of devices to get the addresses for
+
+        Returns:
+            {device:{interface: ipv4 address}}
+        '''
+        pcall(dev_man.get_interfaces_ipV4_address,
+              device = testbed.devices.values())
+
+        addresses = {}
+        for device in testbed.devices.values():
+            for interface in device.interfaces.values():
+                if interface.ipv4 is not None:
+                    addresses.setdefault(device.name, {})[interface.name] = \
+                                                            str(interface.ipv4)
+
+        return addresses
+
     def create_debug_log(self):
         '''Take debug log argument and create a file handler to record the debug and info data
 
@@ -684,6 +729,7 @@ class Topology(TestbedCreator):
         Returns:
             Dictionary of new device objects to add to testbed
         '''
+        from genie.conf.base import Interface
 
         # filter to strip out the numbers from an interface to create a type name
         # example: ethernet0/3 becomes ethernet
@@ -706,7 +752,10 @@ class Topology(TestbedCreator):
             elif self._add_unconnected_interfaces:
 
                 # get all interfaces and add them to testbed
-                interface_list = testbed.devices[device_name].parse('show interfaces description')
+                interface_list = self._source_data(
+                    'interfaces_{}'.format(device_name),
+                    lambda: testbed.devices[device_name].parse(
+                                                'show interfaces description'))
                 for interface in interface_list['interfaces']:
                     if interface not in testbed.devices[device_name].interfaces:
                         type_name = interface_filter.match(interface)
@@ -738,6 +787,8 @@ class Topology(TestbedCreator):
         Returns:
             new device object to be added to testbed
         '''
+        from genie.conf.base import Device, Interface
+
         # filter to strip out the numbers from an interface to create a type name
         # example: ethernet0/3 becomes ethernet
         interface_filter = re.compile(r'[a-zA-Z]+')
@@ -888,6 +939,8 @@ class Topology(TestbedCreator):
             connection_dict ('dict'): Dictionary with connections found earlier
             testbed ('testbed'): testbed to write connections into
         '''
+        from genie.conf.base import Interface, Link
+
         # filter to strip out the numbers from an interface to create a type name
         # example: ethernet0/3 becomes ethernet
         interface_filter = re.compile(r'[a-zA-Z]+')